@@ -23,6 +23,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "extended_accounts.helpers.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -108,3 +109,72 @@ INSTALLED_APPS += ["extended_accounts"]
 LOGIN_URL = reverse_lazy("extended_accounts:login")
 LOGIN_REDIRECT_URL = reverse_lazy("extended_accounts:redirect_account")
 LOGOUT_REDIRECT_URL = reverse_lazy("extended_accounts:login")
+## Profile images are read, written and deleted through Django's Storage API, so they can live in any backend configured in STORAGES["default"] (eg: a shared object store). Backends exposing a delete_many(names) method get batched deletes.
+## Profile images are served by extended_accounts:profile_image. In production, let the front server send the bytes by setting "X-Accel-Redirect" (nginx, files are then served from PROFILE_IMAGE_SENDFILE_PREFIX + name, which should be an internal location mapped to MEDIA_ROOT) or "X-Sendfile" (Apache, only for storages in the local filesystem: with other storages, the bytes go through Python)
+PROFILE_IMAGE_SENDFILE_HEADER = None
+PROFILE_IMAGE_SENDFILE_PREFIX = "/protected_media/"
+## Profile images are checked while they're being uploaded: the upload is aborted within a few KB if it doesn't start like an image or goes beyond PROFILE_IMAGE_MAX_UPLOAD_SIZE bytes. ProfileImageUploadHandler must be the first upload handler
+PROFILE_IMAGE_MAX_UPLOAD_SIZE = 5 * 2**20
+FILE_UPLOAD_HANDLERS = [
+    "extended_accounts.helpers.ProfileImageUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+## Uploaded profile images are decoded once, while validating the form, and the decoded image is reused to transcode them. Images with more pixels than this are rejected before being decoded
+PROFILE_IMAGE_MAX_PIXELS = 25_000_000
+## Every uploaded profile image is stored twice: as uploaded and transcoded into webp. Set PROFILE_IMAGE_KEEP_SOURCE to False to store only the webp version and halve the space used by profile images (clients not accepting webp then get it anyway)
+PROFILE_IMAGE_KEEP_SOURCE = True
+## Quality of the webp renditions of the profile images (None for Pillow's default, 80). Instead, the quality can be searched for every image to fit in a byte budget (PROFILE_IMAGE_WEBP_MAX_BYTES) and/or to reach a perceptual budget (PROFILE_IMAGE_WEBP_MIN_PSNR, in dB, ~40 is hardly distinguishable from the original). Searching costs several encodes per image: run python manage.py benchmark_webp_quality to measure the tradeoff, and bump PROFILE_IMAGE_ENCODING_VERSION to apply new settings to the stored images
+PROFILE_IMAGE_WEBP_QUALITY = None
+PROFILE_IMAGE_WEBP_MAX_BYTES = None
+PROFILE_IMAGE_WEBP_MIN_PSNR = None
+## Opt-in: serve request.user (and request.user.profile) from the cache, so authenticated requests don't query the database to load them. The entries are invalidated whenever an account or a profile is saved or deleted, ACCOUNT_CACHE_TIMEOUT (seconds) only bounds staleness after queryset.update() calls. Use a cache shared by all the processes (eg: Redis, Memcached) in production
+# AUTHENTICATION_BACKENDS = ["extended_accounts.helpers.CachedModelBackend"]
+ACCOUNT_CACHE_ALIAS = "default"
+ACCOUNT_CACHE_TIMEOUT = 300
+## CachedModelBackend also caches the permissions of each account across requests, as well as the results of AccountModel.objects.with_perm_cached. They're invalidated whenever groups, memberships or permissions change, PERMISSIONS_CACHE_TIMEOUT (seconds) just lets unused entries expire
+PERMISSIONS_CACHE_TIMEOUT = 3600
+## POST requests to the login, reset_password_request and new_account routes, and GET requests to the availability route, are throttled with token buckets keyed by client IP (and by username/email where it applies), before any password is hashed. THROTTLE_RATES overrides the (capacity, period in seconds) of each route (see DEFAULT_THROTTLE_RATES in extended_accounts/helpers/throttling.py), None disables it. The buckets live in the cache ("cache", shared by every process) or in the memory of each process ("memory"). Behind a reverse proxy, make sure REMOTE_ADDR holds the client IP
+THROTTLE_STORE = "cache"
+THROTTLE_CACHE_ALIAS = "default"
+THROTTLE_RATES = {}
+## Cap on the buckets kept by the "memory" store, the least recently used are evicted beyond it
+THROTTLE_MEMORY_MAX_BUCKETS = 100000
+## Opt-in: instead of an UPDATE of last_login on every login, buffer the timestamps in the memory of each process and write them in a single batched UPDATE every LAST_LOGIN_FLUSH_INTERVAL seconds or every LAST_LOGIN_FLUSH_SIZE logins. last_login may then be stale in the database by up to LAST_LOGIN_FLUSH_INTERVAL seconds, and the buffered timestamps are lost if the process crashes
+LAST_LOGIN_BUFFER = False
+LAST_LOGIN_FLUSH_INTERVAL = 60
+LAST_LOGIN_FLUSH_SIZE = 500
+## The availability endpoint answers from a Bloom filter of the usernames, emails and phone numbers in use, kept in the memory of each process. It's sized for AVAILABILITY_FILTER_FALSE_POSITIVE_RATE (the share of free values which still need a query) and rebuilt from the database every AVAILABILITY_FILTER_MAX_AGE seconds, so values taken through other processes are picked up
+AVAILABILITY_FILTER_FALSE_POSITIVE_RATE = 0.01
+AVAILABILITY_FILTER_MAX_AGE = 300
+## Deleted accounts are soft-deleted right away and hard-deleted by the purge_deleted_accounts Celery task, ACCOUNT_PURGE_BATCH_SIZE accounts per transaction
+ACCOUNT_PURGE_BATCH_SIZE = 100
+## Reads are sent to the REPLICA_DATABASES (aliases in DATABASES) and writes to the default database. A request which writes keeps its client on the primary for REPLICA_PIN_SECONDS through the REPLICA_PIN_COOKIE cookie, set it above the replication lag. Without replicas, everything goes to the default database
+DATABASE_ROUTERS = [
+    "extended_accounts.helpers.AccountShardRouter",
+    "extended_accounts.helpers.PrimaryReplicaRouter",
+]
+REPLICA_DATABASES = []
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = "pin_primary"
+## Stand-in replica for the router tests, it's only created for the tests using it
+if TESTING:
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.replica.sqlite3",
+    }
+## Accounts and their profiles can be spread across the ACCOUNT_SHARDS databases (aliases in DATABASES) by the hash of their username. The AccountLookupModel table, in the default database, allocates their ids, tells where each of them lives and keeps usernames, emails and phone numbers unique across shards. Run the migrations on every shard. Without shards, everything stays in the default database
+ACCOUNT_SHARDS = []
+## Stand-in shards for the sharding tests, they're only created for the tests using them
+if TESTING:
+    DATABASES["shard_0"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.shard_0.sqlite3",
+    }
+    DATABASES["shard_1"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.shard_1.sqlite3",
+    }
+## SQLite production profile, applied to every new connection of the SQLite databases once SQLITE_PRODUCTION_PROFILE is True (or the list of the aliases using it): WAL journaling, synchronous=NORMAL, a busy timeout, memory-mapped I/O, a larger page cache and transactions taking the write lock as soon as they begin. Tune the pragmas with SQLITE_PRAGMAS, and measure them with python manage.py benchmark_sqlite_writers
+SQLITE_PRODUCTION_PROFILE = False
+SQLITE_PRAGMAS = {}
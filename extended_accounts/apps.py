@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ExtendedAccountsConfig(AppConfig):
@@ -9,4 +10,20 @@ class ExtendedAccountsConfig(AppConfig):
         # Import the signals
         from .signals import __all__
 
+        if getattr(settings, "LAST_LOGIN_BUFFER", False):
+            ## Replace the UPDATE Django runs on every login by the buffered one
+            from django.contrib.auth.signals import user_logged_in
+            from .helpers.last_login_buffer import buffer_last_login
+
+            user_logged_in.disconnect(dispatch_uid="update_last_login")
+            user_logged_in.connect(buffer_last_login, dispatch_uid="buffer_last_login")
+
+        ## Apply the SQLite production profile to the new connections, if enabled by SQLITE_PRODUCTION_PROFILE
+        from django.db.backends.signals import connection_created
+        from .helpers.sqlite_profile import apply_sqlite_profile
+
+        connection_created.connect(
+            apply_sqlite_profile, dispatch_uid="apply_sqlite_profile"
+        )
+
         return super().ready()
@@ -1,3 +1,43 @@
+from .profile_image_field import ProfileImageField
 from .new_account_form import NewAccountForm
 from .update_account_form import UpdateAccountForm
-from .tasks import delete_unconfirmed_accounts
+from .tasks import (
+    delete_unconfirmed_accounts,
+    delete_profile_image_files,
+    purge_deleted_accounts,
+)
+from .profile_image_storage import (
+    save_image_file,
+    delete_image_files,
+    delete_image_files_on_commit,
+    legacy_image_files,
+    release_profile_image,
+)
+from .profile_image_upload_handler import (
+    ProfileImageUploadHandler,
+    ProfileImageUploadErrorMixin,
+)
+from .webp_encoding import (
+    encode_webp,
+    encode_webp_within_budget,
+    psnr,
+    search_webp_quality,
+)
+from .cached_auth_backend import CachedModelBackend, invalidate_cached_accounts
+from .permission_cache import bump_permissions_version
+from .throttling import throttle, get_throttle_counters
+from .last_login_buffer import buffer_last_login, last_login_buffer
+from .availability_filter import availability_filter
+from .account_directory import sync_account_directory, rebuild_account_directory
+from .replica_router import (
+    PrimaryReplicaRouter,
+    ReplicaPinningMiddleware,
+    pin_to_primary,
+)
+from .account_sharding import (
+    AccountShardRouter,
+    get_account_shards,
+    reserve_account,
+    update_account_lookup,
+)
+from .sqlite_profile import apply_sqlite_profile
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from .account_sharding import get_account_shards
+from extended_accounts.models import AccountDirectoryModel as AccountDirectory
+
+## Fields of the directory copied from each model, as (directory field, lookup from the account)
+ACCOUNT_DIRECTORY_FIELDS = [
+    ("username", "username"),
+    ("email", "email"),
+    ("is_active", "is_active"),
+]
+PROFILE_DIRECTORY_FIELDS = [
+    ("first_name", "profile__first_name"),
+    ("last_name", "profile__last_name"),
+    ("phone_number", "profile__phone_number"),
+    ("date_joined", "profile__date_joined"),
+]
+
+
+def upsert_directory_entries(entries, fields, using=None):
+    """
+    Insert or update the directory rows given as {account_id: {field: value}} in a single query. Only the given fields are written on existing rows, so the account and the profile signals don't overwrite each other.
+    """
+    if not entries:
+        return
+    AccountDirectory.objects.using(using).bulk_create(
+        [
+            AccountDirectory(account_id=account_id, **values)
+            for account_id, values in entries.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["account"],
+        update_fields=fields,
+    )
+
+
+def sync_account_directory(instance, using=None, update_fields=None):
+    """
+    Copy the directory fields of a saved account or profile into its directory row. Saves restricted to update_fields none of which is in the directory (eg: last_login on every login) have nothing to copy.
+    """
+    if isinstance(instance, get_user_model()):
+        if update_fields is not None and not update_fields & {
+            "deletion_requested_at",
+            *[lookup for _, lookup in ACCOUNT_DIRECTORY_FIELDS],
+        }:
+            return
+        ## Soft-deleted accounts are hidden right away
+        if instance.deletion_requested_at is not None:
+            AccountDirectory.objects.using(using).filter(
+                account_id=instance.pk
+            ).delete()
+            return
+        account_id, fields = instance.pk, ACCOUNT_DIRECTORY_FIELDS
+    else:
+        if update_fields is not None and not update_fields & {
+            lookup.removeprefix("profile__") for _, lookup in PROFILE_DIRECTORY_FIELDS
+        }:
+            return
+        account_id, fields = instance.account_id, PROFILE_DIRECTORY_FIELDS
+    upsert_directory_entries(
+        {
+            account_id: {
+                field: getattr(instance, lookup.removeprefix("profile__"))
+                for field, lookup in fields
+            }
+        },
+        [field for field, _ in fields],
+        using=using,
+    )
+
+
+def rebuild_account_directory(chunk_size=1000, using=None):
+    """
+    Rewrite the directory row of every account from the accounts and profiles tables, chunk by chunk, and return how many rows were written. Soft-deleted accounts are left out.
+    Without database, every shard is rebuilt if the accounts are sharded, the primary database otherwise.
+    """
+    if using is None:
+        return sum(
+            rebuild_account_directory(chunk_size=chunk_size, using=shard)
+            for shard in get_account_shards() or [DEFAULT_DB_ALIAS]
+        )
+    accounts = (
+        get_user_model()
+        ._default_manager.using(using)
+        .order_by("pk")
+        .values(
+            "pk",
+            *[
+                lookup
+                for _, lookup in ACCOUNT_DIRECTORY_FIELDS + PROFILE_DIRECTORY_FIELDS
+            ],
+        )
+    )
+    fields = [field for field, _ in ACCOUNT_DIRECTORY_FIELDS + PROFILE_DIRECTORY_FIELDS]
+    written = last_pk = 0
+    ## Keyset pagination, so the accounts table is never read all at once
+    while chunk := list(accounts.filter(pk__gt=last_pk)[:chunk_size]):
+        last_pk = chunk[-1]["pk"]
+        upsert_directory_entries(
+            {
+                row["pk"]: {
+                    field: row[lookup]
+                    for field, lookup in ACCOUNT_DIRECTORY_FIELDS
+                    + PROFILE_DIRECTORY_FIELDS
+                    ## Accounts without profile get the defaults
+                    if row[lookup] is not None or field == "phone_number"
+                }
+                for row in chunk
+            },
+            fields,
+            using=using,
+        )
+        written += len(chunk)
+    AccountDirectory.objects.using(using).filter(
+        account__deletion_requested_at__isnull=False
+    ).delete()
+    return written
@@ -0,0 +1,119 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.conf import settings
+from contextlib import ExitStack
+import hashlib
+
+## Filters which can be answered by the lookup table, mapped to its own fields
+ROUTABLE_LOOKUPS = {
+    "pk": "pk",
+    "id": "pk",
+    "username": "username",
+    "username__iexact": "username__iexact",
+    "email": "email",
+    "email__iexact": "email__iexact",
+    "profile__phone_number": "phone_number",
+}
+
+
+def get_account_shards():
+    return getattr(settings, "ACCOUNT_SHARDS", [])
+
+
+def shard_for_username(username):
+    """
+    Shard where a new account is placed, given by the hash of its username. The shard is then recorded in the lookup table, so renaming an account doesn't move it.
+    """
+    shards = get_account_shards()
+    digest = hashlib.blake2b(username.encode(), digest_size=8).digest()
+    return shards[int.from_bytes(digest, "little") % len(shards)]
+
+
+def find_account_shard(**filters):
+    """
+    Return the shard holding the account matching a routable filter (eg: username="johndoe"), or None if no account matches it. A single indexed query on the default database.
+    """
+    from extended_accounts.models import AccountLookupModel as AccountLookup
+
+    ((lookup, value),) = filters.items()
+    return (
+        AccountLookup.objects.using(DEFAULT_DB_ALIAS)
+        .filter(**{ROUTABLE_LOOKUPS[lookup]: value})
+        .values_list("shard", flat=True)
+        .first()
+    )
+
+
+def account_atomic(using):
+    """
+    Atomic block for writing accounts: besides the transaction on their shard, the changes to the lookup table are done in a transaction on the default database, so both are rolled back together if anything fails in the shard.
+    """
+    stack = ExitStack()
+    if using != DEFAULT_DB_ALIAS:
+        stack.enter_context(transaction.atomic(using=DEFAULT_DB_ALIAS))
+    stack.enter_context(transaction.atomic(using=using))
+    return stack
+
+
+def reserve_account(account, using):
+    """
+    Insert the lookup row of a new account and give its id to the account. Raises IntegrityError if its username or email is taken in any shard.
+    """
+    from extended_accounts.models import AccountLookupModel as AccountLookup
+
+    account.pk = (
+        AccountLookup.objects.using(DEFAULT_DB_ALIAS)
+        .create(username=account.username, email=account.email, shard=using)
+        .pk
+    )
+
+
+def update_account_lookup(account_id, **values):
+    """
+    Copy the username, email or phone number of an account into its lookup row. Raises IntegrityError if they're taken in any shard.
+    """
+    from extended_accounts.models import AccountLookupModel as AccountLookup
+
+    AccountLookup.objects.using(DEFAULT_DB_ALIAS).filter(pk=account_id).update(**values)
+
+
+class AccountShardRouter:
+    """
+    Database router placing each account, together with its profile, in one of the ACCOUNT_SHARDS databases, picked by the hash of its username. Without shards, it has no opinion and the next router (eg: PrimaryReplicaRouter) decides.
+    Objects read from a shard stay there, and AccountModel's querysets route the filters by pk, username, email or phone number to the right shard through the lookup table (see AccountLookupModel). Queries which can't be routed (eg: listing every account) must go through each shard with using().
+    """
+
+    def sharded_models(self):
+        from extended_accounts.models import AccountModel, ProfileModel
+
+        return (AccountModel, ProfileModel)
+
+    def db_for_instance(self, model, instance):
+        from extended_accounts.models import AccountModel
+
+        if (
+            not get_account_shards()
+            or instance is None
+            or not issubclass(model, self.sharded_models())
+        ):
+            return None
+        if instance._state.db is not None:
+            return instance._state.db
+        if isinstance(instance, AccountModel):
+            return shard_for_username(instance.username)
+        return self.db_for_instance(AccountModel, instance.account)
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_instance(model, hints.get("instance"))
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_instance(model, hints.get("instance"))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        sharded_models = self.sharded_models()
+        if (
+            get_account_shards()
+            and isinstance(obj1, sharded_models)
+            and isinstance(obj2, sharded_models)
+        ):
+            return obj1._state.db == obj2._state.db
+        return None
@@ -0,0 +1,224 @@
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from extended_accounts.models import AccountLookupModel as AccountLookup
+from extended_accounts.helpers.account_sharding import get_account_shards
+import hashlib, logging, math, threading, time
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives: if might_contain returns False, the item was never added. It may return True for items never added, with a probability given by the number of bits and hash functions for the number of items added.
+    """
+
+    def __init__(self, capacity, false_positive_rate):
+        self.bit_count = max(
+            8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.bit_count / 8))
+        self.item_count = 0
+
+    def positions(self, item):
+        ## Double hashing: k positions out of two 64 bits hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position // 8] |= 1 << (position % 8)
+        self.item_count += 1
+
+    def might_contain(self, item):
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self.positions(item)
+        )
+
+    def false_positive_rate(self):
+        return (
+            1 - math.exp(-self.hash_count * self.item_count / self.bit_count)
+        ) ** self.hash_count
+
+
+class AvailabilityFilter:
+    """
+    Bloom filter of the usernames, emails and phone numbers in use, so checking whether a value is free doesn't need a query unless it might be taken.
+    The filter is built from the database the first time it's used, and rebuilt in the background every AVAILABILITY_FILTER_MAX_AGE seconds or once it holds more items than it was sized for, the previous one answering until the new one is swapped in. Meanwhile, the account and profile signals add the new values. Values released (deleted accounts, changed emails...) stay in the filter until the next rebuild, they just cost a query. Each process has its own filter, so values taken through another process may be reported as free until the next rebuild: the forms still validate uniqueness against the database.
+    """
+
+    ## Field checked: (lookup to read the values in use, lookup to check whether a value is in use). Usernames are checked regardless of their case, like UserCreationForm does
+    lookups = {
+        "username": ("username", "username__iexact"),
+        "email": ("email", "email"),
+        "phone_number": ("profile__phone_number", "profile__phone_number"),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.filter = None
+        self.built_at = 0
+        self.capacity = 0
+        ## Keys added while a new filter is being built, replayed into it before it's swapped in
+        self.rebuilding = False
+        self.pending = []
+        self.counters = {"checks": 0, "definitely_free": 0, "queries": 0, "taken": 0}
+
+    def get_filter(self):
+        if self.filter is None:
+            ## Nothing to answer from before the first build, so it's waited for
+            with self.build_lock:
+                if self.filter is None:
+                    self.build()
+            return self.filter
+        with self.lock:
+            stale = not self.rebuilding and (
+                time.monotonic() - self.built_at
+                > getattr(settings, "AVAILABILITY_FILTER_MAX_AGE", 300)
+                or self.filter.item_count > self.capacity
+            )
+            if stale:
+                self.rebuilding, self.pending = True, []
+        if stale:
+            ## The current filter keeps answering meanwhile
+            self.start_rebuild()
+        return self.filter
+
+    def start_rebuild(self):
+        threading.Thread(target=self.rebuild_quietly, daemon=True).start()
+
+    def rebuild_quietly(self):
+        """
+        Rebuild from a background thread, where nobody would handle an error. The current filter is kept until the next attempt.
+        """
+        try:
+            self.build()
+        except Exception:
+            logger.warning("Could not rebuild the availability filter", exc_info=True)
+        finally:
+            connections.close_all()  ## Connections are per thread, the rebuild's ones would leak otherwise
+
+    def get_source(self):
+        """
+        Return the queryset the values in use are read from, with the lookups to read them. It's the accounts (through the base manager, as soft-deleted accounts keep their values until they're purged), or the lookup table if they're sharded, as it holds the values of every shard.
+        """
+        if get_account_shards():
+            return AccountLookup.objects.all(), {
+                field: (
+                    lookup.removeprefix("profile__"),
+                    check_lookup.removeprefix("profile__"),
+                )
+                for field, (lookup, check_lookup) in self.lookups.items()
+            }
+        return get_user_model()._base_manager.all(), self.lookups
+
+    def build(self):
+        """
+        Build a new filter from the database and swap it in. The values are streamed into it, and the lock is only held for the swap, so the checks aren't blocked meanwhile.
+        """
+        with self.lock:
+            if not self.rebuilding:
+                self.rebuilding, self.pending = True, []
+        try:
+            queryset, lookups = self.get_source()
+            ## Room to grow before the false positive rate degrades
+            capacity = max(
+                2
+                * sum(
+                    queryset.aggregate(
+                        **{
+                            field: Count(lookup)
+                            for field, (lookup, _) in lookups.items()
+                        }
+                    ).values()
+                ),
+                1000,
+            )
+            bloom_filter = BloomFilter(
+                capacity,
+                getattr(settings, "AVAILABILITY_FILTER_FALSE_POSITIVE_RATE", 0.01),
+            )
+            for field, (lookup, _) in lookups.items():
+                for value in (
+                    queryset.exclude(**{f"{lookup}__isnull": True})
+                    .values_list(lookup, flat=True)
+                    .iterator()
+                ):
+                    bloom_filter.add(self.key(field, value))
+            with self.lock:
+                for key in self.pending:
+                    bloom_filter.add(key)
+                self.filter, self.built_at, self.capacity = (
+                    bloom_filter,
+                    time.monotonic(),
+                    capacity,
+                )
+        finally:
+            with self.lock:
+                self.rebuilding, self.pending = False, []
+        logger.info(
+            "Availability filter built: %d values, %d bytes",
+            bloom_filter.item_count,
+            len(bloom_filter.bits),
+            extra=self.stats(),
+        )
+
+    def key(self, field, value):
+        ## Casefolded, so the filter can't tell apart values differing in their case: they're all probable hits
+        return f"{field}:{str(value).casefold()}"
+
+    def add(self, field, value):
+        """
+        Add a value now in use. Nothing to do if the filter hasn't been built yet, it'll read it from the database, but values added while it's being built may have been read before they were saved, so they're kept for it.
+        """
+        if value in [None, ""]:
+            return
+        with self.lock:
+            if self.rebuilding:
+                self.pending.append(self.key(field, value))
+            if self.filter is not None:
+                self.filter.add(self.key(field, value))
+
+    def is_available(self, field, value):
+        self.counters["checks"] += 1
+        if not self.get_filter().might_contain(self.key(field, value)):
+            self.counters["definitely_free"] += 1
+            return True
+        ## Probably taken, only the database knows for sure
+        self.counters["queries"] += 1
+        queryset, lookups = self.get_source()
+        taken = queryset.filter(**{lookups[field][1]: value}).exists()
+        self.counters["taken"] += taken
+        return not taken
+
+    def stats(self):
+        """
+        Memory used by the filter, its expected false positive rate, and the one observed: the share of free values which had to be checked in the database.
+        """
+        if self.filter is None:
+            return {"built": False, **self.counters}
+        free_values = (
+            self.counters["definitely_free"] + self.counters["queries"]
+        ) - self.counters["taken"]
+        false_positives = self.counters["queries"] - self.counters["taken"]
+        return {
+            "built": True,
+            "items": self.filter.item_count,
+            "capacity": self.capacity,
+            "memory_bytes": len(self.filter.bits),
+            "hash_functions": self.filter.hash_count,
+            "expected_false_positive_rate": self.filter.false_positive_rate(),
+            "observed_false_positive_rate": (
+                false_positives / free_values if free_values else 0.0
+            ),
+            **self.counters,
+        }
+
+
+availability_filter = AvailabilityFilter()
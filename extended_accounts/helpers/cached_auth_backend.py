@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+from django.conf import settings
+
+ACCOUNT_CACHE_KEY = "extended_accounts:account:v1:{}"  ## Bump the version if the cached objects change their shape
+
+
+def get_account_cache():
+    return caches[getattr(settings, "ACCOUNT_CACHE_ALIAS", "default")]
+
+
+def invalidate_cached_accounts(account_ids, using=None):
+    """
+    Drop the cached accounts, right away and again once the current transaction commits: otherwise, a request running meanwhile could cache the rows as they were before the commit.
+    """
+    keys = [ACCOUNT_CACHE_KEY.format(account_id) for account_id in account_ids]
+    if not keys:
+        return
+    get_account_cache().delete_many(keys)
+    transaction.on_commit(lambda: get_account_cache().delete_many(keys), using=using)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose get_user serves the account, together with its profile, from the cache. AuthenticationMiddleware calls get_user on every request, so authenticated requests don't query the accounts nor the profiles tables anymore (request.user.profile is already there).
+    The entries are dropped by the save and delete signals of AccountModel and ProfileModel, ACCOUNT_CACHE_TIMEOUT only bounds how long an account changed through queryset.update() may be served stale. The session is still verified against the cached password hash, which changes with the password.
+    The permissions of each account are cached as well, across requests: Django only caches them in the user instance, so every request would query them again. They're keyed by the global permissions version, which is bumped whenever groups, memberships or permissions change (see permission_cache).
+    To use it, set AUTHENTICATION_BACKENDS = ["extended_accounts.helpers.CachedModelBackend"].
+    """
+
+    def get_user(self, user_id):
+        cache = get_account_cache()
+        key = ACCOUNT_CACHE_KEY.format(user_id)
+        account = cache.get(key)
+        if account is None:
+            try:
+                account = (
+                    get_user_model()
+                    ._default_manager.select_related("profile")
+                    .get(pk=user_id)
+                )
+            except get_user_model().DoesNotExist:
+                return None
+            cache.set(key, account, getattr(settings, "ACCOUNT_CACHE_TIMEOUT", 300))
+        return account if self.user_can_authenticate(account) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        from extended_accounts.helpers.permission_cache import (
+            get_cached_permissions,
+            permissions_cache_key,
+        )
+
+        if (
+            not user_obj.is_active
+            or user_obj.is_anonymous
+            or obj is not None
+            or hasattr(user_obj, "_perm_cache")
+        ):  ## Nothing to cache or already cached in the instance
+            return super().get_all_permissions(user_obj, obj=obj)
+        user_obj._perm_cache = get_cached_permissions(
+            permissions_cache_key("account", user_obj.pk),
+            lambda: super(CachedModelBackend, self).get_all_permissions(user_obj),
+        )
+        return user_obj._perm_cache
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.conf import settings
+from django.utils import timezone
+from .account_sharding import get_account_shards
+import atexit, logging, threading
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Buffer of last_login timestamps kept in the memory of the process. Instead of an UPDATE per login, the buffered timestamps are written in a single batched UPDATE once LAST_LOGIN_FLUSH_SIZE accounts are waiting or LAST_LOGIN_FLUSH_INTERVAL seconds after the first of them was buffered, whatever comes first.
+    So last_login may be stale in the database by up to LAST_LOGIN_FLUSH_INTERVAL seconds. The timestamps still buffered when the process exits are flushed, but they're lost if it crashes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.timer = None
+
+    def record(self, account):
+        now = timezone.now()
+        ## The instance in the request is up to date right away
+        account.last_login = now
+        ## Sharded accounts are written back to their shard, the others to the database picked by the routers (not the replica they may have been read from)
+        using = account._state.db if account._state.db in get_account_shards() else None
+        with self.lock:
+            self.entries[account.pk] = (using, now)
+            full = len(self.entries) >= getattr(settings, "LAST_LOGIN_FLUSH_SIZE", 500)
+            if not full and self.timer is None:
+                self.timer = threading.Timer(
+                    getattr(settings, "LAST_LOGIN_FLUSH_INTERVAL", 60),
+                    self.flush_quietly,
+                )
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered timestamps in a single UPDATE per database (per shard if the accounts are sharded) and return how many accounts were updated.
+        """
+        with self.lock:
+            entries, self.entries = self.entries, {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        databases = {}
+        for pk, (using, last_login) in entries.items():
+            databases.setdefault(using, {})[pk] = last_login
+        return sum(
+            get_user_model()
+            ._default_manager.db_manager(using)
+            .filter(pk__in=last_logins)
+            .update(
+                last_login=Case(
+                    *[
+                        When(pk=pk, then=Value(last_login))
+                        for pk, last_login in last_logins.items()
+                    ],
+                    output_field=DateTimeField(),
+                )
+            )
+            for using, last_logins in databases.items()
+        )
+
+    def flush_quietly(self):
+        """
+        Flush from the timer thread or at exit, where nobody would handle an error.
+        """
+        try:
+            self.flush()
+        except Exception:
+            logger.warning("Could not flush the buffered last logins", exc_info=True)
+        finally:
+            connections.close_all()  ## Connections are per thread, the timer's ones would leak otherwise
+
+
+last_login_buffer = LastLoginBuffer()
+atexit.register(last_login_buffer.flush_quietly)
+
+
+def buffer_last_login(sender, user, **kwargs):
+    """
+    Replacement for django.contrib.auth.models.update_last_login, connected to user_logged_in when LAST_LOGIN_BUFFER is True.
+    """
+    last_login_buffer.record(user)
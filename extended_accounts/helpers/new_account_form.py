@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers.profile_image_field import ProfileImageField
 
 
 class NewAccountForm(UserCreationForm):
@@ -19,7 +20,7 @@ class NewAccountForm(UserCreationForm):
         ],
         label="Phone Number",
     )
-    profile_image = forms.ImageField(required=False, label="Profile image")
+    profile_image = ProfileImageField(required=False, label="Profile image")
 
     def __init__(self, *args, **kwargs):  ## We remove the help texts which look ugly
         super().__init__(*args, **kwargs)
@@ -35,10 +36,19 @@ class NewAccountForm(UserCreationForm):
         )  ## If cleaned data, password1==password2 contains the password information
         return Account.objects.create_user(**self.cleaned_data)
 
+    def clean_username(self):
+        ## Soft-deleted accounts keep their username until they're purged, so they're checked as well
+        username = self.cleaned_data.get("username")
+        if username and Account.all_objects.filter(username__iexact=username).exists():
+            raise ValidationError(
+                self.instance.unique_error_message(Account, ["username"])
+            )
+        return username
+
     def clean_email(self):
         email = self.cleaned_data.get("email")
         try:  # Check if the email is already associated with an user
-            Account.objects.get(email=email)
+            Account.all_objects.get(email=email)
         except Account.DoesNotExist:
             pass
         else:
@@ -50,7 +60,7 @@ class NewAccountForm(UserCreationForm):
     def clean_phone_number(self):
         phone_number = self.cleaned_data.get("phone_number")
         try:  # Check if the phone number is already associated with an user
-            Account.objects.get(profile__phone_number=phone_number)
+            Account.all_objects.get(profile__phone_number=phone_number)
         except Account.DoesNotExist:
             pass
         else:
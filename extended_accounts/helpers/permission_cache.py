@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.conf import settings
+from extended_accounts.helpers.cached_auth_backend import get_account_cache
+import time
+
+PERMISSIONS_VERSION_KEY = "extended_accounts:permissions_version"
+
+
+def get_permissions_version():
+    """
+    Return the global permissions version, which is part of every cached permission key: bumping it invalidates all of them at once.
+    """
+    cache = get_account_cache()
+    version = cache.get(PERMISSIONS_VERSION_KEY)
+    ## If it's been evicted or never set, starting from the clock makes sure no version used before is reused
+    if version is None:
+        cache.add(PERMISSIONS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(PERMISSIONS_VERSION_KEY, 0)
+    return version
+
+
+def bump_permissions_version(using=None):
+    """
+    Invalidate every cached permission, right away and again once the current transaction commits, so no request caches the permissions as they were before the commit.
+    """
+
+    def bump():
+        try:
+            get_account_cache().incr(PERMISSIONS_VERSION_KEY)
+        except ValueError:  ## Not set, the next read starts a new version anyway
+            pass
+
+    bump()
+    transaction.on_commit(bump, using=using)
+
+
+def permissions_cache_key(*parts):
+    return f"extended_accounts:permissions:{get_permissions_version()}:" + ":".join(
+        str(part) for part in parts
+    )
+
+
+def get_cached_permissions(key, compute):
+    """
+    Return the permissions cached under the key, computing and caching them if they aren't there.
+    """
+    cache = get_account_cache()
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = compute()
+        cache.set(
+            key, permissions, getattr(settings, "PERMISSIONS_CACHE_TIMEOUT", 3600)
+        )
+    return permissions
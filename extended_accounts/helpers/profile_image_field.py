@@ -0,0 +1,49 @@
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image
+from io import BytesIO
+import hashlib
+
+
+class ProfileImageField(forms.ImageField):
+    """
+    ImageField which decodes the upload instead of just verifying it. The decoded image and the SHA-256 digest of the content are attached to the upload as decoded_image and sha256, so pre_save_profile_model reuses them instead of reading the file again: each upload is read and decoded only once.
+    As decoding loads the whole image in memory, images with more than PROFILE_IMAGE_MAX_PIXELS pixels are rejected before being decoded.
+    """
+
+    def to_python(self, data):
+        f = forms.FileField.to_python(
+            self, data
+        )  ## Skip forms.ImageField.to_python, which parses the upload just to verify it and throws the parsed image away
+        if f is None:
+            return None
+        if hasattr(data, "temporary_file_path"):
+            with open(data.temporary_file_path(), "rb") as file:
+                content = file.read()
+        else:
+            data.seek(0)
+            content = data.read()
+        ## The content is read once: it's hashed and decoded from memory. Storing the upload afterwards doesn't read it again when it's a temporary file, as it's moved into place
+        f.sha256 = hashlib.sha256(content).hexdigest()
+        max_pixels = getattr(settings, "PROFILE_IMAGE_MAX_PIXELS", 25_000_000)
+        try:
+            image = Image.open(BytesIO(content))
+            if image.width * image.height > max_pixels:
+                raise ValidationError(
+                    f"The profile image cannot have more than {max_pixels} pixels.",
+                    code="too_many_pixels",
+                )
+            image.load()  ## Unlike verify(), load() leaves the image usable, and it also spots truncated files
+            f.image = f.decoded_image = image
+            f.content_type = Image.MIME.get(image.format)
+        except ValidationError:
+            raise
+        except Exception as exc:  ## Pillow doesn't recognize it as an image
+            raise ValidationError(
+                self.error_messages["invalid_image"],
+                code="invalid_image",
+            ) from exc
+        if hasattr(f, "seek") and callable(f.seek):
+            f.seek(0)
+        return f
@@ -0,0 +1,162 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+import logging, os, posixpath, secrets
+
+logger = logging.getLogger(__name__)
+
+## Images stored before the manifest existed don't know their files, they were stored next to their conversions as <name>.<extension>. Files with any other extension are left untouched.
+LEGACY_IMAGE_EXTENSIONS = ["webp", "png", "jpg", "jpeg", "gif", "bmp", "tiff"]
+
+
+def legacy_image_files(name, storage=None):
+    """
+    Return the files of an image stored before the manifest existed (its profile_image_files is empty), probing the legacy extensions next to it. Without storage, every candidate name is returned without touching the storage, which is enough to delete them: deleting a missing file does nothing.
+    """
+    names = [f"{name}.{extension}" for extension in LEGACY_IMAGE_EXTENSIONS]
+    if storage is None:
+        return names
+    return [name for name in names if storage.exists(name)]
+
+
+def save_image_file(storage, name, content):
+    """
+    Save a profile image file under the given name, replacing any previous file with that name, and return the name.
+    On the local filesystem, the content is written to a temporary file next to the final one which is then renamed into place, so a crash in the middle of the write never leaves a truncated image behind that name. Leftover temporary files are collected by the gc_profile_media command. Other backends (eg: object stores) already make an object visible only once it's been completely uploaded, and replace the previous one at once.
+    """
+    if not isinstance(storage, FileSystemStorage):
+        ## Storage.save would pick another name if the file exists, so the file is overwritten in place through the backend's _save (what save calls once it's got a free name) instead of being deleted first: object stores replace the object in a single upload, it's never missing meanwhile
+        name = storage._save(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        return name
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{secrets.token_hex(8)}.tmp"
+    try:
+        if hasattr(
+            content, "temporary_file_path"
+        ):  ## Uploads spooled to disk are moved, not copied
+            file_move_safe(content.temporary_file_path(), temporary_path)
+        else:
+            with open(
+                os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666),
+                "wb",
+            ) as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+        if storage.file_permissions_mode is not None:
+            os.chmod(temporary_path, storage.file_permissions_mode)
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return name
+
+
+def delete_image_files(storage, names):
+    """
+    Delete the given files from the storage holding the profile images.
+    Storage backends able to delete several objects in a single request (eg: S3 DeleteObjects) may expose a delete_many(names) method, in that case the whole batch is sent at once. Otherwise the files are deleted one by one through the standard Storage API.
+    """
+    names = list(names)
+    if not names:
+        return
+    if hasattr(storage, "delete_many"):
+        try:
+            storage.delete_many(names)
+        except Exception:
+            logger.warning(
+                "Could not delete the profile image files %s", names, exc_info=True
+            )
+        return
+    for name in names:
+        try:
+            storage.delete(name)
+        except (
+            Exception
+        ):  ## Deleting an image must never break the request, whatever is left behind is collected by the gc_profile_media command
+            logger.warning(
+                "Could not delete the profile image file %s", name, exc_info=True
+            )
+
+
+def trigger_delete_profile_image_files(names, digest=None):
+    from .tasks import delete_profile_image_files
+
+    if (
+        settings.TESTING ^ settings.INTEGRATION_TEST_CELERY
+    ):  ## If we are running tests, we don't rely on Celery (external dependency) and the files are deleted right away. We only launch the task in case we are testing the Celery integration
+        delete_profile_image_files(names, digest=digest)
+        return
+    if digest is None:
+        delete_profile_image_files.delay(names)
+    else:
+        delete_profile_image_files.delay(names, digest=digest)
+
+
+def delete_image_files_on_commit(names, using=None, digest=None):
+    """
+    Schedule the deletion of the given profile image files once the current transaction commits, the whole batch is deleted in background by a Celery task. If the transaction is rolled back, nothing is deleted, so the database never points to a removed image.
+    Files of a content-addressed image are given with its digest, so the task can check the image hasn't been uploaded again meanwhile.
+    """
+    names = list(names)
+    if names:
+        transaction.on_commit(
+            lambda: trigger_delete_profile_image_files(names, digest),
+            using=using,
+        )
+
+
+def delete_unreferenced_blob_files(storage, names, digest):
+    """
+    Delete the files of a content-addressed image released by its last profile, together with its blob, unless it's been uploaded again since: the upload reuses the blob left at ref_count=0 (and its file names), so the blob is locked and checked before deleting anything.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        blob = (
+            ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+            .select_for_update()
+            .filter(digest=digest)
+            .first()
+        )
+        if blob is not None and blob.ref_count > 0:
+            return
+        delete_image_files(storage, names)
+        if blob is not None:
+            blob.delete()
+
+
+def release_profile_image(name, files, using=None):
+    """
+    Drop a profile's reference to its image. The image files are only deleted (once the transaction commits) when no other profile uses the same content-addressed image anymore. Images stored before deduplication existed don't have a blob, so their files are deleted directly (probed by extension if they're older than the manifest).
+    The blob of an image released by its last profile is kept at ref_count=0 until its files are deleted, so an upload of the same image meanwhile takes it back instead of having its files deleted under it.
+    Blobs live in the default database whatever the database of the profile (eg: its shard), so the references are counted across every database.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        blob = (
+            ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+            .select_for_update()
+            .filter(digest=posixpath.basename(name))
+            .first()
+        )
+        if blob is None:
+            delete_image_files_on_commit(files or legacy_image_files(name), using=using)
+        elif blob.ref_count > 1:
+            ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS).filter(pk=blob.pk).update(
+                ref_count=F("ref_count") - 1
+            )
+        else:
+            ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS).filter(pk=blob.pk).update(
+                ref_count=0
+            )
+            delete_image_files_on_commit(
+                blob.files, using=DEFAULT_DB_ALIAS, digest=blob.digest
+            )
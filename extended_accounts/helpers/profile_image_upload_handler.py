@@ -0,0 +1,93 @@
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.conf import settings
+
+PROFILE_IMAGE_FIELD = "profile_image"
+PROFILE_IMAGE_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  ## JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",
+    b"II*\x00",  ## TIFF, little endian
+    b"MM\x00*",  ## TIFF, big endian
+)
+PROFILE_IMAGE_HEADER_SIZE = 12  ## Enough bytes to recognize every format above and WebP
+
+
+def is_image_header(header):
+    if (
+        header[:4] == b"RIFF"
+    ):  ## WebP is a RIFF container announcing its format at byte 8
+        return header[8:12] == b"WEBP"
+    return header.startswith(PROFILE_IMAGE_SIGNATURES)
+
+
+class ProfileImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler guarding the profile_image field. It has to be placed first in FILE_UPLOAD_HANDLERS: it doesn't store anything, it only looks at the chunks flowing to the next handlers.
+    The upload is aborted as soon as the first bytes don't look like an image or the streamed size goes beyond PROFILE_IMAGE_MAX_UPLOAD_SIZE, so bad payloads are neither buffered in memory nor spooled to disk.
+    The reason is left in request.profile_image_upload_error, ProfileImageUploadErrorMixin turns it into a form error.
+    """
+
+    chunk_size = (
+        4 * 2**10
+    )  ## Small chunks, so a bad upload is rejected within a few KB. Django uses the smallest chunk size among the handlers
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.header = b""
+        self.max_size = getattr(settings, "PROFILE_IMAGE_MAX_UPLOAD_SIZE", 5 * 2**20)
+        if (
+            self.field_name == PROFILE_IMAGE_FIELD
+            and self.content_length
+            and self.content_length > self.max_size
+        ):  ## The part announced its own size, no need to read a single byte
+            self.reject(self.size_error())
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name != PROFILE_IMAGE_FIELD:
+            return raw_data
+        if start + len(raw_data) > self.max_size:
+            self.reject(self.size_error())
+        if len(self.header) < PROFILE_IMAGE_HEADER_SIZE:
+            self.header += raw_data[: PROFILE_IMAGE_HEADER_SIZE - len(self.header)]
+            if len(self.header) == PROFILE_IMAGE_HEADER_SIZE:
+                self.check_header()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if (
+            self.field_name == PROFILE_IMAGE_FIELD
+            and file_size
+            and len(self.header) < PROFILE_IMAGE_HEADER_SIZE
+        ):  ## Files shorter than the header cannot be images. Empty files are left to the form, which reports them as such
+            self.check_header()
+        return None  ## The next handlers build the uploaded file
+
+    def check_header(self):
+        if not is_image_header(self.header):
+            self.reject(
+                "Upload a valid image. The file you uploaded was either not an image or a corrupted image."
+            )
+
+    def size_error(self):
+        return f"The profile image cannot be larger than {self.max_size // 2**10} KB."
+
+    def reject(self, error):
+        if self.request is not None:
+            self.request.profile_image_upload_error = error
+        ## The rest of the request body is read and discarded without being buffered, so the client gets the form with the error instead of a reset connection
+        raise StopUpload(connection_reset=False)
+
+
+class ProfileImageUploadErrorMixin:
+    """
+    Mixin for the views whose form has a profile_image field. If ProfileImageUploadHandler aborted the upload, the form is bound with the rejection reason as a profile_image error, so it's never valid.
+    """
+
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        error = getattr(self.request, "profile_image_upload_error", None)
+        if error is not None and form.is_bound:
+            form.add_error(PROFILE_IMAGE_FIELD, error)
+        return form
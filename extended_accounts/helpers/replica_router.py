@@ -0,0 +1,87 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.conf import settings
+from contextvars import ContextVar
+import random
+
+## Whether the reads of the current request (or thread, outside requests) must go to the primary, and whether it has written to it
+pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+wrote_to_primary = ContextVar("wrote_to_primary", default=False)
+
+
+def get_replica_databases():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+def pin_to_primary():
+    """
+    Send the next reads of the current request to the primary, eg: before reading something which must be up to date to write it back.
+    """
+    pinned_to_primary.set(True)
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router sending the writes to the primary (default) database and the reads to one of the REPLICA_DATABASES, picked at random. Without replicas, everything goes to the primary.
+    Replicas lag behind the primary, so once a request writes, the rest of its reads go to the primary, and ReplicaPinningMiddleware keeps the following requests of the same client on the primary for REPLICA_PIN_SECONDS: users always see their own updates. Outside requests (commands, Celery tasks...), the pin lasts as long as the thread.
+    """
+
+    def is_elsewhere(self, hints):
+        ## Objects from any other database (eg: a shard) stay there, the router has no opinion about them
+        instance = hints.get("instance")
+        return instance is not None and instance._state.db not in [
+            None,
+            DEFAULT_DB_ALIAS,
+            *get_replica_databases(),
+        ]
+
+    def db_for_read(self, model, **hints):
+        if self.is_elsewhere(hints):
+            return None
+        replicas = get_replica_databases()
+        if not replicas or pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if self.is_elsewhere(hints):
+            return None
+        pinned_to_primary.set(True)
+        wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        ## Replicas hold the same data as the primary, so objects read from any of them can be related
+        databases = {DEFAULT_DB_ALIAS, *get_replica_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pin to the primary database the requests sent by a client during REPLICA_PIN_SECONDS after it wrote, through the REPLICA_PIN_COOKIE cookie. It should be placed before any middleware reading the database (sessions, authentication...).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_replica_databases():
+            return self.get_response(request)
+        cookie = getattr(settings, "REPLICA_PIN_COOKIE", "pin_primary")
+        pinned_token = pinned_to_primary.set(cookie in request.COOKIES)
+        wrote_token = wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if wrote_to_primary.get():
+                response.set_cookie(
+                    cookie,
+                    "1",
+                    max_age=getattr(settings, "REPLICA_PIN_SECONDS", 10),
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+        finally:
+            pinned_to_primary.reset(pinned_token)
+            wrote_to_primary.reset(wrote_token)
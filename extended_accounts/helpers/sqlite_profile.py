@@ -0,0 +1,48 @@
+from django.conf import settings
+import types
+
+## Pragmas set on every new connection by the profile. Override them with the SQLITE_PRAGMAS setting, None leaves a pragma alone
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  ## Readers don't block the writer nor the other way round
+    "synchronous": "NORMAL",  ## Safe with WAL: a power loss may lose the last commits, never corrupt the database
+    "busy_timeout": 5000,  ## Milliseconds a writer waits for the lock before failing with "database is locked"
+    "mmap_size": 268435456,  ## Reads through 256MB of memory-mapped I/O
+    "cache_size": -65536,  ## 64MB of page cache per connection (negative values are KiB)
+    "temp_store": "MEMORY",
+}
+
+
+def get_sqlite_pragmas():
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def uses_sqlite_profile(connection):
+    """
+    SQLITE_PRODUCTION_PROFILE is either True, for every SQLite database, or the list of the database aliases using the profile.
+    """
+    enabled = getattr(settings, "SQLITE_PRODUCTION_PROFILE", False)
+    if connection.vendor != "sqlite" or not enabled:
+        return False
+    return enabled is True or connection.alias in enabled
+
+
+def start_immediate_transaction(self):
+    ## Django opens its transactions with a plain (deferred) BEGIN, which only takes the write lock at the first write. A transaction reading before it writes then fails right away with "database is locked" if another connection wrote meanwhile, without waiting for the busy timeout. BEGIN IMMEDIATE takes the write lock upfront, so writers queue on the busy timeout instead
+    self.cursor().execute("BEGIN IMMEDIATE")
+
+
+def apply_sqlite_profile(sender, connection, **kwargs):
+    """
+    Receiver of connection_created applying the production profile to the new SQLite connections: WAL journaling, synchronous=NORMAL, a busy timeout, memory-mapped I/O and a larger page cache, and transactions taking the write lock as soon as they begin (like the transaction_mode="IMMEDIATE" option of Django 5.1).
+    In-memory databases (eg: the tests ones) can't use WAL, SQLite keeps them in memory journaling.
+    """
+    if not uses_sqlite_profile(connection):
+        ## Back to Django's transactions, in case the profile was disabled since the previous connection
+        connection.__dict__.pop("_start_transaction_under_autocommit", None)
+        return
+    for name, value in get_sqlite_pragmas().items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+    connection._start_transaction_under_autocommit = types.MethodType(
+        start_immediate_transaction, connection
+    )
@@ -1,4 +1,9 @@
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from .profile_image_storage import delete_image_files, delete_unreferenced_blob_files
+from .account_sharding import get_account_shards
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.conf import settings
 from celery import shared_task
 
 
@@ -11,3 +16,33 @@ def delete_unconfirmed_accounts(username):
             account.delete()
     except Account.DoesNotExist:  # If it doesn't exist, there's nothing to do.
         pass
+
+
+# This task is scheduled by the profile signals once the transaction replacing or deleting a profile image commits. It deletes the whole batch of files belonging to the previous image, out of the request/response cycle. For content-addressed images (given with their digest), it first checks that nobody uploaded the same image again meanwhile.
+@shared_task
+def delete_profile_image_files(names, digest=None):
+    storage = Profile._meta.get_field("profile_image").storage
+    if digest is None:
+        delete_image_files(storage, names)
+    else:
+        delete_unreferenced_blob_files(storage, names, digest)
+
+
+# This task is launched by the post_save signal of Account once the transaction soft-deleting an account commits. It hard-deletes every soft-deleted account, in batches of ACCOUNT_PURGE_BATCH_SIZE accounts, each one in its own transaction so a big backlog never holds a long transaction. It returns the number of accounts purged.
+@shared_task
+def purge_deleted_accounts():
+    batch_size = getattr(settings, "ACCOUNT_PURGE_BATCH_SIZE", 100)
+    purged = 0
+    ## Every shard if the accounts are sharded, the primary database otherwise (replicas may not have seen the last batch deleted yet)
+    for using in get_account_shards() or [DEFAULT_DB_ALIAS]:
+        accounts = Account.all_objects.db_manager(using)
+        while batch := list(
+            accounts.filter(deletion_requested_at__isnull=False)
+            .order_by("deletion_requested_at", "pk")
+            .values_list("pk", flat=True)[:batch_size]
+        ):
+            with transaction.atomic(using=using):
+                ## The collector cascades through the profile, groups, permissions... and the profile signals release the image files once the batch commits
+                accounts.filter(pk__in=batch).delete()
+            purged += len(batch)
+    return purged
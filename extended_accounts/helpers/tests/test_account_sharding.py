@@ -0,0 +1,265 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse_lazy
+from django.db.utils import IntegrityError
+from django.core.management import call_command
+from django.core.cache import cache
+from django.contrib.auth.forms import PasswordResetForm
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import AccountLookupModel as AccountLookup
+from extended_accounts.models import AccountDirectoryModel as AccountDirectory
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.models.tests.test_profile_image_blob import create_test_image
+from extended_accounts.helpers import (
+    NewAccountForm,
+    purge_deleted_accounts,
+    rebuild_account_directory,
+)
+from extended_accounts.helpers.account_sharding import shard_for_username
+from extended_accounts.helpers.availability_filter import AvailabilityFilter
+from extended_accounts.helpers.last_login_buffer import LastLoginBuffer
+from io import StringIO
+import tempfile, shutil, os
+
+SHARDS = ["shard_0", "shard_1"]
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(ACCOUNT_SHARDS=SHARDS, MEDIA_ROOT=MEDIA_ROOT)
+class AccountShardingTestCase(TestCase):
+    databases = {"default", *SHARDS}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.accounts = [
+            Account.objects.create_user(
+                username=f"johndoe{i}",
+                email=f"johndoe{i}@mail.com",
+                phone_number=123456780 + i,
+                password="[Pass1234]",
+                is_active=True,
+            )
+            for i in range(6)
+        ]
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def __accounts_per_shard(self):
+        return [
+            next(account for account in self.accounts if account._state.db == shard)
+            for shard in SHARDS
+        ]
+
+    def test_placed_by_username_hash(self):
+        for account in self.accounts:
+            shard = shard_for_username(account.username)
+            self.assertEqual(account._state.db, shard)
+            self.assertTrue(Account.objects.using(shard).filter(pk=account.pk).exists())
+            self.assertEqual(account.profile._state.db, shard)
+            self.assertEqual(AccountLookup.objects.get(pk=account.pk).shard, shard)
+        ## Both shards are used, and nothing is left in the default database
+        self.assertEqual({account._state.db for account in self.accounts}, set(SHARDS))
+        self.assertFalse(Account.objects.using("default").exists())
+        ## Ids are unique across shards
+        self.assertEqual(len({account.pk for account in self.accounts}), 6)
+
+    def test_lookups_routed(self):
+        for account in self.accounts:
+            with self.assertNumQueries(1, using="default"):  ## The lookup table
+                self.assertEqual(
+                    Account.objects.for_username(account.username).db,
+                    account._state.db,
+                )
+            self.assertEqual(Account.objects.get(pk=account.pk), account)
+            self.assertEqual(Account.objects.get(email=account.email), account)
+            self.assertEqual(
+                Account.objects.get(profile__phone_number=account.profile.phone_number),
+                account,
+            )
+            self.assertEqual(
+                Account.objects.get(username=account.username).profile.phone_number,
+                account.profile.phone_number,
+            )
+        self.assertFalse(Account.objects.for_username("janedoe").exists())
+        with self.assertRaises(Account.DoesNotExist):
+            Account.objects.get(username="janedoe")
+
+    def test_global_uniqueness(self):
+        account = self.accounts[0]
+        other_shard = next(shard for shard in SHARDS if shard != account._state.db)
+        ## A username which would be placed in the other shard
+        username = next(
+            f"janedoe{i}"
+            for i in range(100)
+            if shard_for_username(f"janedoe{i}") == other_shard
+        )
+        with self.assertRaises(IntegrityError):
+            Account.objects.create_user(
+                username=username, email=account.email, phone_number=987654321
+            )
+        with self.assertRaises(IntegrityError):
+            Account.objects.create_user(
+                username=username,
+                email="janedoe@mail.com",
+                phone_number=account.profile.phone_number,
+            )
+        ## Nothing left behind
+        self.assertFalse(Account.objects.filter(username=username).exists())
+        self.assertFalse(
+            Account.objects.using(other_shard).filter(username=username).exists()
+        )
+        self.assertEqual(AccountLookup.objects.count(), 6)
+        ## The forms check every shard too
+        form = NewAccountForm(
+            {
+                "username": username,
+                "first_name": "Jane",
+                "last_name": "Doe",
+                "email": account.email,
+                "phone_number": account.profile.phone_number,
+                "password1": "[Pass1234]",
+                "password2": "[Pass1234]",
+            }
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("email", form.errors)
+        self.assertIn("phone_number", form.errors)
+
+    def test_update_synced_with_lookup_table(self):
+        account, other_account = self.accounts[0], self.accounts[1]
+        account.update(username="janedoe", email="janedoe@mail.com")
+        self.assertEqual(
+            AccountLookup.objects.filter(pk=account.pk)
+            .values_list("username", "email")
+            .get(),
+            ("janedoe", "janedoe@mail.com"),
+        )
+        ## Renamed accounts stay in their shard and are still found
+        self.assertEqual(Account.objects.for_username("janedoe").get(), account)
+        with self.assertRaises(IntegrityError):
+            account.update(phone_number=other_account.profile.phone_number)
+        self.assertEqual(
+            AccountLookup.objects.get(pk=account.pk).phone_number,
+            account.profile.phone_number,
+        )
+
+    def test_lookup_table_untouched_by_unrelated_update_fields(self):
+        account = self.accounts[0]
+        with self.assertNumQueries(0, using="default"):
+            account.save(update_fields=["last_login"])
+
+    def test_delete_frees_lookup_row(self):
+        account = self.accounts[0]
+        account.delete()
+        self.assertFalse(AccountLookup.objects.filter(pk=account.pk).exists())
+        self.accounts[1].request_deletion()
+        self.accounts[2].request_deletion()
+        self.assertEqual(purge_deleted_accounts(), 2)
+        self.assertEqual(AccountLookup.objects.count(), 3)
+
+    def test_views(self):
+        self.client.login(username="johndoe0", password="[Pass1234]")
+        for account in self.accounts:
+            response = self.client.get(
+                reverse_lazy(
+                    "extended_accounts:detail_account",
+                    kwargs={"username": account.username},
+                )
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context["object"], account)
+        response = self.client.get(reverse_lazy("extended_accounts:list_account"))
+        self.assertEqual(
+            [entry.username for entry in response.context["object_list"]],
+            [account.username for account in self.accounts],
+        )
+
+    def test_availability_filter(self):
+        availability_filter = AvailabilityFilter()
+        self.assertEqual(availability_filter.get_filter().item_count, 18)
+        self.assertFalse(availability_filter.is_available("username", "JohnDoe3"))
+        self.assertFalse(availability_filter.is_available("phone_number", 123456785))
+        self.assertTrue(availability_filter.is_available("email", "jane@mail.com"))
+
+    def test_profile_images_shared_across_shards(self):
+        accounts = self.__accounts_per_shard()
+        for account in accounts:
+            account.update(profile_image=create_test_image())
+        ## A single blob, in the default database, counts the profiles of every shard
+        blob = ProfileImageBlob.objects.using("default").get()
+        self.assertEqual(blob.ref_count, 2)
+        for shard in SHARDS:
+            self.assertFalse(ProfileImageBlob.objects.using(shard).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            accounts[0].update(profile_image=None)
+        self.assertEqual(ProfileImageBlob.objects.get().ref_count, 1)
+        for file in blob.files:
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, file)))
+        ## Nothing is orphaned while a profile of any shard uses the files
+        output = StringIO()
+        call_command(
+            "gc_profile_media", "--dry-run", "--grace-period", "0", stdout=output
+        )
+        self.assertNotIn("Orphaned profile image file", output.getvalue())
+
+    def test_profile_image_view(self):
+        account = self.__accounts_per_shard()[1]
+        account.update(profile_image=create_test_image())
+        url = reverse_lazy(
+            "extended_accounts:profile_image",
+            kwargs={"name": account.profile.profile_image.name},
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+        ## Images without blob are looked up in the profiles of every shard
+        ProfileImageBlob.objects.all().delete()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_rebuild_account_directory(self):
+        for shard in SHARDS:
+            AccountDirectory.objects.using(shard).all().delete()
+        self.assertEqual(rebuild_account_directory(), 6)
+        for shard in SHARDS:
+            self.assertEqual(
+                AccountDirectory.objects.using(shard).count(),
+                Account.objects.using(shard).count(),
+            )
+
+    def test_password_reset_users(self):
+        for account in self.__accounts_per_shard():
+            self.assertEqual(
+                list(PasswordResetForm().get_users(account.email.upper())), [account]
+            )
+
+    def test_last_login_buffer(self):
+        accounts = self.__accounts_per_shard()
+        buffer = LastLoginBuffer()
+        for account in accounts:
+            buffer.record(account)
+        buffer.timer.cancel()
+        with self.assertNumQueries(1, using="shard_0"), self.assertNumQueries(
+            1, using="shard_1"
+        ):  ## One UPDATE per shard
+            self.assertEqual(buffer.flush(), 2)
+        for account in accounts:
+            self.assertEqual(
+                Account.objects.get(pk=account.pk).last_login, account.last_login
+            )
+
+    def test_with_perm_cached(self):
+        cache.clear()
+        account = self.__accounts_per_shard()[1]
+        account.is_superuser = True
+        account.save(update_fields=["is_superuser"])
+        for shard in SHARDS:
+            self.assertEqual(
+                list(
+                    Account.objects.db_manager(shard).with_perm_cached(
+                        "extended_accounts.view_account"
+                    )
+                ),
+                [account] if shard == account._state.db else [],
+            )
+        with self.assertRaises(ValueError):
+            Account.objects.with_perm_cached("extended_accounts.view_account")
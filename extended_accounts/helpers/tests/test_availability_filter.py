@@ -0,0 +1,138 @@
+from django.test import TestCase, override_settings
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import availability_filter
+from extended_accounts.helpers.availability_filter import (
+    AvailabilityFilter,
+    BloomFilter,
+)
+from unittest.mock import patch
+
+
+class BloomFilterTestCase(TestCase):
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter(1000, 0.01)
+        items = [f"username:johndoe{i}" for i in range(1000)]
+        for item in items:
+            bloom_filter.add(item)
+        self.assertTrue(all(bloom_filter.might_contain(item) for item in items))
+
+    def test_false_positive_rate(self):
+        bloom_filter = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom_filter.add(f"username:johndoe{i}")
+        self.assertAlmostEqual(bloom_filter.false_positive_rate(), 0.01, delta=0.002)
+        false_positives = sum(
+            bloom_filter.might_contain(f"username:janedoe{i}") for i in range(10000)
+        )
+        self.assertLess(false_positives / 10000, 0.02)
+        ## About 9.6 bits per item for 1%
+        self.assertEqual(len(bloom_filter.bits), 1199)
+        self.assertEqual(bloom_filter.hash_count, 7)
+
+
+class AvailabilityFilterTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Account.objects.create_user(
+            username="JohnDoe", email="johndoe@mail.com", phone_number=123456789
+        )
+
+    def setUp(self):
+        self.filter = AvailabilityFilter()
+
+    def test_built_from_database(self):
+        ## The count to size it, then one query per field
+        with self.assertNumQueries(4):
+            self.filter.get_filter()
+        stats = self.filter.stats()
+        self.assertEqual(stats["items"], 3)
+        self.assertEqual(stats["capacity"], 1000)
+        self.assertGreater(stats["memory_bytes"], 0)
+        self.assertLess(stats["expected_false_positive_rate"], 0.01)
+
+    def test_free_values_without_query(self):
+        self.filter.get_filter()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.filter.is_available("username", "janedoe"))
+            self.assertTrue(self.filter.is_available("email", "janedoe@mail.com"))
+            self.assertTrue(self.filter.is_available("phone_number", 987654321))
+        self.assertEqual(self.filter.counters["definitely_free"], 3)
+
+    def test_taken_values_checked_in_database(self):
+        self.filter.get_filter()
+        with self.assertNumQueries(3):
+            ## Usernames differing in their case are taken as well
+            self.assertFalse(self.filter.is_available("username", "johndoe"))
+            self.assertFalse(self.filter.is_available("email", "johndoe@mail.com"))
+            self.assertFalse(self.filter.is_available("phone_number", 123456789))
+        stats = self.filter.stats()
+        self.assertEqual((stats["queries"], stats["taken"]), (3, 3))
+        self.assertEqual(stats["observed_false_positive_rate"], 0.0)
+
+    def test_false_positive_checked_in_database(self):
+        self.filter.get_filter()
+        with patch.object(self.filter.filter, "might_contain", return_value=True):
+            with self.assertNumQueries(1):
+                self.assertTrue(self.filter.is_available("username", "janedoe"))
+        self.assertEqual(self.filter.stats()["observed_false_positive_rate"], 1.0)
+
+    def test_kept_up_to_date_by_signals(self):
+        availability_filter.build()
+        account = Account.objects.create_user(
+            username="janedoe", email="janedoe@mail.com", phone_number=987654321
+        )
+        self.assertFalse(availability_filter.is_available("username", "janedoe"))
+        self.assertFalse(availability_filter.is_available("phone_number", 987654321))
+        account.update(email="jane@mail.com")
+        self.assertFalse(availability_filter.is_available("email", "jane@mail.com"))
+        ## The released email is still in the filter, it just costs a query
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                availability_filter.is_available("email", "janedoe@mail.com")
+            )
+
+    def test_rebuilt_when_too_old(self):
+        self.filter.get_filter()
+        with patch.object(self.filter, "start_rebuild") as start_rebuild:
+            with self.assertNumQueries(0):
+                self.filter.get_filter()
+            start_rebuild.assert_not_called()
+            with override_settings(AVAILABILITY_FILTER_MAX_AGE=0):
+                ## The current filter answers, the new one is built in the background
+                current_filter = self.filter.filter
+                with self.assertNumQueries(0):
+                    self.assertIs(self.filter.get_filter(), current_filter)
+                    self.filter.get_filter()
+                start_rebuild.assert_called_once()
+        with self.assertNumQueries(4):
+            self.filter.rebuild_quietly()
+        self.assertIsNot(self.filter.filter, current_filter)
+        self.assertFalse(self.filter.rebuilding)
+
+    def test_rebuilt_when_full(self):
+        self.filter.get_filter()
+        for i in range(1001):
+            self.filter.add("username", f"janedoe{i}")
+        with patch.object(self.filter, "start_rebuild") as start_rebuild:
+            self.filter.get_filter()
+        start_rebuild.assert_called_once()
+        self.filter.build()
+        self.assertEqual(self.filter.stats()["items"], 3)
+
+    def test_values_added_while_rebuilding_kept(self):
+        self.filter.get_filter()
+        with override_settings(AVAILABILITY_FILTER_MAX_AGE=0):
+            with patch.object(self.filter, "start_rebuild"):
+                self.filter.get_filter()
+        ## Saved after the rebuild read the database
+        self.filter.add("username", "janedoe")
+        with patch.object(
+            self.filter,
+            "get_source",
+            return_value=(Account.objects.none(), self.filter.lookups),
+        ):
+            self.filter.build()
+        self.assertTrue(
+            self.filter.filter.might_contain(self.filter.key("username", "janedoe"))
+        )
+        self.assertEqual(self.filter.pending, [])
@@ -0,0 +1,79 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.helpers import CachedModelBackend
+
+
+@override_settings(
+    AUTHENTICATION_BACKENDS=["extended_accounts.helpers.CachedModelBackend"]
+)
+class CachedModelBackendTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            first_name="John",
+            password="testpassword",
+        )
+        self.account.update(is_active=True)
+        self.backend = CachedModelBackend()
+
+    def test_get_user_from_cache(self):
+        with self.assertNumQueries(1):  ## Account and profile in a single query
+            account = self.backend.get_user(self.account.pk)
+            self.assertEqual(account.profile.first_name, "John")
+        with self.assertNumQueries(0):
+            account = self.backend.get_user(self.account.pk)
+            self.assertEqual(account, self.account)
+            self.assertEqual(account.profile.first_name, "John")
+
+    def test_unknown_user(self):
+        self.assertIsNone(self.backend.get_user(self.account.pk + 1))
+
+    def test_inactive_user(self):
+        self.account.update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.account.pk))
+
+    def test_invalidated_on_account_save(self):
+        self.backend.get_user(self.account.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(email="john@mail.com")
+        self.assertEqual(self.backend.get_user(self.account.pk).email, "john@mail.com")
+
+    def test_invalidated_on_profile_save(self):
+        self.backend.get_user(self.account.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(first_name="Johnny")
+        self.assertEqual(
+            self.backend.get_user(self.account.pk).profile.first_name, "Johnny"
+        )
+
+    def test_invalidated_on_delete(self):
+        self.backend.get_user(self.account.pk)
+        pk = self.account.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.delete()
+        self.assertIsNone(self.backend.get_user(pk))
+
+    def test_invalidated_on_soft_delete(self):
+        self.backend.get_user(self.account.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.request_deletion()
+        self.assertIsNone(self.backend.get_user(self.account.pk))
+
+    def test_authenticated_request_without_auth_queries(self):
+        self.client.login(username="johndoe", password="testpassword")
+        url = reverse_lazy("extended_accounts:redirect_account")
+        self.client.get(url)  ## Warm up the cache
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        for query in context.captured_queries:
+            self.assertNotIn(Account._meta.db_table, query["sql"])
+            self.assertNotIn(Profile._meta.db_table, query["sql"])
@@ -0,0 +1,80 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.signals import user_logged_in
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import buffer_last_login
+from extended_accounts.helpers.last_login_buffer import LastLoginBuffer
+from unittest.mock import patch
+
+
+@override_settings(LAST_LOGIN_FLUSH_SIZE=3, LAST_LOGIN_FLUSH_INTERVAL=60)
+class LastLoginBufferTestCase(TestCase):
+    def setUp(self):
+        self.accounts = [
+            Account.objects.create_user(
+                username=f"johndoe{i}",
+                email=f"johndoe{i}@mail.com",
+                phone_number=123456780 + i,
+            )
+            for i in range(3)
+        ]
+        self.buffer = LastLoginBuffer()
+
+    def tearDown(self):
+        if self.buffer.timer is not None:
+            self.buffer.timer.cancel()
+
+    def __stored_last_logins(self):
+        return list(
+            Account.objects.filter(pk__in=[account.pk for account in self.accounts])
+            .order_by("pk")
+            .values_list("last_login", flat=True)
+        )
+
+    def test_buffered_until_flush(self):
+        with self.assertNumQueries(0):
+            self.buffer.record(self.accounts[0])
+            self.buffer.record(self.accounts[1])
+        self.assertIsNotNone(self.accounts[0].last_login)  ## In memory right away
+        self.assertEqual(self.__stored_last_logins(), [None, None, None])
+        self.assertIsNotNone(self.buffer.timer)  ## The flush is scheduled
+        with self.assertNumQueries(1):  ## Single batched UPDATE
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(
+            self.__stored_last_logins(),
+            [self.accounts[0].last_login, self.accounts[1].last_login, None],
+        )
+        self.assertIsNone(self.buffer.timer)
+        with self.assertNumQueries(0):  ## Nothing left
+            self.assertEqual(self.buffer.flush(), 0)
+
+    def test_flush_when_full(self):
+        for account in self.accounts:
+            self.buffer.record(account)
+        self.assertEqual(
+            self.__stored_last_logins(),
+            [account.last_login for account in self.accounts],
+        )
+        self.assertEqual(self.buffer.entries, {})
+
+    def test_flush_on_timer(self):
+        self.buffer.record(self.accounts[0])
+        with patch.object(self.buffer, "flush") as mock_flush, patch(
+            "extended_accounts.helpers.last_login_buffer.connections"
+        ):
+            self.buffer.timer.function()  ## What the timer runs once the interval is elapsed
+        mock_flush.assert_called_once()
+
+    def test_login_signal(self):
+        with patch(
+            "extended_accounts.helpers.last_login_buffer.last_login_buffer", self.buffer
+        ):
+            user_logged_in.connect(buffer_last_login, dispatch_uid="test_buffer")
+            try:
+                user_logged_in.send(
+                    sender=Account,
+                    request=RequestFactory().get("/"),
+                    user=self.accounts[0],
+                )
+            finally:
+                user_logged_in.disconnect(dispatch_uid="test_buffer")
+        self.assertIn(self.accounts[0].pk, self.buffer.entries)
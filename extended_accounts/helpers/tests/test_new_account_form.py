@@ -2,6 +2,7 @@ from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.helpers import NewAccountForm
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -69,11 +70,18 @@ class NewAccountFormTestCase(TestCase):
         self.assertEqual(account.profile.first_name, self.data["first_name"])
         self.assertEqual(account.profile.last_name, self.data["last_name"])
         self.assertEqual(account.profile.phone_number, self.data["phone_number"])
-        self.assertIn(
-            account.profile.profile_image.name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, account.profile.profile_image.name + ".png")
+            )
         )
-        self.assertIn(
-            account.profile.profile_image.name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(account.profile.profile_image.name, ".webp"),
+                )
+            )
         )
 
     ## VALIDATORS TESTS
@@ -101,6 +109,18 @@ class NewAccountFormTestCase(TestCase):
         form = NewAccountForm(data)
         self.assertFalse(form.is_valid())
 
+    def test_validator_soft_deleted_account_KO(self):
+        ## Soft-deleted accounts keep their values until they're purged
+        Account.objects.get(email="jdoe@mail.com").request_deletion()
+        for field, value in [
+            ("username", "JDoe"),
+            ("email", "jdoe@mail.com"),
+            ("phone_number", 987654321),
+        ]:
+            form = NewAccountForm(self.__modify_data({field: value}))
+            self.assertFalse(form.is_valid())
+            self.assertIn(field, form.errors)
+
     def test_validator_no_phone_number_KO(self):
         data = self.__modify_data({"phone_number": ""})
         form = NewAccountForm(data)
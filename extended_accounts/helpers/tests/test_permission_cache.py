@@ -0,0 +1,104 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import CachedModelBackend
+from extended_accounts.helpers.permission_cache import get_permissions_version
+
+BACKEND = "extended_accounts.helpers.CachedModelBackend"
+
+
+@override_settings(AUTHENTICATION_BACKENDS=[BACKEND])
+class PermissionCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            is_active=True,
+        )
+        self.permission = Permission.objects.create(
+            codename="view_report",
+            name="Can view report",
+            content_type=ContentType.objects.get_for_model(Account),
+        )
+        self.group = Group.objects.create(name="reporters")
+        self.backend = CachedModelBackend()
+
+    def __fresh_account(self):  ## A new request gets a new instance
+        return Account.objects.get(pk=self.account.pk)
+
+    def __has_perm(self):
+        return self.backend.has_perm(
+            self.__fresh_account(), "extended_accounts.view_report"
+        )
+
+    def __assert_bumped(self, change):
+        version = get_permissions_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(get_permissions_version(), version)
+
+    def test_permissions_cached_across_requests(self):
+        self.assertFalse(self.__has_perm())
+        account = self.__fresh_account()
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                self.backend.has_perm(account, "extended_accounts.view_report")
+            )
+
+    def test_membership_changes_invalidate(self):
+        self.assertFalse(self.__has_perm())
+        self.__assert_bumped(lambda: self.group.permissions.add(self.permission))
+        self.__assert_bumped(lambda: self.account.groups.add(self.group))
+        self.assertTrue(self.__has_perm())
+        self.__assert_bumped(lambda: self.group.user_set.remove(self.account))
+        self.assertFalse(self.__has_perm())
+        self.__assert_bumped(lambda: self.account.user_permissions.add(self.permission))
+        self.assertTrue(self.__has_perm())
+
+    def test_group_and_permission_changes_invalidate(self):
+        self.group.permissions.add(self.permission)
+        self.account.groups.add(self.group)
+        self.assertTrue(self.__has_perm())
+        self.__assert_bumped(self.group.delete)
+        self.assertFalse(self.__has_perm())
+        self.__assert_bumped(
+            lambda: Permission.objects.create(
+                codename="edit_report",
+                name="Can edit report",
+                content_type=ContentType.objects.get_for_model(Account),
+            )
+        )
+        self.__assert_bumped(self.permission.delete)
+
+    def test_permission_flags_changes_invalidate(self):
+        self.__assert_bumped(lambda: self.account.update(is_superuser=True))
+        self.assertTrue(self.__has_perm())
+        ## Other changes keep the cached permissions
+        version = get_permissions_version()
+        self.account.update(email="john@mail.com")
+        self.assertEqual(get_permissions_version(), version)
+
+    def test_with_perm_cached(self):
+        self.account.user_permissions.add(self.permission)
+        self.assertEqual(
+            list(Account.objects.with_perm_cached("extended_accounts.view_report")),
+            [self.account],
+        )
+        with self.assertNumQueries(1):  ## Only the cheap lookup by primary key
+            self.assertEqual(
+                list(
+                    Account.objects.with_perm_cached(self.permission).values_list(
+                        "pk", flat=True
+                    )
+                ),
+                [self.account.pk],
+            )
+        self.account.user_permissions.remove(self.permission)
+        self.assertEqual(
+            list(Account.objects.with_perm_cached("extended_accounts.view_report")),
+            [],
+        )
@@ -0,0 +1,48 @@
+from django.test import TestCase, override_settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from extended_accounts.helpers import ProfileImageField
+from PIL import Image
+from io import BytesIO
+import hashlib
+
+
+def create_test_image(size=(1, 1)):
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", size)
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+class ProfileImageFieldTestCase(TestCase):
+    def test_upload_decoded_once(self):
+        upload = create_test_image()
+        content = upload.read()
+        cleaned_upload = ProfileImageField().clean(upload)
+        self.assertEqual(cleaned_upload.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(cleaned_upload.content_type, "image/png")
+        ## The decoded image is usable, unlike the one verified by forms.ImageField
+        self.assertEqual(cleaned_upload.decoded_image.getpixel((0, 0)), (0, 0, 0))
+        self.assertEqual(cleaned_upload.tell(), 0)  ## Ready to be stored
+
+    def test_invalid_image(self):
+        with self.assertRaises(ValidationError) as context:
+            ProfileImageField().clean(SimpleUploadedFile("image.png", b"not an image"))
+        self.assertEqual(context.exception.code, "invalid_image")
+
+    def test_truncated_image(self):
+        upload = create_test_image(size=(64, 64))
+        truncated_upload = SimpleUploadedFile("image.png", upload.read()[:-40])
+        with self.assertRaises(ValidationError):
+            ProfileImageField().clean(truncated_upload)
+
+    @override_settings(PROFILE_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        with self.assertRaises(ValidationError) as context:
+            ProfileImageField().clean(create_test_image(size=(20, 20)))
+        self.assertEqual(context.exception.code, "too_many_pixels")
@@ -0,0 +1,113 @@
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, InMemoryStorage
+from extended_accounts.helpers import delete_image_files, save_image_file
+from unittest.mock import patch
+import tempfile, shutil, os
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class BatchDeleteStorage(
+    InMemoryStorage
+):  ## Stand-in for a backend able to delete several files in a single request
+    def delete_many(self, names):
+        for name in names:
+            self.delete(name)
+
+
+class DeleteImageFilesTestCase(TestCase):
+    def setUp(self):
+        self.names = ["ab/cd/abcd.png", "ab/cd/abcd.webp"]
+
+    def __populate(self, storage):
+        for name in self.names:
+            storage.save(name, ContentFile(b"image"))
+
+    def test_delete_one_by_one(self):
+        storage = InMemoryStorage()
+        self.__populate(storage)
+        with patch.object(storage, "delete", wraps=storage.delete) as mock_delete:
+            delete_image_files(storage, self.names)
+        self.assertEqual(mock_delete.call_count, 2)
+        for name in self.names:
+            self.assertFalse(storage.exists(name))
+
+    def test_delete_in_batch_if_supported(self):
+        storage = BatchDeleteStorage()
+        self.__populate(storage)
+        with patch.object(
+            storage, "delete_many", wraps=storage.delete_many
+        ) as mock_delete_many:
+            delete_image_files(storage, self.names)
+        mock_delete_many.assert_called_once_with(self.names)
+        for name in self.names:
+            self.assertFalse(storage.exists(name))
+
+    def test_nothing_to_delete(self):
+        storage = BatchDeleteStorage()
+        with patch.object(storage, "delete_many") as mock_delete_many:
+            delete_image_files(storage, [])
+        mock_delete_many.assert_not_called()
+
+    def test_non_blocking_execution_if_delete_fails(self):
+        storage = InMemoryStorage()
+        with patch.object(
+            storage, "delete", side_effect=Exception("Simulated")
+        ), self.assertLogs(
+            "extended_accounts.helpers.profile_image_storage", "WARNING"
+        ) as logs:
+            delete_image_files(storage, self.names)
+        self.assertEqual(len(logs.records), len(self.names))
+        self.assertIn("Could not delete the profile image file", logs.output[0])
+
+
+class FailingContentFile(ContentFile):  ## Content whose upload breaks halfway
+    def chunks(self, chunk_size=None):
+        yield b"partial"
+        raise OSError("Connection lost")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SaveImageFileTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def setUp(self):
+        self.storage = FileSystemStorage()
+        self.name = "ab/cd/abcd.webp"
+
+    def test_save_and_replace(self):
+        self.assertEqual(
+            save_image_file(self.storage, self.name, ContentFile(b"image")), self.name
+        )
+        save_image_file(self.storage, self.name, ContentFile(b"new image"))
+        with self.storage.open(self.name) as file:
+            self.assertEqual(file.read(), b"new image")
+        self.assertEqual(
+            os.listdir(os.path.join(MEDIA_ROOT, "ab/cd")), ["abcd.webp"]
+        )  ## No temporary file left behind
+
+    def test_interrupted_write_keeps_previous_file(self):
+        save_image_file(self.storage, self.name, ContentFile(b"image"))
+        with self.assertRaises(OSError):
+            save_image_file(self.storage, self.name, FailingContentFile(b""))
+        with self.storage.open(self.name) as file:
+            self.assertEqual(file.read(), b"image")
+        self.assertEqual(os.listdir(os.path.join(MEDIA_ROOT, "ab/cd")), ["abcd.webp"])
+
+    def test_interrupted_write_leaves_nothing(self):
+        with self.assertRaises(OSError):
+            save_image_file(self.storage, "ef/gh/efgh.webp", FailingContentFile(b""))
+        self.assertFalse(self.storage.exists("ef/gh/efgh.webp"))
+
+    def test_other_backends_use_storage_api(self):
+        storage = InMemoryStorage()
+        ## Overwritten in place, the file is never deleted first
+        storage.delete = lambda name: self.fail("The file was deleted")
+        save_image_file(storage, self.name, ContentFile(b"image"))
+        save_image_file(storage, self.name, ContentFile(b"new image"))
+        with storage.open(self.name) as file:
+            self.assertEqual(file.read(), b"new image")
@@ -0,0 +1,95 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.core.files.uploadhandler import StopUpload
+from django.core.files.uploadedfile import SimpleUploadedFile
+from extended_accounts.helpers import ProfileImageUploadHandler
+from PIL import Image
+from io import BytesIO
+
+
+def create_test_image():
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1))
+    image_object.save(image_buffer, "png")
+    return image_buffer.getvalue()
+
+
+class ProfileImageUploadHandlerTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        super().setUpClass(*args, **kwargs)
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        self.request = self.factory.post("/")
+        self.handler = ProfileImageUploadHandler(self.request)
+
+    def __stream(self, data, field_name="profile_image"):
+        self.handler.new_file(field_name, "image.png", "image/png", None)
+        received = b""
+        for start in range(0, len(data), self.handler.chunk_size):
+            received += self.handler.receive_data_chunk(
+                data[start : start + self.handler.chunk_size], start
+            )
+        self.assertIsNone(self.handler.file_complete(len(data)))
+        return received
+
+    def test_image_goes_through(self):
+        image = create_test_image()
+        self.assertEqual(self.__stream(image), image)
+        self.assertFalse(hasattr(self.request, "profile_image_upload_error"))
+
+    def test_webp_goes_through(self):
+        image_buffer = BytesIO()
+        Image.new("RGB", (1, 1)).save(image_buffer, "webp")
+        self.__stream(image_buffer.getvalue())
+        self.assertFalse(hasattr(self.request, "profile_image_upload_error"))
+
+    def test_non_image_rejected_on_first_chunk(self):
+        self.handler.new_file("profile_image", "image.png", "image/png", None)
+        with self.assertRaises(StopUpload) as context:
+            self.handler.receive_data_chunk(b"%PDF-1.7" + b"0" * 4088, 0)
+        self.assertFalse(context.exception.connection_reset)
+        self.assertIn("valid image", self.request.profile_image_upload_error)
+
+    def test_riff_without_webp_rejected(self):
+        with self.assertRaises(StopUpload):
+            self.__stream(b"RIFF\x00\x00\x00\x00WAVEfmt ")
+
+    def test_short_non_image_rejected_on_completion(self):
+        with self.assertRaises(StopUpload):
+            self.__stream(b"GIF")
+
+    @override_settings(PROFILE_IMAGE_MAX_UPLOAD_SIZE=8 * 2**10)
+    def test_oversized_upload_rejected_while_streaming(self):
+        image = create_test_image() + b"0" * 16 * 2**10
+        self.handler.new_file("profile_image", "image.png", "image/png", None)
+        self.handler.receive_data_chunk(image[: 4 * 2**10], 0)
+        self.handler.receive_data_chunk(image[4 * 2**10 : 8 * 2**10], 4 * 2**10)
+        with self.assertRaises(StopUpload):
+            self.handler.receive_data_chunk(
+                image[8 * 2**10 : 12 * 2**10], 8 * 2**10
+            )  ## The upload is aborted as soon as the limit is crossed, the rest is never read
+        self.assertIn("8 KB", self.request.profile_image_upload_error)
+
+    @override_settings(PROFILE_IMAGE_MAX_UPLOAD_SIZE=8 * 2**10)
+    def test_oversized_upload_rejected_by_announced_length(self):
+        with self.assertRaises(StopUpload):
+            self.handler.new_file("profile_image", "image.png", "image/png", 16 * 2**10)
+
+    def test_other_fields_ignored(self):
+        self.__stream(b"not an image", field_name="document")
+        self.assertFalse(hasattr(self.request, "profile_image_upload_error"))
+
+    def test_rejected_upload_not_stored(self):
+        request = self.factory.post(
+            "/",
+            {
+                "username": "johndoe",
+                "profile_image": SimpleUploadedFile(
+                    "image.png", b"<html>" + b"0" * 2**20
+                ),
+            },
+        )
+        self.assertNotIn("profile_image", request.FILES)
+        self.assertEqual(request.POST["username"], "johndoe")
+        self.assertIn("valid image", request.profile_image_upload_error)
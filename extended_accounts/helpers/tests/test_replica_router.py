@@ -0,0 +1,119 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse_lazy
+from django.contrib.auth.tokens import default_token_generator
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import PrimaryReplicaRouter, pin_to_primary
+from extended_accounts.helpers.replica_router import (
+    pinned_to_primary,
+    wrote_to_primary,
+)
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class PrimaryReplicaRouterTestCase(TestCase):
+    ## The replica is a database on its own, which doesn't get the rows written to the primary: as if it was lagging behind
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            password="[Pass1234]",
+            is_active=True,
+        )
+        ## Start every test as a new request which hasn't written yet
+        self.pinned_token = pinned_to_primary.set(False)
+        self.wrote_token = wrote_to_primary.set(False)
+
+    def tearDown(self):
+        pinned_to_primary.reset(self.pinned_token)
+        wrote_to_primary.reset(self.wrote_token)
+
+    def test_reads_from_replica(self):
+        self.assertEqual(Account.objects.all().db, "replica")
+        self.assertFalse(Account.objects.filter(username="johndoe").exists())
+
+    def test_writes_to_primary(self):
+        self.assertEqual(PrimaryReplicaRouter().db_for_write(Account), "default")
+        Account.objects.filter(pk=self.account.pk).update(is_staff=True)
+        self.assertTrue(Account.objects.using("default").get().is_staff)
+
+    def test_reads_pinned_after_write(self):
+        self.account.update(first_name="Johnny")
+        self.assertEqual(Account.objects.all().db, "default")
+        self.assertEqual(
+            Account.objects.get(username="johndoe").profile.first_name, "Johnny"
+        )
+
+    def test_pin_to_primary(self):
+        pin_to_primary()
+        self.assertTrue(Account.objects.filter(username="johndoe").exists())
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        self.assertEqual(Account.objects.all().db, "default")
+
+    def test_other_databases_left_alone(self):
+        router = PrimaryReplicaRouter()
+        account = Account(username="janedoe")
+        account._state.db = "other"
+        self.assertIsNone(router.db_for_read(Account, instance=account))
+        self.assertIsNone(router.db_for_write(Account, instance=account))
+        account._state.db = "replica"
+        self.assertEqual(router.db_for_write(Account, instance=account), "default")
+
+    def test_allow_relation(self):
+        router = PrimaryReplicaRouter()
+        replica_account = Account(username="janedoe")
+        replica_account._state.db = "replica"
+        self.assertTrue(router.allow_relation(self.account, replica_account))
+        replica_account._state.db = "other"
+        self.assertIsNone(router.allow_relation(self.account, replica_account))
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaPinningMiddlewareTestCase(TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        account = Account.objects.create_user(
+            username="johndoe", email="johndoe@mail.com", phone_number=123456789
+        )
+        self.confirmation_url = reverse_lazy(
+            "extended_accounts:account_confirmation",
+            kwargs={
+                "username": "johndoe",
+                "token": default_token_generator.make_token(account),
+            },
+        )
+
+    def test_pinned_after_write(self):
+        ## Not in the replica yet
+        response = self.client.get(self.confirmation_url)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("pin_primary", response.cookies)
+        ## The request creating an account pins its client to the primary
+        response = self.client.post(
+            reverse_lazy("extended_accounts:new_account"),
+            {
+                "username": "janedoe",
+                "first_name": "Jane",
+                "last_name": "Doe",
+                "email": "janedoe@mail.com",
+                "phone_number": 987654321,
+                "password1": "[Pass1234]",
+                "password2": "[Pass1234]",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies["pin_primary"]["max-age"], 10)
+        self.assertTrue(
+            Account.objects.using("default").filter(username="janedoe").exists()
+        )
+        ## So its next requests see the accounts written to the primary
+        response = self.client.get(self.confirmation_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Account.objects.using("default").get(username="johndoe").is_active
+        )
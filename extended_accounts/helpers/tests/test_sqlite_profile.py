@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase, override_settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+import tempfile, shutil, os
+
+DATABASES_DIR = tempfile.mkdtemp()
+
+
+class SQLiteProfileTestCase(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(DATABASES_DIR, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def setUp(self):
+        ## A file database out of the project ones, as in-memory databases can't use WAL
+        settings_dict = connections.configure_settings(
+            {
+                DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+                "profiled": {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": os.path.join(
+                        DATABASES_DIR, f"{self._testMethodName}.sqlite3"
+                    ),
+                },
+            }
+        )["profiled"]
+        self.connection = DatabaseWrapper(settings_dict, alias="profiled")
+        self.addCleanup(self.connection.close)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE=["profiled"])
+    def test_profile(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)  ## NORMAL
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("mmap_size"), 268435456)
+        self.assertEqual(self.pragma("cache_size"), -65536)
+        ## Transactions take the write lock upfront
+        self.connection.force_debug_cursor = True
+        self.connection._start_transaction_under_autocommit()
+        self.assertEqual(self.connection.queries[-1]["sql"], "BEGIN IMMEDIATE")
+        self.assertTrue(self.connection.connection.in_transaction)
+        self.connection.connection.rollback()
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE=True)
+    def test_profile_every_database(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+
+    @override_settings(
+        SQLITE_PRODUCTION_PROFILE=["profiled"],
+        SQLITE_PRAGMAS={"busy_timeout": 100, "mmap_size": None},
+    )
+    def test_pragmas_overridden(self):
+        self.assertEqual(self.pragma("busy_timeout"), 100)
+        self.assertEqual(self.pragma("mmap_size"), 0)  ## Left alone
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE=["another"])
+    def test_other_databases_left_alone(self):
+        self.assertEqual(self.pragma("journal_mode"), "delete")
+        self.connection.force_debug_cursor = True
+        self.connection._start_transaction_under_autocommit()
+        self.assertEqual(self.connection.queries[-1]["sql"], "BEGIN")
+        self.connection.connection.rollback()
+
+    def test_disabled(self):
+        with override_settings(SQLITE_PRODUCTION_PROFILE=True):
+            self.connection.ensure_connection()
+        self.connection.close()
+        ## The next connection of the same wrapper is back to the stock settings
+        self.assertEqual(self.pragma("synchronous"), 2)  ## FULL
+        self.assertNotIn(
+            "_start_transaction_under_autocommit", self.connection.__dict__
+        )
@@ -1,6 +1,12 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from extended_accounts.models import AccountModel as Account
-from extended_accounts.helpers import delete_unconfirmed_accounts
+from extended_accounts.helpers import (
+    delete_unconfirmed_accounts,
+    delete_profile_image_files,
+    purge_deleted_accounts,
+)
 
 
 class TasksTestCase(TestCase):
@@ -28,3 +34,38 @@ class TasksTestCase(TestCase):
     ## If the task is launched on a non-existent user (for example because the user deletes it before the task completes), no exception is raised
     def test_non_existent_user_non_blocking(self):
         delete_unconfirmed_accounts.s(username="user_1").apply()
+
+    @override_settings(
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+    )
+    def test_delete_profile_image_files(self):
+        files = ["ab/cd/abcd.png", "ab/cd/abcd.webp"]
+        for file in files:
+            default_storage.save(file, ContentFile(b"image"))
+        delete_profile_image_files.s(names=files).apply()
+        for file in files:
+            self.assertFalse(default_storage.exists(file))
+
+    @override_settings(ACCOUNT_PURGE_BATCH_SIZE=2)
+    def test_purge_deleted_accounts(self):
+        accounts = [
+            Account.objects.create_user(
+                username=f"user_{i}",
+                phone_number=123456780 + i,
+                email=f"user{i}@mail.com",
+            )
+            for i in range(4)
+        ]
+        for account in accounts[:3]:
+            account.request_deletion()
+        self.assertEqual(purge_deleted_accounts.s().apply().get(), 3)
+        self.assertEqual(
+            list(Account.all_objects.values_list("username", flat=True)), ["user_3"]
+        )
+        ## Nothing left to purge
+        self.assertEqual(purge_deleted_accounts.s().apply().get(), 0)
@@ -0,0 +1,135 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import InvalidCacheKey, memcache_key_warnings
+from django.http import HttpResponse
+from django.urls import reverse_lazy
+from extended_accounts.helpers import throttle, get_throttle_counters
+from extended_accounts.helpers.throttling import MemoryThrottleStore
+from unittest.mock import patch
+
+
+def view(request):
+    return HttpResponse("OK")
+
+
+@override_settings(THROTTLE_RATES={"test": (2, 60)})
+class ThrottleTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        super().setUpClass(*args, **kwargs)
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        cache.clear()
+        self.view = throttle("test", fields=["username"])(view)
+
+    def __post(self, username="johndoe", ip="10.0.0.1"):
+        return self.view(self.factory.post("/", {"username": username}, REMOTE_ADDR=ip))
+
+    def test_throttled_once_bucket_is_empty(self):
+        self.assertEqual(self.__post().status_code, 200)
+        self.assertEqual(self.__post().status_code, 200)
+        with self.assertLogs("extended_accounts.helpers.throttling", "WARNING") as logs:
+            response = self.__post()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Throttled test attempt (ip:10.0.0.1, username:", logs.output[0])
+        self.assertEqual(response["Retry-After"], "30")  ## 2 tokens per minute
+        self.assertEqual(get_throttle_counters("test"), {"allowed": 2, "throttled": 1})
+
+    def test_keyed_by_username(self):
+        self.__post(ip="10.0.0.1")
+        self.__post(ip="10.0.0.2")
+        with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+            self.assertEqual(
+                self.__post(ip="10.0.0.3").status_code, 429
+            )  ## Distributed attack against a single account
+        self.assertEqual(
+            self.__post(username="JaneDoe", ip="10.0.0.4").status_code, 200
+        )
+
+    def test_keyed_by_ip(self):
+        self.__post(username="john")
+        self.__post(username="jane")
+        with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+            self.assertEqual(self.__post(username="jack").status_code, 429)
+
+    def test_keys_valid_for_memcached(self):
+        def validate_key(key):  ## As done by Django's memcached backends
+            for warning in memcache_key_warnings(key):
+                raise InvalidCacheKey(warning)
+
+        with patch.object(caches["default"], "validate_key", validate_key):
+            self.assertEqual(self.__post(username="j" * 300).status_code, 200)
+            self.assertEqual(
+                self.__post(username="john doe", ip="10.0.0.2").status_code, 200
+            )
+            self.assertEqual(
+                self.__post(username="john doe", ip="10.0.0.3").status_code, 200
+            )
+            ## Still keyed by the normalised value
+            with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+                self.assertEqual(
+                    self.__post(username=" John Doe", ip="10.0.0.4").status_code, 429
+                )
+
+    def test_bucket_refills(self):
+        with patch("time.time", return_value=1000):
+            self.__post()
+            self.__post()
+            with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+                self.assertEqual(self.__post().status_code, 429)
+        with patch("time.time", return_value=1030):  ## A token is back
+            self.assertEqual(self.__post().status_code, 200)
+            with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+                self.assertEqual(self.__post().status_code, 429)
+
+    def test_get_not_throttled(self):
+        for _ in range(3):
+            self.assertEqual(self.view(self.factory.get("/")).status_code, 200)
+
+    @override_settings(THROTTLE_RATES={"test": None})
+    def test_disabled(self):
+        for _ in range(3):
+            self.assertEqual(self.__post().status_code, 200)
+
+    @override_settings(THROTTLE_STORE="memory")
+    def test_memory_store(self):
+        with patch(
+            "extended_accounts.helpers.throttling.memory_store", MemoryThrottleStore()
+        ):
+            self.__post()
+            self.__post()
+            with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+                self.assertEqual(self.__post().status_code, 429)
+            self.assertEqual(
+                get_throttle_counters("test"), {"allowed": 2, "throttled": 1}
+            )
+
+    def test_memory_store_pruned(self):
+        store = MemoryThrottleStore()
+        store.take("10.0.0.1", 2, 1 / 30, 0)
+        store.take("10.0.0.2", 2, 1 / 30, 10)
+        ## The first bucket is full again at 30
+        store.take("10.0.0.3", 2, 1 / 30, 35)
+        self.assertEqual(list(store.buckets), ["10.0.0.2", "10.0.0.3"])
+        with override_settings(THROTTLE_MEMORY_MAX_BUCKETS=2):
+            store.take("10.0.0.4", 2, 1 / 30, 36)
+            store.take("10.0.0.3", 2, 1 / 30, 37)
+            store.take("10.0.0.5", 2, 1 / 30, 38)
+        ## Least recently used evicted
+        self.assertEqual(list(store.buckets), ["10.0.0.3", "10.0.0.5"])
+        ## Pruning doesn't lose the state of the buckets still refilling
+        self.assertFalse(store.take("10.0.0.3", 2, 1 / 30, 38)[0])
+
+    @override_settings(THROTTLE_RATES={"login": (1, 60)})
+    def test_login_throttled_before_authenticate(self):
+        url = reverse_lazy("extended_accounts:login")
+        data = {"username": "johndoe", "password": "wrongpassword"}
+        with patch(
+            "django.contrib.auth.forms.authenticate", return_value=None
+        ) as mock_authenticate:
+            self.client.post(url, data)
+            with self.assertLogs("extended_accounts.helpers.throttling", "WARNING"):
+                response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 429)
+        mock_authenticate.assert_called_once()
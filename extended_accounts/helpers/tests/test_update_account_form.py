@@ -2,6 +2,7 @@ from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.models import AccountModel as Account
 from extended_accounts.helpers import UpdateAccountForm
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -73,11 +74,18 @@ class UpdateAccountFormTestCase(TestCase):
         self.assertEqual(account.profile.first_name, data["first_name"])
         self.assertEqual(account.profile.last_name, self.initial_data["last_name"])
         self.assertEqual(account.profile.phone_number, data["phone_number"])
-        self.assertIn(
-            account.profile.profile_image.name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, account.profile.profile_image.name + ".png")
+            )
         )
-        self.assertIn(
-            account.profile.profile_image.name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(account.profile.profile_image.name, ".webp"),
+                )
+            )
         )
 
     ## VALIDATORS TESTS
@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+from extended_accounts.helpers import (
+    encode_webp,
+    encode_webp_within_budget,
+    psnr,
+    search_webp_quality,
+)
+from PIL import Image
+from io import BytesIO
+import math
+
+
+def create_test_photo():  ## Detailed content, whose size depends a lot on the quality
+    return Image.effect_noise((64, 64), 60).convert("RGB")
+
+
+class WebpEncodingTestCase(TestCase):
+    def test_psnr(self):
+        flat_image = Image.new("RGB", (8, 8), (255, 255, 255))
+        lossless_webp = BytesIO()
+        flat_image.save(lossless_webp, format="WEBP", lossless=True)
+        self.assertEqual(psnr(flat_image, lossless_webp.getvalue()), math.inf)
+        photo = create_test_photo()
+        self.assertLess(
+            psnr(photo, encode_webp(photo, 10)), psnr(photo, encode_webp(photo, 90))
+        )
+
+    def test_byte_budget(self):
+        photo = create_test_photo()
+        max_bytes = len(encode_webp(photo, 50))
+        quality, webp = search_webp_quality(photo, max_bytes=max_bytes)
+        self.assertLessEqual(len(webp), max_bytes)
+        self.assertGreaterEqual(quality, 50)
+        self.assertEqual(webp, encode_webp(photo, quality))
+
+    def test_unreachable_byte_budget(self):
+        quality, webp = search_webp_quality(create_test_photo(), max_bytes=1)
+        self.assertEqual(quality, 10)  ## The lowest quality considered
+
+    def test_perceptual_budget(self):
+        photo = create_test_photo()
+        min_psnr = psnr(photo, encode_webp(photo, 60))
+        quality, webp = search_webp_quality(photo, min_psnr=min_psnr)
+        self.assertGreaterEqual(psnr(photo, webp), min_psnr)
+        self.assertLessEqual(quality, 60)
+
+    def test_byte_budget_takes_precedence(self):
+        photo = create_test_photo()
+        max_bytes = len(encode_webp(photo, 30))
+        quality, webp = search_webp_quality(photo, max_bytes=max_bytes, min_psnr=99)
+        self.assertLessEqual(len(webp), max_bytes)
+
+    def test_settings(self):
+        photo = create_test_photo()
+        self.assertEqual(encode_webp_within_budget(photo), (None, encode_webp(photo)))
+        with override_settings(PROFILE_IMAGE_WEBP_QUALITY=40):
+            self.assertEqual(
+                encode_webp_within_budget(photo), (40, encode_webp(photo, 40))
+            )
+        with override_settings(PROFILE_IMAGE_WEBP_MAX_BYTES=2000):
+            quality, webp = encode_webp_within_budget(photo)
+            self.assertLessEqual(len(webp), 2000)
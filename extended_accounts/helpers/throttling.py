@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from functools import wraps
+from collections import OrderedDict
+import hashlib, logging, math, threading, time
+
+logger = logging.getLogger(__name__)
+
+## Attempts allowed per route: (capacity, period in seconds). Up to capacity attempts can be made in a burst, then the bucket refills at capacity/period tokens per second. Override them with the THROTTLE_RATES setting, None disables the throttling of a route
+DEFAULT_THROTTLE_RATES = {
+    "login": (10, 300),
+    "reset_password_request": (5, 900),
+    "new_account": (5, 3600),
+    "availability": (60, 60),
+}
+
+
+class MemoryThrottleStore:
+    """
+    Token buckets kept in the memory of the process. Fast, but each process throttles on its own.
+    Buckets which have refilled are dropped, as a missing bucket is a full one, and at most THROTTLE_MEMORY_MAX_BUCKETS are kept, evicting the least recently used: the store can't grow without bound when an attack goes through many IPs or usernames.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        ## key: (tokens, updated, time at which the bucket is full again), least recently used first
+        self.buckets = OrderedDict()
+        self.counters = {}
+
+    def take(self, key, capacity, refill_rate, now):
+        with self.lock:
+            tokens, updated, _ = self.buckets.pop(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+            self.prune(now)
+            return allowed, tokens
+
+    def prune(self, now):
+        max_buckets = getattr(settings, "THROTTLE_MEMORY_MAX_BUCKETS", 100000)
+        while self.buckets:
+            _, _, full_at = next(iter(self.buckets.values()))
+            if full_at > now and len(self.buckets) <= max_buckets:
+                break
+            self.buckets.popitem(last=False)
+
+    def incr_counter(self, name):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def get_counter(self, name):
+        return self.counters.get(name, 0)
+
+
+class CacheThrottleStore:
+    """
+    Token buckets kept in a Django cache, shared by every process using it. Reading and writing a bucket isn't atomic, so concurrent attempts may occasionally get one token more than they should, which is fine for throttling.
+    """
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, refill_rate, now):
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.cache.set(
+            key, (tokens, now), math.ceil(capacity / refill_rate)
+        )  ## Once expired, the bucket would be full again anyway
+        return allowed, tokens
+
+    def incr_counter(self, name):
+        try:
+            self.cache.incr(name)
+        except ValueError:
+            self.cache.add(name, 0, None)
+            self.cache.incr(name)
+
+    def get_counter(self, name):
+        return self.cache.get(name, 0)
+
+
+memory_store = MemoryThrottleStore()
+
+
+def get_throttle_store():
+    if getattr(settings, "THROTTLE_STORE", "cache") == "memory":
+        return memory_store
+    return CacheThrottleStore(getattr(settings, "THROTTLE_CACHE_ALIAS", "default"))
+
+
+def get_throttle_rate(route):
+    rates = {**DEFAULT_THROTTLE_RATES, **getattr(settings, "THROTTLE_RATES", {})}
+    return rates.get(route)
+
+
+def hash_throttle_value(value):
+    return hashlib.sha256(value.strip().lower().encode()).hexdigest()
+
+
+def get_throttle_counters(route):
+    """
+    Return how many attempts on the route have been allowed and throttled.
+    """
+    store = get_throttle_store()
+    return {
+        outcome: store.get_counter(f"extended_accounts:throttle:{route}:{outcome}")
+        for outcome in ["allowed", "throttled"]
+    }
+
+
+def throttle(route, fields=(), methods=("POST",)):
+    """
+    Decorator throttling the requests sent to a view with the given methods (POST by default) with token buckets, keyed by the client IP and by the value of each of the given form fields (eg: the username), so neither a single client nor a distributed attack against a single account can go beyond the rate configured for the route.
+    Throttled requests are rejected with a 429 response before reaching the view, so they don't even get to hash a password.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def throttled_view(request, *args, **kwargs):
+            rate = get_throttle_rate(route)
+            if request.method not in methods or rate is None:
+                return view(request, *args, **kwargs)
+            capacity, period = rate
+            refill_rate = capacity / period
+            store = get_throttle_store()
+            ## The values are hashed, as raw user input may not be a valid cache key (eg: Memcached rejects spaces, control characters and keys longer than 250 characters)
+            keys = [f"ip:{request.META.get('REMOTE_ADDR')}"] + [
+                f"{field}:{hash_throttle_value(request.POST[field])}"
+                for field in fields
+                if request.POST.get(field)
+            ]
+            now = time.time()
+            throttled_keys = [
+                key
+                for key in keys
+                if not store.take(
+                    f"extended_accounts:throttle:{route}:{key}",
+                    capacity,
+                    refill_rate,
+                    now,
+                )[0]
+            ]
+            if not throttled_keys:
+                store.incr_counter(f"extended_accounts:throttle:{route}:allowed")
+                return view(request, *args, **kwargs)
+            store.incr_counter(f"extended_accounts:throttle:{route}:throttled")
+            logger.warning(
+                "Throttled %s attempt (%s)",
+                route,
+                ", ".join(throttled_keys),
+                extra={"throttle_route": route, "throttle_keys": throttled_keys},
+            )
+            response = HttpResponse(
+                "Too many attempts, please try again later.", status=429
+            )
+            response["Retry-After"] = math.ceil(
+                1 / refill_rate
+            )  ## Time for the empty bucket to get a token back
+            return response
+
+        return throttled_view
+
+    return decorator
@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserChangeForm
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers.profile_image_field import ProfileImageField
 
 
 class UpdateAccountForm(UserChangeForm):
@@ -19,7 +20,7 @@ class UpdateAccountForm(UserChangeForm):
         ],
         label="Phone Number",
     )
-    profile_image = forms.ImageField(required=False, label="Profile Image")
+    profile_image = ProfileImageField(required=False, label="Profile Image")
 
     def __init__(
         self, *args, **kwargs
@@ -35,10 +36,24 @@ class UpdateAccountForm(UserChangeForm):
         ## We define the user and the profile throughout the form since we need it to clean of the email and the phone number. There is no problem with exceptions with the get method called below since if this view is accessed it is because the user is registered and therefore both user and profile exist.
         self.account = Account.objects.get(username=self.initial["username"])
 
+    def clean_username(self):
+        ## Soft-deleted accounts keep their username until they're purged, so they're checked as well
+        username = self.cleaned_data.get("username")
+        if (
+            username
+            and Account.all_objects.filter(username__iexact=username)
+            .exclude(pk=self.account.pk)
+            .exists()
+        ):
+            raise ValidationError(
+                self.instance.unique_error_message(Account, ["username"])
+            )
+        return username
+
     def clean_email(self):
         email = self.cleaned_data.get("email")
         try:  # Check if the email is already associated with another user
-            account_using_email = Account.objects.get(email=email)
+            account_using_email = Account.all_objects.get(email=email)
             if account_using_email != self.account:
                 raise ValidationError(
                     "The email provided is already registered by another user."
@@ -50,7 +65,7 @@ class UpdateAccountForm(UserChangeForm):
     def clean_phone_number(self):
         phone_number = self.cleaned_data.get("phone_number")
         try:  # Check if the phone number is already associated with a user
-            account_using_phone = Account.objects.get(
+            account_using_phone = Account.all_objects.get(
                 profile__phone_number=phone_number
             )
             if account_using_phone != self.account:
@@ -0,0 +1,82 @@
+from django.conf import settings
+from PIL import Image, ImageChops, ImageStat
+from io import BytesIO
+import math
+
+## Qualities considered when searching for the one meeting a budget. Below the minimum, artifacts are too visible for any budget to be worth it
+WEBP_MIN_QUALITY = 10
+WEBP_MAX_QUALITY = 95
+
+
+def encode_webp(image, quality=None):
+    """
+    Encode the image into webp without metadata. Pillow's default quality is used if none is given.
+    """
+    webp_image = BytesIO()
+    options = {"exif": b"", "icc_profile": None, "xmp": b""}
+    if quality is not None:
+        options["quality"] = quality
+    image.save(webp_image, format="WEBP", **options)
+    return webp_image.getvalue()
+
+
+def psnr(image, webp):
+    """
+    Peak signal-to-noise ratio (dB) of the webp encoding of an image, the higher the closer to the original. Above ~40dB the differences are hardly visible.
+    """
+    mode = "RGBA" if "A" in image.getbands() else "RGB"
+    difference = ImageChops.difference(
+        image.convert(mode), Image.open(BytesIO(webp)).convert(mode)
+    )
+    mean_squared_error = sum(ImageStat.Stat(difference).sum2) / (
+        image.width * image.height * len(mode)
+    )
+    if not mean_squared_error:
+        return math.inf
+    return 10 * math.log10(255**2 / mean_squared_error)
+
+
+def search_webp_quality(image, max_bytes=None, min_psnr=None):
+    """
+    Binary search of the encoder quality meeting the budgets, return the quality and the encoded image.
+    With min_psnr, the lowest quality reaching that PSNR is chosen: flat avatars get small files, detailed photos get the quality they need. With max_bytes, the highest quality fitting in that many bytes is chosen, and it takes precedence over min_psnr. If even the lowest quality doesn't fit, that's what is returned.
+    """
+    encodings = {}
+
+    def encode(quality):
+        if quality not in encodings:
+            encodings[quality] = encode_webp(image, quality)
+        return encodings[quality]
+
+    low, high = WEBP_MIN_QUALITY, WEBP_MAX_QUALITY
+    if min_psnr is not None:
+        ## Lowest quality reaching min_psnr, PSNR grows with the quality
+        while low < high:
+            quality = (low + high) // 2
+            if psnr(image, encode(quality)) >= min_psnr:
+                high = quality
+            else:
+                low = quality + 1
+        if max_bytes is None or len(encode(high)) <= max_bytes:
+            return high, encode(high)
+        low, high = WEBP_MIN_QUALITY, high
+    ## Highest quality fitting in max_bytes, the size grows with the quality
+    while low < high:
+        quality = (low + high + 1) // 2
+        if len(encode(quality)) <= max_bytes:
+            low = quality
+        else:
+            high = quality - 1
+    return low, encode(low)
+
+
+def encode_webp_within_budget(image):
+    """
+    Encode the image into webp with the quality set in the settings. If PROFILE_IMAGE_WEBP_MAX_BYTES or PROFILE_IMAGE_WEBP_MIN_PSNR are set, the quality is searched for every image to meet them instead. Return the quality used (None for Pillow's default) and the encoded image.
+    """
+    max_bytes = getattr(settings, "PROFILE_IMAGE_WEBP_MAX_BYTES", None)
+    min_psnr = getattr(settings, "PROFILE_IMAGE_WEBP_MIN_PSNR", None)
+    if max_bytes is None and min_psnr is None:
+        quality = getattr(settings, "PROFILE_IMAGE_WEBP_QUALITY", None)
+        return quality, encode_webp(image, quality)
+    return search_webp_quality(image, max_bytes=max_bytes, min_psnr=min_psnr)
@@ -0,0 +1,28 @@
+from django.test import TestCase
+from django.conf import settings
+from extended_accounts.helpers import delete_image_files_on_commit
+from unittest.mock import patch
+
+
+## Integration test to ensure that the Celery task deleting profile image files is called asynchronously once the transaction commits, and never if it's rolled back.
+class IntegrationCeleryDeleteProfileImageFilesTest(TestCase):
+    def setUp(self):
+        settings.INTEGRATION_TEST_CELERY = True
+
+    def tearDown(self):
+        settings.INTEGRATION_TEST_CELERY = False
+
+    @patch("extended_accounts.helpers.tasks.delete_profile_image_files.delay")
+    def test_task_called_on_commit(self, mock_celery_call):
+        files = ["ab/cd/abcd.png", "ab/cd/abcd.webp"]
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_image_files_on_commit(files)
+            mock_celery_call.assert_not_called()  ## Nothing happens until the transaction commits
+        mock_celery_call.assert_called_once_with(files)
+
+    @patch("extended_accounts.helpers.tasks.delete_profile_image_files.delay")
+    def test_task_not_called_if_nothing_to_delete(self, mock_celery_call):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            delete_image_files_on_commit([])
+        self.assertEqual(callbacks, [])
+        mock_celery_call.assert_not_called()
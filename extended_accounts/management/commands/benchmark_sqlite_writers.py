@@ -0,0 +1,121 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.test.utils import override_settings
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers.sqlite_profile import get_sqlite_pragmas
+import statistics, tempfile, threading, time
+
+
+class Command(BaseCommand):
+    help = "Sign up and update accounts from several concurrent writers on a temporary SQLite database, once with the stock SQLite settings and once with the production profile (SQLITE_PRODUCTION_PROFILE), and report the signups per second, the latencies and the writes which failed with 'database is locked'. Nothing is written to the project databases."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--writers",
+            type=int,
+            default=8,
+            help="Number of concurrent writers (threads, each with its own connection)",
+        )
+        parser.add_argument(
+            "--signups",
+            type=int,
+            default=400,
+            help="Number of accounts signed up (then updated) per run, shared between the writers",
+        )
+        parser.add_argument(
+            "--directory",
+            default=None,
+            help="Directory where the temporary databases are created, pick one on the disk the production database lives on. By default, the system temporary directory",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            "Profile pragmas: "
+            + ", ".join(
+                f"{name}={value}" for name, value in get_sqlite_pragmas().items()
+            )
+        )
+        self.stdout.write(
+            f"{'settings':<10}{'signups/s':>11}{'failed':>8}{'p50 ms':>9}{'p99 ms':>9}"
+        )
+        with tempfile.TemporaryDirectory(dir=options["directory"]) as directory:
+            for profile in [False, True]:
+                name = "profile" if profile else "stock"
+                signups, failed, latencies, elapsed = self.run(
+                    f"{directory}/{name}.sqlite3",
+                    f"benchmark_sqlite_{name}",
+                    profile,
+                    options["writers"],
+                    options["signups"],
+                )
+                percentiles = statistics.quantiles(latencies, n=100)
+                self.stdout.write(
+                    f"{name:<10}{signups / elapsed:>11.1f}{failed:>8}{percentiles[49] * 1000:>9.1f}{percentiles[98] * 1000:>9.1f}"
+                )
+
+    def run(self, path, alias, profile, writers, signups):
+        ## A fresh database per run, as WAL journaling is persistent. The alias is added to the connections only for the run
+        connections.settings[alias] = connections.configure_settings(
+            {
+                DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+                alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": path},
+            }
+        )[alias]
+        ## The accounts are written to the temporary database only: no shards, and no Celery task scheduled for them, like in the tests
+        with override_settings(
+            SQLITE_PRODUCTION_PROFILE=[alias] if profile else False,
+            ACCOUNT_SHARDS=[],
+            TESTING=True,
+            INTEGRATION_TEST_CELERY=False,
+        ):
+            try:
+                call_command("migrate", database=alias, verbosity=0)
+                lock = threading.Lock()
+                results = {"signups": 0, "failed": 0, "latencies": []}
+                threads = [
+                    threading.Thread(
+                        target=self.write,
+                        args=(alias, range(writer, signups, writers), lock, results),
+                    )
+                    for writer in range(writers)
+                ]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+            finally:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+        ## quantiles needs two latencies at least
+        latencies = (
+            results["latencies"] * 2
+            if len(results["latencies"]) < 2
+            else results["latencies"]
+        )
+        return results["signups"], results["failed"], latencies or [0, 0], elapsed
+
+    def write(self, alias, numbers, lock, results):
+        try:
+            for number in numbers:
+                start = time.perf_counter()
+                try:
+                    ## No password, hashing it would be most of the time measured
+                    account = Account.objects.db_manager(alias).create_user(
+                        username=f"writer{number}",
+                        email=f"writer{number}@example.com",
+                        phone_number=100000000 + number,
+                    )
+                    account.update(first_name="Jane", last_name="Doe")
+                except OperationalError:
+                    with lock:
+                        results["failed"] += 1
+                    continue
+                with lock:
+                    results["signups"] += 1
+                    results["latencies"].append(time.perf_counter() - start)
+        finally:
+            connections.close_all()  ## Connections are per thread, the writer's ones would leak otherwise
@@ -0,0 +1,125 @@
+from django.core.management.base import BaseCommand, CommandError
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.helpers import encode_webp, psnr, search_webp_quality
+from extended_accounts.management.commands.reencode_profile_images import source_file
+from extended_accounts.signals.pre_save_profile_model import open_upright_image
+from django.core.files.base import ContentFile
+import os, statistics, time
+
+
+def fixed_quality(quality):
+    def encode(image):
+        return quality, encode_webp(image, quality)
+
+    return encode
+
+
+def budget(max_bytes=None, min_psnr=None):
+    def encode(image):
+        return search_webp_quality(image, max_bytes=max_bytes, min_psnr=min_psnr)
+
+    return encode
+
+
+class Command(BaseCommand):
+    help = "Transcode a sample of profile images into webp with several encoder settings and report the size, the quality (PSNR) and the encoding time of each of them, to choose PROFILE_IMAGE_WEBP_QUALITY, PROFILE_IMAGE_WEBP_MAX_BYTES or PROFILE_IMAGE_WEBP_MIN_PSNR from measurements. Nothing is written."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="Image files or directories making up the corpus. By default, a sample of the stored profile images is used",
+        )
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=100,
+            help="Number of stored profile images in the corpus when no path is given",
+        )
+        parser.add_argument(
+            "--qualities",
+            default="50,65,80,90",
+            help="Comma separated fixed qualities to benchmark",
+        )
+        parser.add_argument(
+            "--max-bytes",
+            default="",
+            help="Comma separated byte budgets to benchmark",
+        )
+        parser.add_argument(
+            "--min-psnr",
+            default="",
+            help="Comma separated perceptual budgets (PSNR, in dB) to benchmark",
+        )
+
+    def handle(self, *args, **options):
+        encoders = {
+            f"quality={quality}": fixed_quality(int(quality))
+            for quality in options["qualities"].split(",")
+            if quality
+        }
+        encoders.update(
+            {
+                f"max_bytes={max_bytes}": budget(max_bytes=int(max_bytes))
+                for max_bytes in options["max_bytes"].split(",")
+                if max_bytes
+            }
+        )
+        encoders.update(
+            {
+                f"min_psnr={min_psnr}": budget(min_psnr=float(min_psnr))
+                for min_psnr in options["min_psnr"].split(",")
+                if min_psnr
+            }
+        )
+        ## The images are decoded once and kept in memory, so only the encoding is timed
+        images = []
+        for upload in self.corpus(options):
+            try:
+                images.append(open_upright_image(upload)[0])
+            except Exception as exc:
+                self.stderr.write(f"Skipping {upload.name}: {exc!r}")
+        if not images:
+            raise CommandError("The corpus is empty.")
+        self.stdout.write(
+            f"{'setting':<20}{'total bytes':>14}{'mean bytes':>12}{'mean quality':>14}{'mean PSNR':>11}{'ms/image':>10}"
+        )
+        for name, encode in encoders.items():
+            sizes, qualities, psnrs, elapsed = [], [], [], 0
+            for image in images:
+                start = time.perf_counter()
+                quality, webp = encode(image)
+                elapsed += time.perf_counter() - start
+                sizes.append(len(webp))
+                qualities.append(quality)
+                psnrs.append(
+                    min(psnr(image, webp), 100)
+                )  ## Lossless images count as 100dB
+            self.stdout.write(
+                f"{name:<20}{sum(sizes):>14}{statistics.mean(sizes):>12.0f}{statistics.mean(qualities):>14.1f}{statistics.mean(psnrs):>11.1f}{elapsed * 1000 / len(images):>10.1f}"
+            )
+
+    def corpus(self, options):
+        if options["paths"]:
+            for path in options["paths"]:
+                if os.path.isdir(path):
+                    files = sorted(
+                        os.path.join(directory, file)
+                        for directory, _, names in os.walk(path)
+                        for file in names
+                    )
+                else:
+                    files = [path]
+                for file in files:
+                    with open(file, "rb") as image:
+                        yield ContentFile(image.read(), name=file)
+            return
+        storage = Profile._meta.get_field("profile_image").storage
+        for files in (
+            ProfileImageBlob.objects.exclude(files=[])
+            .order_by("?")
+            .values_list("files", flat=True)[: options["sample"]]
+        ):
+            with storage.open(source_file(files)) as image:
+                yield ContentFile(image.read(), name=source_file(files))
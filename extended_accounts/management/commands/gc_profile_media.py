@@ -0,0 +1,137 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.helpers import delete_image_files, get_account_shards
+from datetime import timedelta
+import hashlib, os, posixpath, re, time
+
+## Only files named like profile images are candidates, so files belonging to other apps in the same storage are never touched
+PROFILE_IMAGE_FILE = re.compile(
+    r"^[0-9a-f]{32,}(\.v[0-9]+)?\.\w+(\.[0-9a-f]+\.tmp)?$"
+)  ## Temporary files left by an interrupted save_image_file are never referenced, so they are collected as well
+SHARD_DIRECTORY = re.compile(r"^[0-9a-f]{2}$")
+
+
+def fingerprint(name):
+    """
+    64 bits fingerprint of a file name. Keeping fingerprints instead of names makes the set of referenced files several times smaller. A collision could only make an orphan look referenced, so it's kept, never the other way around.
+    """
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest())
+
+
+def referenced_fingerprints(chunk_size):
+    referenced = set()
+    ## The profiles of every shard if the accounts are sharded, the primary database otherwise (replicas may not have seen the last uploads yet). Blobs always live in the primary database
+    for using in get_account_shards() or [DEFAULT_DB_ALIAS]:
+        for name, files in (
+            Profile.objects.using(using)
+            .exclude(profile_image__isnull=True)
+            .exclude(profile_image="")
+            .values_list("profile_image", "profile_image_files")
+            .iterator(chunk_size=chunk_size)
+        ):
+            ## Images stored before the manifest existed are recognized by their name without extension
+            referenced.add(fingerprint(name))
+            referenced.update(fingerprint(file) for file in files)
+    ## Blobs left at ref_count=0 are waiting for their files to be deleted, which may have been lost (eg: the Celery task failed)
+    for files in (
+        ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+        .filter(ref_count__gt=0)
+        .values_list("files", flat=True)
+        .iterator(chunk_size=chunk_size)
+    ):
+        referenced.update(fingerprint(file) for file in files)
+    return referenced
+
+
+def walk_profile_images(storage, directory="", depth=0):
+    """
+    Lazily yield the profile image files found in the storage, one directory at a time. Only the flat layout and the two levels of the sharded layout (see sharded_image_name) are visited.
+    """
+    directories, files = storage.listdir(directory)
+    for file in sorted(files):
+        if PROFILE_IMAGE_FILE.match(file):
+            yield posixpath.join(directory, file)
+    if depth < 2:
+        for subdirectory in sorted(directories):
+            if SHARD_DIRECTORY.match(subdirectory):
+                yield from walk_profile_images(
+                    storage, posixpath.join(directory, subdirectory), depth + 1
+                )
+
+
+class Command(BaseCommand):
+    help = "Delete (or report with --dry-run) the profile image files that aren't referenced by any profile and are older than a grace period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the orphaned files, don't delete anything",
+        )
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=86400,
+            help="Files modified less than these seconds ago are never deleted, as they may belong to an upload not committed yet (default: one day)",
+        )
+        parser.add_argument(
+            "--max-deletes-per-second",
+            type=float,
+            default=50,
+            help="Maximum deletion rate, so the command can run against live storage",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of files deleted per storage call",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of profiles fetched per database round trip",
+        )
+
+    def handle(self, *args, **options):
+        storage = Profile._meta.get_field("profile_image").storage
+        ## The referenced files are loaded before walking the storage, anything uploaded later is protected by the grace period
+        referenced = referenced_fingerprints(options["chunk_size"])
+        limit = timezone.now() - timedelta(seconds=options["grace_period"])
+        scanned = orphans = 0
+        batch = []
+        for name in walk_profile_images(storage):
+            scanned += 1
+            if (
+                fingerprint(name) in referenced
+                or fingerprint(os.path.splitext(name)[0]) in referenced
+                or storage.get_modified_time(name) > limit
+            ):
+                continue
+            orphans += 1
+            if options["dry_run"]:
+                self.stdout.write(f"Orphaned profile image file: {name}")
+                continue
+            batch.append(name)
+            if len(batch) >= options["batch_size"]:
+                self.__delete(storage, batch, options["max_deletes_per_second"])
+                batch = []
+        if batch:
+            self.__delete(storage, batch, options["max_deletes_per_second"])
+        action = "found" if options["dry_run"] else "deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{scanned} profile image files scanned, {orphans} orphaned files {action}."
+            )
+        )
+
+    def __delete(self, storage, batch, max_deletes_per_second):
+        start = time.monotonic()
+        delete_image_files(storage, batch)
+        ## Wait until the batch fits in the allowed rate before going on
+        remaining = len(batch) / max_deletes_per_second - (time.monotonic() - start)
+        if remaining > 0:
+            time.sleep(remaining)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from extended_accounts.helpers import rebuild_account_directory
+
+
+class Command(BaseCommand):
+    help = "Rewrite the account directory (the denormalised read model of the accounts) from the accounts and profiles tables. Run it after changing accounts or profiles through queryset.update(), which skips the signals keeping the directory in sync. It can be run while the site is live."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of accounts written per query",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_account_directory(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{written} account directory entries rebuilt.")
+        )
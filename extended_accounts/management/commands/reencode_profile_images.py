@@ -0,0 +1,251 @@
+from django.core.management.base import BaseCommand
+from django.core.files.base import ContentFile
+from django.db import DEFAULT_DB_ALIAS
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.models.Profile import sharded_image_name
+from extended_accounts.helpers import (
+    delete_image_files_on_commit,
+    get_account_shards,
+    invalidate_cached_accounts,
+    legacy_image_files,
+    save_image_file,
+)
+from extended_accounts.signals.pre_save_profile_model import (
+    PROFILE_IMAGE_ENCODING_VERSION,
+    rendition_name,
+    transcode_renditions,
+)
+from concurrent.futures import ProcessPoolExecutor
+import django, os, posixpath, time
+
+
+def reencode_profile_image(name, content):
+    """
+    Transcode an image in a worker process. Only bytes travel between processes: the storage is read and written by the main process.
+    """
+    return transcode_renditions(ContentFile(content, name=name))
+
+
+def source_file(files):
+    """
+    The renditions are produced from the original upload. If it wasn't kept (see PROFILE_IMAGE_KEEP_SOURCE), the webp rendition is the only source left.
+    """
+    return next(
+        (file for file in files if not file.endswith(".webp")), files[0]
+    )  ## Raises IndexError if there are no files
+
+
+def read_checkpoint(path):
+    """
+    Return the last blob handled by a previous run. A checkpoint written for another encoding version is ignored, every image has to be transcoded again.
+    """
+    try:
+        with open(path) as file:
+            version, last_pk = file.read().split(":")
+    except (FileNotFoundError, ValueError):
+        return 0
+    return int(last_pk) if int(version) == PROFILE_IMAGE_ENCODING_VERSION else 0
+
+
+def write_checkpoint(path, last_pk):
+    with open(f"{path}.tmp", "w") as file:
+        file.write(f"{PROFILE_IMAGE_ENCODING_VERSION}:{last_pk}")
+    os.replace(f"{path}.tmp", path)  ## A crash never leaves a truncated checkpoint
+
+
+class Command(BaseCommand):
+    help = "Transcode again the stored profile images produced by an older version of the transcoder (see PROFILE_IMAGE_ENCODING_VERSION). Images stored before deduplication existed, which have no blob, are transcoded too and the manifest of their profile is rewritten. The images are transcoded in a pool of processes. Images already current are skipped, so the command can be interrupted and launched again at any time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes transcoding images",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of images processed per chunk",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File where the progress is saved after every chunk. A new run starts after the last blob recorded in it, so the images already handled aren't even scanned again. Images without blob are always scanned, the current ones are recognised by their rendition names",
+        )
+
+    def handle(self, *args, **options):
+        storage = Profile._meta.get_field("profile_image").storage
+        checkpoint = options["checkpoint"]
+        self.reencoded = self.skipped = self.failed = self.bytes_saved = 0
+        start = time.monotonic()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as executor:
+            self.reencode_blobs(storage, executor, options["chunk_size"], checkpoint)
+            ## Images stored before deduplication existed don't have a blob, they're found in the profiles of every shard if the accounts are sharded
+            for using in get_account_shards() or [DEFAULT_DB_ALIAS]:
+                self.reencode_profiles(storage, executor, options["chunk_size"], using)
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{self.reencoded} profile images re-encoded in {elapsed:.1f}s ({self.reencoded / elapsed if elapsed else 0:.1f} images/s), {self.bytes_saved} bytes saved, {self.skipped} skipped because they changed meanwhile, {self.failed} failed."
+            )
+        )
+
+    def reencode_blobs(self, storage, executor, chunk_size, checkpoint):
+        ## Blobs live in the primary database, whatever the shard of their profiles
+        outdated_blobs = (
+            ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+            .filter(encoding_version__lt=PROFILE_IMAGE_ENCODING_VERSION)
+            .order_by("pk")
+            .values_list("pk", "digest", "files", "encoding_version")
+        )
+        last_pk = read_checkpoint(checkpoint) if checkpoint else 0
+        ## Keyset pagination, as the rows we are iterating over are updated along the way
+        while chunk := list(outdated_blobs.filter(pk__gt=last_pk)[:chunk_size]):
+            last_pk = chunk[-1][0]
+            ## Transcoding is spread among the processes, storage and database operations stay in this one
+            jobs = []
+            for pk, digest, files, version in chunk:
+                future = self.submit(storage, executor, digest, files)
+                if future is not None:
+                    jobs.append(
+                        (pk, sharded_image_name(digest), files, version, future)
+                    )
+            for pk, name, files, version, future in jobs:
+                stored = self.store_renditions(storage, name, files, future)
+                if stored is None:
+                    continue
+                new_files, placeholder, previous_renditions, bytes_saved = stored
+                ## The version is part of the filter, so a blob refreshed meanwhile (eg: by another run) is left alone. If the blob was released meanwhile, the files just written are collected by the gc_profile_media command
+                updated = (
+                    ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+                    .filter(pk=pk, encoding_version=version)
+                    .update(
+                        files=new_files,
+                        placeholder=placeholder,
+                        encoding_version=PROFILE_IMAGE_ENCODING_VERSION,
+                    )
+                )
+                if not updated:
+                    self.skipped += 1
+                    continue
+                ## The profiles using the image may be in any shard if the accounts are sharded
+                for using in get_account_shards() or [DEFAULT_DB_ALIAS]:
+                    profiles = Profile.objects.using(using).filter(profile_image=name)
+                    account_ids = list(profiles.values_list("account_id", flat=True))
+                    profiles.update(
+                        profile_image_files=new_files,
+                        profile_image_placeholder=placeholder,
+                    )
+                    ## Cached by CachedModelBackend together with their profiles
+                    invalidate_cached_accounts(account_ids, using=using)
+                delete_image_files_on_commit(previous_renditions)
+                self.reencoded += 1
+                self.bytes_saved += bytes_saved
+            if checkpoint:
+                write_checkpoint(checkpoint, last_pk)
+
+    def reencode_profiles(self, storage, executor, chunk_size, using):
+        """
+        Re-encode the images without blob, stored before deduplication existed, and rewrite the manifest of their profile. They don't record their encoding version: an image is current once its manifest holds the renditions named after the current version.
+        """
+        profiles = (
+            Profile.objects.using(using)
+            .exclude(profile_image__isnull=True)
+            .exclude(profile_image="")
+            .order_by("pk")
+            .values_list("pk", "account_id", "profile_image", "profile_image_files")
+        )
+        last_pk = 0
+        ## Keyset pagination, as the rows we are iterating over are updated along the way
+        while chunk := list(profiles.filter(pk__gt=last_pk)[:chunk_size]):
+            last_pk = chunk[-1][0]
+            blob_digests = set(
+                ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+                .filter(
+                    digest__in=[posixpath.basename(name) for _, _, name, _ in chunk]
+                )
+                .values_list("digest", flat=True)
+            )
+            jobs = []
+            for pk, account_id, name, files in chunk:
+                if (
+                    posixpath.basename(name) in blob_digests
+                    or rendition_name(name, ".webp") in files
+                ):  ## Handled with its blob, or already current
+                    continue
+                ## Images older than the manifest are found by extension
+                files = files or legacy_image_files(name, storage)
+                future = self.submit(storage, executor, name, files)
+                if future is not None:
+                    jobs.append((pk, account_id, name, files, future))
+            for pk, account_id, name, files, future in jobs:
+                stored = self.store_renditions(storage, name, files, future)
+                if stored is None:
+                    continue
+                new_files, placeholder, previous_renditions, bytes_saved = stored
+                ## The name is part of the filter, so an image updated by its user in the meantime is never overwritten. The files just written are then collected by the gc_profile_media command
+                updated = (
+                    Profile.objects.using(using)
+                    .filter(pk=pk, profile_image=name)
+                    .update(
+                        profile_image_files=new_files,
+                        profile_image_placeholder=placeholder,
+                    )
+                )
+                if not updated:
+                    self.skipped += 1
+                    continue
+                invalidate_cached_accounts([account_id], using=using)
+                delete_image_files_on_commit(previous_renditions, using=using)
+                self.reencoded += 1
+                self.bytes_saved += bytes_saved
+
+    def submit(self, storage, executor, image, files):
+        """
+        Read the source of an image and hand it to a worker process. Return the future of its renditions, or None if the source can't be read.
+        """
+        try:
+            with storage.open(source_file(files)) as file:
+                content = file.read()
+        except (IndexError, OSError) as exc:  ## No files or missing source
+            self.stderr.write(f"Could not read the image {image}: {exc!r}")
+            self.failed += 1
+            return None
+        return executor.submit(reencode_profile_image, source_file(files), content)
+
+    def store_renditions(self, storage, name, files, future):
+        """
+        Store the renditions transcoded by a worker under new names. Return the new manifest, the placeholder, the previous renditions, to be deleted once the manifests point to the new ones, and the bytes saved. None if the image couldn't be transcoded.
+        """
+        try:
+            renditions, placeholder = future.result()
+        except Exception as exc:
+            self.stderr.write(f"Could not transcode the image {name}: {exc!r}")
+            self.failed += 1
+            return None
+        rendition_files = [rendition_name(name, suffix) for suffix in renditions]
+        previous_renditions = [
+            file
+            for file in files
+            if file not in rendition_files and os.path.splitext(file)[1] in renditions
+        ]
+        previous_size = sum(
+            storage.size(file) for file in previous_renditions if storage.exists(file)
+        )
+        for file, content in zip(rendition_files, renditions.values()):
+            save_image_file(storage, file, ContentFile(content))
+        new_files = [
+            file
+            for file in files
+            if file not in rendition_files and file not in previous_renditions
+        ] + rendition_files
+        return (
+            new_files,
+            placeholder,
+            previous_renditions,
+            previous_size - sum(len(content) for content in renditions.values()),
+        )
@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand
+from django.core.files.storage import FileSystemStorage
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models.Profile import sharded_image_name
+from extended_accounts.helpers import (
+    delete_image_files,
+    get_account_shards,
+    invalidate_cached_accounts,
+    legacy_image_files,
+)
+from django.db import DEFAULT_DB_ALIAS
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+
+def copy_into_shard(storage, file):
+    """
+    Make the file available under its sharded name while keeping the flat one, so the image can be served from both names until the database points to the new one.
+    If the storage lives in the local filesystem, the file is hard-linked, which is instant and doesn't use extra space. Otherwise, it's copied through the Storage API.
+    """
+    target = sharded_image_name(file)
+    if storage.exists(target):  ## Left by an interrupted previous run
+        return
+    if isinstance(storage, FileSystemStorage):
+        target_path = storage.path(target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            os.link(storage.path(file), target_path)
+            return
+        except OSError:  ## Eg: the filesystem doesn't support hard links
+            pass
+    with storage.open(file) as source:
+        storage.save(target, source)
+
+
+class Command(BaseCommand):
+    help = "Move the profile images stored with the flat layout into the sharded directory layout. The command can be run while the site is live and can be interrupted and launched again at any time, it continues with the images that haven't been moved yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of threads copying files into their shards",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of profiles processed per chunk",
+        )
+
+    def handle(self, *args, **options):
+        storage = Profile._meta.get_field("profile_image").storage
+        moved = skipped = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            ## The profiles are in every shard if the accounts are sharded
+            for using in get_account_shards() or [DEFAULT_DB_ALIAS]:
+                shard_moved, shard_skipped = self.reshard(
+                    storage, executor, options["chunk_size"], using
+                )
+                moved += shard_moved
+                skipped += shard_skipped
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{moved} profile images moved to the sharded layout, {skipped} skipped because they changed meanwhile."
+            )
+        )
+
+    def reshard(self, storage, executor, chunk_size, using):
+        ## Sharded names contain '/', so the profiles still in the flat layout are easy to spot. This is what makes the command resumable.
+        flat_profiles = (
+            Profile.objects.using(using)
+            .exclude(profile_image__isnull=True)
+            .exclude(profile_image="")
+            .exclude(profile_image__contains="/")
+            .order_by("pk")
+            .values_list("pk", "account_id", "profile_image", "profile_image_files")
+        )
+        moved = skipped = 0
+        last_pk = 0
+        ## Keyset pagination, as the rows we are iterating over are updated along the way
+        while chunk := list(flat_profiles.filter(pk__gt=last_pk)[:chunk_size]):
+            last_pk = chunk[-1][0]
+            chunk = [
+                (pk, account_id, name, files or legacy_image_files(name, storage))
+                for pk, account_id, name, files in chunk
+            ]
+            ## File operations are spread among the workers, database writes stay in this thread
+            list(
+                executor.map(
+                    lambda file: copy_into_shard(storage, file),
+                    [file for _, _, _, files in chunk for file in files],
+                )
+            )
+            for pk, account_id, name, files in chunk:
+                sharded_files = [sharded_image_name(file) for file in files]
+                ## The name is part of the filter, so an image updated by its user in the meantime is never overwritten
+                updated = (
+                    Profile.objects.using(using)
+                    .filter(pk=pk, profile_image=name)
+                    .update(
+                        profile_image=sharded_image_name(name),
+                        profile_image_files=sharded_files,
+                    )
+                )
+                if updated:
+                    invalidate_cached_accounts([account_id], using=using)
+                    delete_image_files(storage, files)
+                    moved += 1
+                else:
+                    delete_image_files(storage, sharded_files)
+                    skipped += 1
+        return moved, skipped
@@ -0,0 +1,26 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.db import connections
+from extended_accounts.models import AccountModel as Account
+from io import StringIO
+
+
+class BenchmarkSQLiteWritersTestCase(TestCase):
+    def test_benchmark(self):
+        output = StringIO()
+        call_command(
+            "benchmark_sqlite_writers",
+            "--writers",
+            "2",
+            "--signups",
+            "6",
+            stdout=output,
+        )
+        lines = output.getvalue().splitlines()
+        self.assertIn("journal_mode=WAL", lines[0])
+        self.assertIn("signups/s", lines[1])
+        self.assertEqual([line.split()[0] for line in lines[2:]], ["stock", "profile"])
+        ## Everything was written to the temporary databases
+        self.assertFalse(Account.all_objects.exists())
+        self.assertNotIn("benchmark_sqlite_stock", connections.settings)
+        self.assertNotIn("benchmark_sqlite_profile", connections.settings)
@@ -0,0 +1,77 @@
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from extended_accounts.models import AccountModel as Account
+from PIL import Image
+from io import BytesIO, StringIO
+import tempfile, shutil, os
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_test_image():
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1))
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BenchmarkWebpQualityTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def test_stored_images_sample(self):
+        Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
+        )
+        output = StringIO()
+        call_command(
+            "benchmark_webp_quality",
+            "--qualities",
+            "50,80",
+            "--max-bytes",
+            "1000",
+            "--min-psnr",
+            "40",
+            stdout=output,
+        )
+        for setting in ["quality=50", "quality=80", "max_bytes=1000", "min_psnr=40"]:
+            self.assertIn(setting, output.getvalue())
+        self.assertIn("ms/image", output.getvalue())
+
+    def test_corpus_directory(self):
+        corpus = os.path.join(MEDIA_ROOT, "corpus")
+        os.makedirs(corpus)
+        Image.effect_noise((32, 32), 60).convert("RGB").save(
+            os.path.join(corpus, "photo.png")
+        )
+        with open(os.path.join(corpus, "notes.txt"), "w") as file:
+            file.write("not an image")
+        output = StringIO()
+        errors = StringIO()
+        call_command(
+            "benchmark_webp_quality",
+            corpus,
+            "--qualities",
+            "80",
+            stdout=output,
+            stderr=errors,
+        )
+        self.assertIn("quality=80", output.getvalue())
+        self.assertIn("notes.txt", errors.getvalue())  ## Skipped
+
+    def test_empty_corpus(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_webp_quality", stdout=StringIO())
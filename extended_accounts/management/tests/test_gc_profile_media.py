@@ -0,0 +1,122 @@
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from extended_accounts.models import AccountModel as Account
+from PIL import Image
+from io import BytesIO, StringIO
+from unittest.mock import patch
+import tempfile, shutil, os, time
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_test_image():
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1))
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+def create_media_file(name, age=0):
+    path = os.path.join(MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(b"image")
+    modified_time = time.time() - age
+    os.utime(path, (modified_time, modified_time))
+    return path
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GcProfileMediaTestCase(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
+        )
+        two_days = 2 * 86400
+        self.old_orphans = [
+            create_media_file("0a/0b/0a0b" + "0" * 28 + ".webp", age=two_days),
+            create_media_file("0a/0b/0a0b" + "0" * 28 + ".png", age=two_days),
+            create_media_file("1" * 32 + ".webp", age=two_days),  ## Flat layout orphan
+        ]
+        self.young_orphan = create_media_file("0c/0d/0c0d" + "0" * 28 + ".webp")
+        self.other_app_file = create_media_file("documents/report.pdf", age=two_days)
+        self.legacy_image = create_media_file(
+            "2" * 32 + ".webp", age=two_days
+        )  ## Image stored before the manifest existed
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def __assert_kept(self):
+        for image in self.account.profile.profile_image_files:
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, image)))
+        self.assertTrue(os.path.exists(self.young_orphan))
+        self.assertTrue(os.path.exists(self.other_app_file))
+
+    def test_dry_run(self):
+        output = StringIO()
+        call_command("gc_profile_media", "--dry-run", stdout=output)
+        for orphan in self.old_orphans + [self.legacy_image]:
+            self.assertTrue(os.path.exists(orphan))
+            self.assertIn(os.path.relpath(orphan, MEDIA_ROOT), output.getvalue())
+        self.__assert_kept()
+
+    def test_delete_orphans(self):
+        Account.objects.create_user(
+            username="legacy",
+            email="legacy@mail.com",
+            phone_number=987654321,
+        ).update(profile_image="2" * 32)
+        output = StringIO()
+        call_command("gc_profile_media", stdout=output)
+        for orphan in self.old_orphans:
+            self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(self.legacy_image))
+        self.assertIn("3 orphaned files deleted", output.getvalue())
+        self.__assert_kept()
+
+    def test_delete_interrupted_writes(self):
+        temporary_file = create_media_file(
+            "0a/0b/0a0b" + "0" * 28 + ".webp.0123456789abcdef.tmp", age=2 * 86400
+        )  ## Left by a save interrupted before renaming the file into place
+        call_command("gc_profile_media", stdout=StringIO())
+        self.assertFalse(os.path.exists(temporary_file))
+        self.__assert_kept()
+
+    def test_delete_outdated_renditions(self):
+        outdated_rendition = create_media_file(
+            "0a/0b/0a0b" + "0" * 28 + ".v1.webp", age=2 * 86400
+        )  ## Replaced by the rendition of a new transcoder version
+        call_command("gc_profile_media", stdout=StringIO())
+        self.assertFalse(os.path.exists(outdated_rendition))
+        self.__assert_kept()
+
+    def test_grace_period(self):
+        call_command("gc_profile_media", "--grace-period", "0", stdout=StringIO())
+        self.assertFalse(os.path.exists(self.young_orphan))
+
+    @patch("time.sleep")
+    def test_rate_limit(self, mock_sleep):
+        call_command(
+            "gc_profile_media",
+            "--max-deletes-per-second",
+            "1",
+            "--batch-size",
+            "2",
+            stdout=StringIO(),
+        )
+        ## 4 orphans deleted in batches of 2 at 1 file per second
+        self.assertEqual(mock_sleep.call_count, 2)
+        for call in mock_sleep.call_args_list:
+            self.assertLessEqual(call.args[0], 2)
@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.utils import timezone
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models import AccountDirectoryModel as AccountDirectory
+from io import StringIO
+
+
+class RebuildAccountDirectoryTestCase(TestCase):
+    def setUp(self):
+        self.accounts = [
+            Account.objects.create_user(
+                username=f"johndoe{i}",
+                email=f"johndoe{i}@mail.com",
+                phone_number=123456780 + i,
+                first_name="John",
+            )
+            for i in range(3)
+        ]
+
+    def test_rebuild(self):
+        ## Changes skipping the signals, and an entry lost
+        Account.objects.update(is_active=True)
+        Profile.objects.update(first_name="Jane")
+        AccountDirectory.objects.filter(account=self.accounts[0]).delete()
+        stdout = StringIO()
+        ## A read and an upsert per chunk, then the empty chunk and the removal of the soft-deleted accounts
+        with self.assertNumQueries(6):
+            call_command("rebuild_account_directory", chunk_size=2, stdout=stdout)
+        self.assertIn("3 account directory entries rebuilt.", stdout.getvalue())
+        self.assertEqual(
+            list(
+                AccountDirectory.objects.values_list(
+                    "username", "is_active", "first_name", "phone_number"
+                )
+            ),
+            [(f"johndoe{i}", True, "Jane", 123456780 + i) for i in range(3)],
+        )
+
+    def test_account_without_profile(self):
+        Profile.objects.filter(account=self.accounts[0]).delete()
+        call_command("rebuild_account_directory", stdout=StringIO())
+        entry = AccountDirectory.objects.get(account=self.accounts[0])
+        self.assertEqual(entry.username, "johndoe0")
+        self.assertEqual(entry.first_name, "")
+
+    def test_soft_deleted_accounts_left_out(self):
+        Account.objects.filter(pk=self.accounts[0].pk).update(
+            deletion_requested_at=timezone.now()
+        )
+        stdout = StringIO()
+        call_command("rebuild_account_directory", stdout=stdout)
+        self.assertIn("2 account directory entries rebuilt.", stdout.getvalue())
+        self.assertFalse(
+            AccountDirectory.objects.filter(account=self.accounts[0]).exists()
+        )
@@ -0,0 +1,156 @@
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.signals.pre_save_profile_model import (
+    PROFILE_IMAGE_ENCODING_VERSION,
+    rendition_name,
+)
+from PIL import Image
+from io import BytesIO, StringIO
+import tempfile, shutil, os
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_test_image():
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1))
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ReencodeProfileImagesTestCase(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
+        )
+        self.blob = ProfileImageBlob.objects.get()
+        name = self.account.profile.profile_image.name
+        self.webp_path = os.path.join(MEDIA_ROOT, rendition_name(name, ".webp"))
+        ## Simulate an image transcoded by an older version of the transcoder
+        self.outdated_webp_path = os.path.join(
+            MEDIA_ROOT, rendition_name(name, ".webp", version=0)
+        )
+        os.remove(self.webp_path)
+        with open(self.outdated_webp_path, "wb") as file:
+            file.write(b"outdated webp" * 100)
+        files = [name + ".png", rendition_name(name, ".webp", version=0)]
+        ProfileImageBlob.objects.filter(pk=self.blob.pk).update(
+            files=files, encoding_version=0, placeholder=""
+        )
+        Profile.objects.filter(pk=self.account.profile.pk).update(
+            profile_image_files=files, profile_image_placeholder=""
+        )  ## Placeholders didn't exist yet
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def __reencode(self, *args):
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "reencode_profile_images", "--workers", "1", *args, stdout=output
+            )
+        return output.getvalue()
+
+    def test_reencode_outdated_images(self):
+        output = self.__reencode()
+        self.assertEqual(Image.open(self.webp_path).format, "WEBP")
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.encoding_version, PROFILE_IMAGE_ENCODING_VERSION)
+        profile = Profile.objects.get(pk=self.account.profile.pk)
+        self.assertEqual(self.blob.files, profile.profile_image_files)
+        ## New name for the new rendition, the outdated one is deleted
+        self.assertIn(
+            os.path.relpath(self.webp_path, MEDIA_ROOT), profile.profile_image_files
+        )
+        self.assertFalse(os.path.exists(self.outdated_webp_path))
+        ## The placeholder is filled in both the blob and the profiles using it
+        self.assertTrue(self.blob.placeholder.startswith("data:image/webp;base64,"))
+        self.assertEqual(
+            Profile.objects.get(pk=self.account.profile.pk).profile_image_placeholder,
+            self.blob.placeholder,
+        )
+        self.assertIn("1 profile images re-encoded", output)
+        self.assertIn("images/s", output)
+        self.assertIn(
+            f"{1300 - os.path.getsize(self.webp_path)} bytes saved", output
+        )  ## Throughput report
+
+    def test_reencode_images_without_blob(self):
+        ## Stored before deduplication and the manifest existed: a flat name, no blob and an empty manifest
+        account = Account.objects.create_user(
+            username="janedoe", email="janedoe@mail.com", phone_number=987654321
+        )
+        name = "0123456789abcdef0123456789abcdef"
+        with open(os.path.join(MEDIA_ROOT, f"{name}.png"), "wb") as file:
+            file.write(create_test_image().read())
+        with open(os.path.join(MEDIA_ROOT, f"{name}.webp"), "wb") as file:
+            file.write(b"outdated webp")
+        Profile.objects.filter(account=account).update(
+            profile_image=name, profile_image_files=[]
+        )
+        self.assertIn("2 profile images re-encoded", self.__reencode())
+        profile = Profile.objects.get(account=account)
+        self.assertEqual(
+            profile.profile_image_files,
+            [f"{name}.png", rendition_name(name, ".webp")],
+        )
+        self.assertEqual(
+            Image.open(os.path.join(MEDIA_ROOT, rendition_name(name, ".webp"))).format,
+            "WEBP",
+        )
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, f"{name}.webp")))
+        self.assertTrue(profile.profile_image_placeholder)
+        self.assertIn("0 profile images re-encoded", self.__reencode())
+
+    def test_skip_current_images(self):
+        self.__reencode()
+        self.assertIn("0 profile images re-encoded", self.__reencode())
+
+    def test_checkpoint(self):
+        checkpoint = os.path.join(MEDIA_ROOT, "checkpoint")
+        with open(checkpoint, "w") as file:
+            file.write(f"{PROFILE_IMAGE_ENCODING_VERSION}:{self.blob.pk}")
+        self.assertIn(
+            "0 profile images re-encoded", self.__reencode("--checkpoint", checkpoint)
+        )  ## Already handled by a previous run
+        with open(checkpoint, "w") as file:
+            file.write(f"{PROFILE_IMAGE_ENCODING_VERSION - 1}:{self.blob.pk}")
+        self.assertIn(
+            "1 profile images re-encoded", self.__reencode("--checkpoint", checkpoint)
+        )  ## Written for a previous encoding version, it doesn't count
+        with open(checkpoint) as file:
+            self.assertEqual(
+                file.read(), f"{PROFILE_IMAGE_ENCODING_VERSION}:{self.blob.pk}"
+            )
+
+    def test_missing_source_reported(self):
+        os.remove(
+            os.path.join(MEDIA_ROOT, self.account.profile.profile_image.name + ".png")
+        )
+        errors = StringIO()
+        output = StringIO()
+        call_command(
+            "reencode_profile_images",
+            "--workers",
+            "1",
+            stdout=output,
+            stderr=errors,
+        )
+        self.assertIn("1 failed", output.getvalue())
+        self.assertIn(self.blob.digest, errors.getvalue())
@@ -0,0 +1,129 @@
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.signals.pre_save_profile_model import (
+    PROFILE_IMAGE_ENCODING_VERSION,
+)
+from PIL import Image
+from io import BytesIO, StringIO
+from unittest.mock import patch
+import tempfile, shutil, os
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_test_image():
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1))
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ReshardProfileImagesTestCase(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
+        )
+        self.flat_name = self.__move_to_flat_layout(self.account.profile)
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def __move_to_flat_layout(
+        self, profile
+    ):  ## Simulate an image uploaded before the sharded layout existed
+        flat_files = []
+        for file in profile.profile_image_files:
+            ## Back then, renditions weren't versioned either
+            flat_file = os.path.basename(file).replace(
+                f".v{PROFILE_IMAGE_ENCODING_VERSION}", ""
+            )
+            os.rename(
+                os.path.join(MEDIA_ROOT, file), os.path.join(MEDIA_ROOT, flat_file)
+            )
+            flat_files.append(flat_file)
+        flat_name = os.path.basename(profile.profile_image.name)
+        Profile.objects.filter(pk=profile.pk).update(
+            profile_image=flat_name,
+            profile_image_files=flat_files,
+        )
+        return flat_name
+
+    def __assert_sharded(self, flat_name):
+        profile = Profile.objects.get(pk=self.account.profile.pk)
+        sharded_name = f"{flat_name[:2]}/{flat_name[2:4]}/{flat_name}"
+        self.assertEqual(profile.profile_image.name, sharded_name)
+        self.assertEqual(
+            sorted(profile.profile_image_files),
+            [sharded_name + ".png", sharded_name + ".webp"],
+        )
+        for extension in [".png", ".webp"]:
+            self.assertTrue(
+                os.path.exists(os.path.join(MEDIA_ROOT, sharded_name + extension))
+            )
+            self.assertFalse(
+                os.path.exists(os.path.join(MEDIA_ROOT, flat_name + extension))
+            )
+
+    def test_reshard_flat_image(self):
+        call_command("reshard_profile_images", stdout=StringIO())
+        self.__assert_sharded(self.flat_name)
+
+    def test_reshard_legacy_image_without_manifest(self):
+        Profile.objects.filter(pk=self.account.profile.pk).update(
+            profile_image_files=[]
+        )
+        call_command("reshard_profile_images", stdout=StringIO())
+        self.__assert_sharded(self.flat_name)
+
+    def test_reshard_is_resumable(self):
+        call_command("reshard_profile_images", stdout=StringIO())
+        ## Running it again doesn't touch the images already moved
+        output = StringIO()
+        call_command("reshard_profile_images", stdout=output)
+        self.assertIn("0 profile images moved", output.getvalue())
+        self.__assert_sharded(self.flat_name)
+
+    @override_settings(
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+    )
+    def test_reshard_storage_without_local_paths(self):
+        ## Object stores can't hard-link, so the files are copied through the Storage API
+        storage = Profile._meta.get_field("profile_image").storage
+        flat_name = "0123456789abcdef"
+        for extension in [".png", ".webp"]:
+            storage.save(flat_name + extension, ContentFile(b"image"))
+        Profile.objects.filter(pk=self.account.profile.pk).update(
+            profile_image=flat_name,
+            profile_image_files=[flat_name + ".png", flat_name + ".webp"],
+        )
+        with patch("os.link") as mock_os_link:
+            call_command("reshard_profile_images", stdout=StringIO())
+        mock_os_link.assert_not_called()
+        sharded_name = f"01/23/{flat_name}"
+        self.assertEqual(
+            Profile.objects.get(pk=self.account.profile.pk).profile_image.name,
+            sharded_name,
+        )
+        for extension in [".png", ".webp"]:
+            self.assertTrue(storage.exists(sharded_name + extension))
+            self.assertFalse(storage.exists(flat_name + extension))
@@ -1,4 +1,4 @@
-from django.db import models, transaction
+from django.db import models, router
 from django.apps import apps
 from django.contrib import auth
 from django.contrib.auth.models import (
@@ -9,16 +9,62 @@ from django.contrib.auth.models import (
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.hashers import make_password
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
+
+
+class AccountQuerySet(models.QuerySet):
+    """
+    When the accounts are sharded, the filters by pk, username, email or phone number of a queryset not bound to a database are sent to the shard holding the matching account, found in the lookup table (see AccountShardRouter). So Account.objects.get(username=...), get_object_or_404(Account, pk=...) or the authentication backends find the account wherever it is.
+    """
+
+    def route(self, filters):
+        from extended_accounts.helpers.account_sharding import (
+            ROUTABLE_LOOKUPS,
+            find_account_shard,
+            get_account_shards,
+        )
+
+        shards = get_account_shards()
+        lookup = next(
+            (lookup for lookup in filters if lookup in ROUTABLE_LOOKUPS), None
+        )
+        if self._db is not None or not shards or lookup is None:
+            return self
+        shard = find_account_shard(**{lookup: filters[lookup]})
+        if shard is None:  ## No such account in any shard
+            return self.using(shards[0]).none()
+        return self.using(shard)
+
+    def filter(self, *args, **kwargs):
+        return super(AccountQuerySet, self.route(kwargs)).filter(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        return super(AccountQuerySet, self.route(kwargs)).get(*args, **kwargs)
 
 
 class AccountManager(BaseUserManager):
+    """
+    Manager of the accounts. Unless include_deleted is True, the accounts whose deletion has been requested are hidden: they're deactivated and waiting to be purged (see AccountModel.request_deletion).
+    """
+
     use_in_migrations = True
 
+    def __init__(self, include_deleted=False):
+        super().__init__()
+        self.include_deleted = include_deleted
+
+    def get_queryset(self):
+        queryset = AccountQuerySet(self.model, using=self._db, hints=self._hints)
+        if self.include_deleted:
+            return queryset
+        return queryset.filter(deletion_requested_at__isnull=True)
+
     def _create_user(self, username, password, **extra_fields):
         """
         Create and save a user with the given username and password and the profile information in an associated profile model
         """
         from .Profile import ProfileModel as Profile
+        from extended_accounts.helpers.account_sharding import account_atomic
 
         if not username:
             raise ValueError("The given username must be set")
@@ -43,11 +89,20 @@ class AccountManager(BaseUserManager):
             is_active=is_active,
         )
         account.password = make_password(password)
-        with transaction.atomic():  ## Atomic transaction, if anything goes wrong everything must be rolled back
-            account.save(using=self._db)
-            Profile.objects.create(account=account, **extra_fields)
+        ## The default database, or the shard of the account if they're sharded
+        using = self._db or router.db_for_write(self.model, instance=account)
+        ## Atomic transaction, if anything goes wrong everything must be rolled back
+        with account_atomic(using):
+            account.save(using=using)
+            Profile.objects.using(using).create(account=account, **extra_fields)
         return account
 
+    def for_username(self, username):
+        """
+        Return a queryset with the account using the given username, bound to the database holding it (its shard if the accounts are sharded).
+        """
+        return self.filter(username=username)
+
     def create_user(self, username, password=None, **extra_fields):
         extra_fields.setdefault("is_staff", False)
         extra_fields.setdefault("is_superuser", False)
@@ -94,6 +149,51 @@ class AccountManager(BaseUserManager):
             )
         return self.none()
 
+    def with_perm_cached(
+        self, perm, is_active=True, include_superusers=True, backend=None, obj=None
+    ):
+        """
+        Variant of with_perm for popular permissions: the ids of the accounts holding the permission are cached across requests until groups, memberships or permissions change, so the permission joins don't run every time. Object permissions aren't cached.
+        When the accounts are sharded, the query can't be routed: call it on each shard with db_manager(shard).
+        """
+        from extended_accounts.helpers.account_sharding import get_account_shards
+        from extended_accounts.helpers.permission_cache import (
+            get_cached_permissions,
+            permissions_cache_key,
+        )
+
+        if obj is not None:
+            return self.with_perm(
+                perm,
+                is_active=is_active,
+                include_superusers=include_superusers,
+                backend=backend,
+                obj=obj,
+            )
+        if get_account_shards() and self._db is None:
+            raise ValueError(
+                "The accounts are sharded, with_perm_cached must be called on each "
+                "shard with db_manager()."
+            )
+        if not isinstance(perm, str):  ## Permission instance
+            perm = f"{perm.content_type.app_label}.{perm.codename}"
+        account_ids = get_cached_permissions(
+            permissions_cache_key(
+                "with_perm", perm, is_active, include_superusers, backend, self._db
+            ),
+            lambda: list(
+                self.with_perm(
+                    perm,
+                    is_active=is_active,
+                    include_superusers=include_superusers,
+                    backend=backend,
+                )
+                ## The backends query the default manager, whatever the database of this one
+                .using(self.db).values_list("pk", flat=True)
+            ),
+        )
+        return self.filter(pk__in=account_ids)
+
 
 class AccountModel(AbstractBaseUser, PermissionsMixin):
     """
@@ -127,26 +227,62 @@ class AccountModel(AbstractBaseUser, PermissionsMixin):
         ),
     )
 
+    deletion_requested_at = models.DateTimeField(
+        null=True, blank=True, editable=False, db_index=True
+    )  ## Set when the account is soft-deleted, the purge_deleted_accounts task deletes it for good
+
     objects = AccountManager()
+    ## Soft-deleted accounts included, eg: they keep their username, email and phone number until they're purged
+    all_objects = AccountManager(include_deleted=True)
 
     EMAIL_FIELD = "email"
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_stored_permission_flags()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.track_stored_permission_flags()
+
+    def track_stored_permission_flags(self):
+        """
+        Remember is_active and is_superuser as stored in the database. The accounts holding a permission depend on them, so post_save_account_model invalidates the cached permissions when they change (see AccountManager.with_perm_cached).
+        """
+        if "is_active" in self.__dict__ and "is_superuser" in self.__dict__:
+            self._stored_permission_flags = (self.is_active, self.is_superuser)
+        else:
+            self.__dict__.pop("_stored_permission_flags", None)
+
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")
         swappable = "AUTH_USER_MODEL"
 
+    def request_deletion(self):
+        """
+        Soft-delete the account: it's deactivated and hidden by AccountModel.objects right away, in a single UPDATE, while the heavy deletion (cascades, profile image files...) is done by the purge_deleted_accounts task once the transaction commits. So deleting an account takes the same time whatever the data it owns.
+        """
+        self.deletion_requested_at = timezone.now()
+        self.is_active = False
+        self.save(update_fields=["deletion_requested_at", "is_active"])
+
     def update(self, **kwargs):
         from .Profile import ProfileModel as Profile
+        from extended_accounts.helpers.account_sharding import account_atomic
 
-        ## Get the fields associated with the profile. We discard _state, id, account_id and date joined as they shouldn't be manually updated
+        ## Get the fields associated with the profile. We discard _state, id, account_id, date joined, profile_image_files and profile_image_placeholder as they shouldn't be manually updated
         profile_fields = list(Profile().__dict__.keys())
         profile_fields.remove("_state")
         profile_fields.remove("id")
         profile_fields.remove("account_id")
         profile_fields.remove("date_joined")
+        profile_fields.remove("profile_image_files")
+        profile_fields.remove("profile_image_placeholder")
         ## Get the fields related to the profile inside the update requested fields
         profile_update_requested_fields = {
             k: kwargs.pop(k) for k in profile_fields if k in kwargs
@@ -175,7 +311,8 @@ class AccountModel(AbstractBaseUser, PermissionsMixin):
             kwargs["email"] = AccountManager().normalize_email(email)
         self.__dict__.update(**kwargs)
         try:
-            with transaction.atomic():  ## Atomic transaction, if something goes wrong, everything must be rolled back
+            ## Atomic transaction, if something goes wrong, everything must be rolled back
+            with account_atomic(router.db_for_write(type(self), instance=self)):
                 self.save()
                 self.profile.save()
         except Exception as e:
@@ -0,0 +1,27 @@
+from django.db import models
+from django.conf import settings
+
+
+class AccountDirectoryModel(models.Model):
+    """
+    Denormalised read model with one row per account and the fields commonly displayed about it, so listing, searching or exporting accounts reads a single narrow table instead of joining accounts and profiles.
+    The rows are written by the save signals of AccountModel and ProfileModel and go away with their account. Changes made through queryset.update() skip the signals: run the rebuild_account_directory command after them.
+    """
+
+    account = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name="directory_entry",
+        on_delete=models.CASCADE,
+    )
+    username = models.CharField(max_length=150, db_index=True)
+    email = models.EmailField(blank=True, db_index=True)
+    is_active = models.BooleanField(default=False)
+    first_name = models.CharField(max_length=150, blank=True)
+    last_name = models.CharField(max_length=150, blank=True)
+    phone_number = models.IntegerField(null=True, db_index=True)
+    date_joined = models.DateTimeField(null=True)
+
+    class Meta:
+        ordering = ["username"]
+        indexes = [models.Index(fields=["last_name", "first_name"])]
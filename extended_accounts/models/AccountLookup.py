@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class AccountLookupModel(models.Model):
+    """
+    Global index of the accounts when they're sharded across several databases (see ACCOUNT_SHARDS). It lives in the default database, with one narrow row per account: its primary key is the id of the account, so ids are unique across shards, and its unique columns enforce the global uniqueness of usernames, emails and phone numbers, which the shards can't enforce by themselves. It also tells the shard holding each account.
+    """
+
+    username = models.CharField(max_length=150, unique=True)
+    email = models.EmailField(unique=True)
+    phone_number = models.IntegerField(unique=True, null=True)
+    shard = models.CharField(max_length=100)
@@ -1,15 +1,26 @@
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
+from django.urls import reverse
 from uuid import uuid4
+import hashlib
+
+
+def sharded_image_name(filename):
+    """
+    Place an image file inside a two-level hashed directory layout taken from its own name, eg: abcdef.webp -> ab/cd/abcdef.webp. This keeps the number of siblings per directory low even with millions of images.
+    """
+    filename = filename.rsplit("/", 1)[-1]
+    return f"{filename[:2]}/{filename[2:4]}/{filename}"
 
 
 def unique_image_name(instance, filename):
     """
-    This function is used by ImageField's upload_to in order to get a unique name for an updated image, obtained via uuid4.
+    This function is used by ImageField's upload_to in order to get a unique name for an updated image, obtained via uuid4. The image is stored using the sharded layout given by sharded_image_name.
+    Note that uploads going through the profile signals are stored under a content-addressed name instead (see ProfileImageBlobModel), this name is only used if the field stores the file by itself.
     WARNING: You might be tempted to use a lambda function instead of this one. That works perfectly when the application is running, but it fails when we make Django migrations. This is due to lambda functions cannot be serialized, which is a requirement for Django's migration framework. Therefore, to achieve a more consistent app, it is better to use this one.
     """
-    return uuid4().hex + "." + filename.split(".")[-1]
+    return sharded_image_name(uuid4().hex + "." + filename.split(".")[-1])
 
 
 class ProfileModel(models.Model):
@@ -21,7 +32,54 @@ class ProfileModel(models.Model):
     profile_image = models.ImageField(
         upload_to=unique_image_name, default=None, null=True
     )
+    profile_image_files = models.JSONField(
+        default=list, blank=True, editable=False
+    )  ## Manifest with the names (relative to MEDIA_ROOT) of every file stored for the current profile image. Removing an image just removes these files, so we never have to scan MEDIA_ROOT looking for them. Images are content-addressed, so the manifest is shared with every profile using the same image (see ProfileImageBlobModel).
+    profile_image_placeholder = models.TextField(
+        blank=True, default="", editable=False
+    )  ## Tiny blurry version of the current profile image as a webp data URI, templates inline it while the image loads so the page shows something without any extra request
     date_joined = models.DateTimeField(default=timezone.now)
     account = models.OneToOneField(
         settings.AUTH_USER_MODEL, related_name="profile", on_delete=models.CASCADE
     )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_stored_profile_image()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.track_stored_profile_image()
+
+    def track_stored_profile_image(self):
+        """
+        Remember the profile image name and manifest stored in the database for this instance, so the signals can tell whether the image changed without querying the database again. If any of them hasn't been loaded (deferred fields), nothing is tracked and the signals fall back to query it.
+        """
+        if "profile_image" in self.__dict__ and "profile_image_files" in self.__dict__:
+            profile_image = self.__dict__["profile_image"]
+            self._stored_profile_image = (
+                getattr(profile_image, "name", profile_image),
+                list(self.__dict__["profile_image_files"]),
+            )
+        else:
+            self.__dict__.pop("_stored_profile_image", None)
+
+    @property
+    def profile_image_url(self):
+        """
+        URL of the profile image. It changes whenever the files of the image do (eg: re-encoded), as the responses are cached forever.
+        """
+        if not self.profile_image:
+            return ""
+        version = hashlib.blake2b(
+            ",".join(self.profile_image_files).encode(), digest_size=4
+        ).hexdigest()
+        return (
+            reverse(
+                "extended_accounts:profile_image",
+                kwargs={"name": self.profile_image.name},
+            )
+            + f"?v={version}"
+        )
@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class ProfileImageBlobModel(models.Model):
+    """
+    Content-addressed record of a stored profile image. Profiles uploading the same image (same SHA-256 of the uploaded bytes) share a single blob, so the image is transcoded and stored only once. ref_count keeps track of the profiles using it, its files are removed when the last of them goes away.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    files = models.JSONField(
+        default=list
+    )  ## Manifest with the names of every file stored for the image
+    ref_count = models.PositiveIntegerField(default=0)
+    placeholder = models.TextField(
+        blank=True, default=""
+    )  ## Tiny inline version of the image (data URI), copied into the profiles using it
+    encoding_version = models.PositiveIntegerField(
+        default=0
+    )  ## Version of the transcoder which produced the renditions, images produced by an older version are refreshed by the reencode_profile_images command
@@ -1,2 +1,5 @@
 from .Account import AccountModel
 from .Profile import ProfileModel
+from .ProfileImageBlob import ProfileImageBlobModel
+from .AccountDirectory import AccountDirectoryModel
+from .AccountLookup import AccountLookupModel
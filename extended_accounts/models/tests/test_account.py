@@ -5,6 +5,7 @@ from django.contrib.auth.backends import BaseBackend
 from django.contrib.contenttypes.models import ContentType
 from django.db.utils import IntegrityError
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -81,11 +82,20 @@ class AccountModelTestCase(TestCase):
         self.assertEqual(
             self.account.profile.phone_number, self.initial_data["phone_number"]
         )
-        self.assertIn(
-            self.account.profile.profile_image.name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT, self.account.profile.profile_image.name + ".png"
+                )
+            )
         )
-        self.assertIn(
-            self.account.profile.profile_image.name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(self.account.profile.profile_image.name, ".webp"),
+                )
+            )
         )
 
     def test_create_user_rollback_OK_if_wrong_profile_data(self):
@@ -231,3 +241,20 @@ class AccountModelTestCase(TestCase):
     def test_manager_with_perm_KO_if_backend_not_string_not_None(self):
         with self.assertRaises(TypeError):
             Account.objects.with_perm(self.permission, backend=1)
+
+    def test_request_deletion(self):
+        account = Account.objects.create_user(
+            username="janedoe",
+            email="janedoe@mail.com",
+            phone_number=987654321,
+            is_active=True,
+        )
+        with self.assertNumQueries(2):  ## Its UPDATE and its directory entry
+            account.request_deletion()
+        self.assertFalse(account.is_active)
+        ## Hidden by the default manager, but still in the database until it's purged
+        self.assertFalse(Account.objects.filter(pk=account.pk).exists())
+        self.assertTrue(Account.all_objects.filter(pk=account.pk).exists())
+        self.assertEqual(
+            Account.all_objects.get(pk=account.pk).profile.phone_number, 987654321
+        )
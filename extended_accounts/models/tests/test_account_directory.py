@@ -0,0 +1,67 @@
+from django.test import TestCase
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import AccountDirectoryModel as AccountDirectory
+
+
+class AccountDirectoryModelTestCase(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            first_name="John",
+            last_name="Doe",
+        )
+
+    def __entry(self):
+        return AccountDirectory.objects.values(
+            "username",
+            "email",
+            "is_active",
+            "first_name",
+            "last_name",
+            "phone_number",
+        ).get(account=self.account)
+
+    def test_created_with_the_account(self):
+        self.assertEqual(
+            self.__entry(),
+            {
+                "username": "johndoe",
+                "email": "johndoe@mail.com",
+                "is_active": False,
+                "first_name": "John",
+                "last_name": "Doe",
+                "phone_number": 123456789,
+            },
+        )
+        self.assertEqual(
+            AccountDirectory.objects.get(account=self.account).date_joined,
+            self.account.profile.date_joined,
+        )
+
+    def test_synced_on_update(self):
+        self.account.update(
+            username="janedoe", first_name="Jane", phone_number=987654321
+        )
+        entry = self.__entry()
+        self.assertEqual(entry["username"], "janedoe")
+        self.assertEqual(entry["first_name"], "Jane")
+        self.assertEqual(entry["last_name"], "Doe")
+        self.assertEqual(entry["phone_number"], 987654321)
+        self.account.is_active = True
+        self.account.save()
+        self.assertTrue(self.__entry()["is_active"])
+
+    def test_not_synced_on_unrelated_update_fields(self):
+        self.account.is_active = True
+        ## The last_login UPDATE alone, no upsert of the directory row
+        with self.assertNumQueries(1):
+            self.account.save(update_fields=["last_login"])
+        self.assertFalse(self.__entry()["is_active"])
+        self.account.save(update_fields=["is_active"])
+        self.assertTrue(self.__entry()["is_active"])
+
+    def test_deleted_with_the_account(self):
+        self.account.delete()
+        self.assertFalse(AccountDirectory.objects.exists())
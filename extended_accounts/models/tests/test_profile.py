@@ -1,6 +1,7 @@
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.models.Profile import sharded_image_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, re
@@ -36,6 +37,12 @@ class ProfileModelTestCase(TestCase):
             profile_image=create_test_image(),
         )
         hex_name = re.compile(
-            r"^[0-9a-f]+$"
-        )  ##post_save signal removes the extension, so the image name should simply be a chunk of hexadecimal characters
+            r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]+$"
+        )  ##post_save signal removes the extension, so the image name should simply be a chunk of hexadecimal characters inside its sharded directories
         self.assertTrue(hex_name.match(account.profile.profile_image.name))
+
+    def test_sharded_image_name(self):
+        self.assertEqual(sharded_image_name("abcdef.png"), "ab/cd/abcdef.png")
+        ## Names already containing directories are sharded again from their base name
+        self.assertEqual(sharded_image_name("ab/cd/abcdef.png"), "ab/cd/abcdef.png")
+        self.assertEqual(sharded_image_name("old/abcdef.png"), "ab/cd/abcdef.png")
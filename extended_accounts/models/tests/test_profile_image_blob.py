@@ -0,0 +1,113 @@
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from PIL import Image
+from io import BytesIO
+import tempfile, shutil, hashlib, os
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_test_image(color=(0, 0, 0)):
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1), color)
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProfileImageBlobModelTestCase(
+    TestCase
+):  ## Blobs are handled by the profile signals, so we test them through account instances
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
+        )
+        self.other_account = Account.objects.create_user(
+            username="other",
+            email="other@mail.com",
+            phone_number=987654321,
+            profile_image=create_test_image(),
+        )
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def __assert_files_exist(self, files, exist=True):
+        for file in files:
+            self.assertEqual(os.path.exists(os.path.join(MEDIA_ROOT, file)), exist)
+
+    def test_identical_images_stored_once(self):
+        digest = hashlib.sha256(create_test_image().read()).hexdigest()
+        self.assertEqual(
+            self.account.profile.profile_image.name,
+            f"{digest[:2]}/{digest[2:4]}/{digest}",
+        )
+        self.assertEqual(
+            self.account.profile.profile_image.name,
+            self.other_account.profile.profile_image.name,
+        )
+        blob = ProfileImageBlob.objects.get(digest=digest)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.files, self.account.profile.profile_image_files)
+        self.__assert_files_exist(blob.files)
+
+    def test_files_deleted_with_last_reference(self):
+        files = self.account.profile.profile_image_files
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.delete()
+        self.assertEqual(ProfileImageBlob.objects.get().ref_count, 1)
+        self.__assert_files_exist(files)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_account.update(profile_image=None)
+        self.assertFalse(ProfileImageBlob.objects.exists())
+        self.__assert_files_exist(files, exist=False)
+
+    def test_reupload_before_files_deleted(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.account.update(profile_image=None)
+            self.other_account.update(profile_image=None)
+        ## Released, its files wait for the deletion
+        blob = ProfileImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 0)
+        self.__assert_files_exist(blob.files)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=create_test_image())
+        ## The deletion scheduled before the upload leaves the image alone
+        for callback in callbacks:
+            callback()
+        blob = ProfileImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 1)
+        self.__assert_files_exist(blob.files)
+        self.assertEqual(self.account.profile.profile_image_files, blob.files)
+
+    def test_reupload_same_image_keeps_reference_count(self):
+        files = self.account.profile.profile_image_files
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=create_test_image())
+        self.assertEqual(ProfileImageBlob.objects.get().ref_count, 2)
+        self.__assert_files_exist(files)
+
+    def test_replace_image(self):
+        files = self.account.profile.profile_image_files
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=create_test_image(color=(255, 0, 0)))
+            self.other_account.update(
+                profile_image=create_test_image(color=(255, 0, 0))
+            )
+        self.__assert_files_exist(files, exist=False)
+        blob = ProfileImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.files, self.account.profile.profile_image_files)
+        self.__assert_files_exist(blob.files)
@@ -1,11 +1,25 @@
+from .pre_save_account_model import pre_save_account_model
 from .post_save_account_model import post_save_account_model
+from .post_delete_account_model import post_delete_account_model
 from .pre_save_profile_model import pre_save_profile_model
 from .post_save_profile_model import post_save_profile_model
 from .post_delete_profile_model import post_delete_profile_model
+from .m2m_changed_account_model import m2m_changed_account_model
+from .m2m_changed_group_model import m2m_changed_group_model
+from .post_delete_group_model import post_delete_group_model
+from .post_save_permission_model import post_save_permission_model
+from .post_delete_permission_model import post_delete_permission_model
 
 __all__ = [
+    "pre_save_account_model",
     "post_save_account_model",
+    "post_delete_account_model",
     "pre_save_profile_model",
     "post_save_profile_model",
     "post_delete_profile_model",
+    "m2m_changed_account_model",
+    "m2m_changed_group_model",
+    "post_delete_group_model",
+    "post_save_permission_model",
+    "post_delete_permission_model",
 ]
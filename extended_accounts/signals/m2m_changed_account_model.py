@@ -0,0 +1,12 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import bump_permissions_version
+
+
+@receiver(m2m_changed, sender=Account.groups.through)
+@receiver(m2m_changed, sender=Account.user_permissions.through)
+def m2m_changed_account_model(sender, **kwargs):
+    ## The account joined/left a group or got/lost a permission, both from the account side (account.groups.add(...)) or from the other one (group.user_set.add(...))
+    if kwargs["action"] in ["post_add", "post_remove", "post_clear"]:
+        bump_permissions_version(using=kwargs["using"])
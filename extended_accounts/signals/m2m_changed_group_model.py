@@ -0,0 +1,11 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from extended_accounts.helpers import bump_permissions_version
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def m2m_changed_group_model(sender, **kwargs):
+    ## The permissions granted by a group changed, so did the permissions of its members
+    if kwargs["action"] in ["post_add", "post_remove", "post_clear"]:
+        bump_permissions_version(using=kwargs["using"])
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import AccountLookupModel as AccountLookup
+from extended_accounts.helpers import get_account_shards, invalidate_cached_accounts
+
+
+@receiver(post_delete, sender=Account)
+def post_delete_account_model(sender, **kwargs):
+    instance = kwargs["instance"]
+    ## A deleted account must not keep being authenticated from the cache
+    invalidate_cached_accounts([instance.pk], using=kwargs["using"])
+    if get_account_shards():  ## Its username, email and phone number are free again
+        AccountLookup.objects.filter(pk=instance.pk).delete()
@@ -0,0 +1,10 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from extended_accounts.helpers import bump_permissions_version
+
+
+@receiver(post_delete, sender=Group)
+def post_delete_group_model(sender, **kwargs):
+    ## The memberships and the permissions of the group are deleted in cascade, which doesn't send m2m_changed
+    bump_permissions_version(using=kwargs["using"])
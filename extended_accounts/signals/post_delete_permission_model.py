@@ -0,0 +1,10 @@
+from django.contrib.auth.models import Permission
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from extended_accounts.helpers import bump_permissions_version
+
+
+@receiver(post_delete, sender=Permission)
+def post_delete_permission_model(sender, **kwargs):
+    ## The permission is removed in cascade from every account and group holding it, which doesn't send m2m_changed
+    bump_permissions_version(using=kwargs["using"])
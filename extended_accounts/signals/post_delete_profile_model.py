@@ -1,25 +1,19 @@
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
-from django.conf import settings
 from extended_accounts.models import ProfileModel as Profile
-import os
+from extended_accounts.helpers import invalidate_cached_accounts, release_profile_image
 
 
-def delete_profile_image(instance):
-    profile_image = instance.profile_image
-    if profile_image.name:
-        list_of_images = filter(
-            lambda image: profile_image.name in image,
-            os.listdir(settings.MEDIA_ROOT),
+def delete_profile_image(instance, using=None):
+    ## The files are removed once the transaction commits and only if no other profile uses the same image
+    if instance.profile_image.name:
+        release_profile_image(
+            instance.profile_image.name, instance.profile_image_files, using=using
         )
-        for image in list_of_images:
-            try:
-                os.remove(os.path.join(settings.MEDIA_ROOT, image))
-            except:
-                pass
 
 
 @receiver(post_delete, sender=Profile)
 def post_delete_profile_model(sender, **kwargs):
     instance = kwargs["instance"]
-    delete_profile_image(instance)
+    delete_profile_image(instance, using=kwargs["using"])
+    invalidate_cached_accounts([instance.account_id], using=kwargs["using"])
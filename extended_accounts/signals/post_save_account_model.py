@@ -1,8 +1,18 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
 from extended_accounts.models import AccountModel as Account
-from extended_accounts.helpers import delete_unconfirmed_accounts
+from extended_accounts.helpers import (
+    availability_filter,
+    bump_permissions_version,
+    delete_unconfirmed_accounts,
+    invalidate_cached_accounts,
+    purge_deleted_accounts,
+    sync_account_directory,
+    get_account_shards,
+    update_account_lookup,
+)
 
 
 def trigger_delete_unconfirmed_accounts(instance):
@@ -16,8 +26,46 @@ def trigger_delete_unconfirmed_accounts(instance):
     )
 
 
+def trigger_purge_deleted_accounts(using):
+    if (
+        settings.TESTING ^ settings.INTEGRATION_TEST_CELERY
+    ):  ## Same as above, the purge is tested by calling the task directly
+        return
+    transaction.on_commit(purge_deleted_accounts.delay, using=using)
+
+
+def permission_flags_changed(instance, created):
+    ## The accounts holding a permission depend on is_active and is_superuser. A new account can only hold permissions without being added to any group if it's a superuser
+    if created:
+        return instance.is_superuser
+    return getattr(instance, "_stored_permission_flags", None) != (
+        instance.is_active,
+        instance.is_superuser,
+    )
+
+
 @receiver(post_save, sender=Account)
 def post_save_account_model(sender, **kwargs):
     instance = kwargs["instance"]
     if kwargs["created"]:
         trigger_delete_unconfirmed_accounts(instance)
+    else:
+        invalidate_cached_accounts([instance.pk], using=kwargs["using"])
+        if get_account_shards() and (
+            kwargs["update_fields"] is None
+            or kwargs["update_fields"] & {"username", "email"}
+        ):
+            update_account_lookup(
+                instance.pk, username=instance.username, email=instance.email
+            )
+    if "deletion_requested_at" in (kwargs["update_fields"] or []):
+        trigger_purge_deleted_accounts(kwargs["using"])
+    if permission_flags_changed(instance, kwargs["created"]):
+        bump_permissions_version(using=kwargs["using"])
+    instance.track_stored_permission_flags()
+    ## The availability endpoint must report the new values as taken
+    availability_filter.add("username", instance.username)
+    availability_filter.add("email", instance.email)
+    sync_account_directory(
+        instance, using=kwargs["using"], update_fields=kwargs["update_fields"]
+    )
@@ -0,0 +1,10 @@
+from django.contrib.auth.models import Permission
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from extended_accounts.helpers import bump_permissions_version
+
+
+@receiver(post_save, sender=Permission)
+def post_save_permission_model(sender, **kwargs):
+    ## Superusers hold every permission, including new ones, and renaming a permission changes the name checked by has_perm
+    bump_permissions_version(using=kwargs["using"])
@@ -1,24 +1,27 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from extended_accounts.models import ProfileModel as Profile
-from PIL import Image
-
-
-def manage_uploaded_image(instance):
-    profile_image = instance.profile_image
-    if (
-        profile_image and "." in profile_image.name
-    ):  ## If '.' in profile_image.name, it means the image has been updated since in the database the name is stored without extension
-        ## We save the image in webp format on the server.
-        path = profile_image.path
-        server_image = Image.open(profile_image)
-        server_image.save(f'{path.split(".")[0]}.webp', format="WEBP")
-        ## We save the name without extension in the database
-        profile_image.name = profile_image.name.split(".")[0]
-        instance.save()
+from extended_accounts.helpers import (
+    availability_filter,
+    invalidate_cached_accounts,
+    sync_account_directory,
+    get_account_shards,
+    update_account_lookup,
+)
 
 
 @receiver(post_save, sender=Profile)
 def post_save_profile_model(sender, **kwargs):
     instance = kwargs["instance"]
-    manage_uploaded_image(instance)
+    ## What we have just saved is now the image stored in the database
+    instance.track_stored_profile_image()
+    ## The profile is cached together with its account by CachedModelBackend
+    invalidate_cached_accounts([instance.account_id], using=kwargs["using"])
+    availability_filter.add("phone_number", instance.phone_number)
+    sync_account_directory(
+        instance, using=kwargs["using"], update_fields=kwargs["update_fields"]
+    )
+    if get_account_shards() and (
+        kwargs["update_fields"] is None or "phone_number" in kwargs["update_fields"]
+    ):
+        update_account_lookup(instance.account_id, phone_number=instance.phone_number)
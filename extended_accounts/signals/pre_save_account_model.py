@@ -0,0 +1,12 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import get_account_shards, reserve_account
+
+
+@receiver(pre_save, sender=Account)
+def pre_save_account_model(sender, **kwargs):
+    instance = kwargs["instance"]
+    ## Sharded accounts get their id from the lookup table, which also checks their username and email are free in every shard
+    if get_account_shards() and instance._state.adding and instance.pk is None:
+        reserve_account(instance, kwargs["using"])
@@ -1,37 +1,219 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
+from django.core.files.base import ContentFile
 from django.conf import settings
 from extended_accounts.models import ProfileModel as Profile
-import os
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.models.Profile import sharded_image_name
+from extended_accounts.helpers import (
+    encode_webp_within_budget,
+    release_profile_image,
+    save_image_file,
+)
+from PIL import Image, ImageCms, ImageOps
+from io import BytesIO
+import base64, hashlib, logging, os
 
+logger = logging.getLogger(__name__)
 
-def delete_previous_image_if_needed(instance):
-    profile_image = instance.profile_image
+
+def get_stored_profile_image(instance):
+    """
+    Return the name and the manifest of the image currently stored in the database for the instance. They're tracked by the model when the instance is loaded, the database is only queried if the instance doesn't know them (eg: it's been built by hand with an existing pk).
+    """
     try:
-        original_instance = Profile.objects.get(pk=instance.pk)
-    except Profile.DoesNotExist:
+        return instance._stored_profile_image
+    except AttributeError:
         pass
-    else:
-        conditions = [
-            profile_image.name
-            and profile_image.name
-            not in original_instance.profile_image.name,  ## Change image condition: Be careful because the post_save signal makes a save to remove the extension from the image name in the ddbb, if we use != here instead of not in, we delete the newly uploaded image since profile_image.name is the name without the extension and the original one (in this case what was saved initially when calling save) is the name with the extension
-            not profile_image.name
-            and original_instance.profile_image.name,  ## User's image deletion condition (the original instance has content but not the new one)
-        ]
-        if any(conditions):
-            list_of_images = filter(
-                lambda image: original_instance.profile_image.name in image,
-                os.listdir(settings.MEDIA_ROOT),
+    if instance.pk is None:
+        return None, []
+    try:
+        original_instance = Profile.objects.only(
+            "profile_image", "profile_image_files"
+        ).get(pk=instance.pk)
+    except Profile.DoesNotExist:
+        return None, []
+    return original_instance._stored_profile_image
+
+
+def delete_previous_image_if_needed(
+    instance, stored_image_name, stored_image_files, using=None
+):
+    if not instance.profile_image.name:
+        instance.profile_image_files = []
+        instance.profile_image_placeholder = ""
+    if (
+        stored_image_name and instance.profile_image.name != stored_image_name
+    ):  ## The image has been either updated or deleted by the user
+        ## The files are removed once the transaction commits and only if no other profile uses the same image, so a rolled back update keeps its image
+        release_profile_image(stored_image_name, stored_image_files, using=using)
+
+
+## Bump it whenever transcode_renditions changes (encoder settings, new renditions, placeholders...), then run the reencode_profile_images command to refresh the stored images
+PROFILE_IMAGE_ENCODING_VERSION = 2
+PROFILE_IMAGE_PLACEHOLDER_SIZE = (16, 16)
+
+
+def rendition_name(name, suffix, version=PROFILE_IMAGE_ENCODING_VERSION):
+    """
+    Name of a transcoded rendition, eg: ab/cd/abcdef.v2.webp. The version of the transcoder is part of it, so re-encoded renditions get new names (and URLs) instead of replacing files which clients and CDNs cache forever.
+    """
+    return f"{name}.v{version}{suffix}"
+
+
+def store_uploaded_image(storage, upload, name):
+    """
+    Store the renditions of the uploaded image under the given content-addressed name, and the upload itself unless PROFILE_IMAGE_KEEP_SOURCE is False. Return the manifest of the stored files and the placeholder of the image.
+    """
+    renditions = {}
+    transcoded_renditions, placeholder = transcode_renditions(upload)
+    source_suffix = os.path.splitext(upload.name)[1].lower()
+    ## If the upload already was a webp image, its transcoded version replaces it
+    if (
+        getattr(settings, "PROFILE_IMAGE_KEEP_SOURCE", True)
+        and source_suffix not in transcoded_renditions
+    ):
+        renditions[f"{name}{source_suffix}"] = upload
+    for suffix, content in transcoded_renditions.items():
+        renditions[rendition_name(name, suffix)] = ContentFile(content)
+    ## Files left by a rolled back upload have the same content-addressed name, so they're the very same image. They're replaced anyway, which also repairs them if they were incomplete
+    files = [
+        save_image_file(storage, file_name, content)
+        for file_name, content in renditions.items()
+    ]
+    return files, placeholder
+
+
+def transcode_renditions(upload):
+    """
+    Return the content of every rendition stored for an image, keyed by the suffix appended to the image name, together with the placeholder of the image. The image is decoded and normalized only once for all of them.
+    """
+    image, metadata_size = open_upright_image(upload)
+    return {
+        ".webp": transcode_to_webp(upload, image, metadata_size)
+    }, create_placeholder(image)
+
+
+def open_upright_image(upload):
+    """
+    Return the uploaded image ready to be transcoded, together with the size of the metadata it carried. If the upload went through ProfileImageField, the image it already decoded is reused. The EXIF orientation is applied to the pixels, so rotated phone photos are stored upright, and colors are converted to sRGB, which is what browsers assume for untagged images.
+    """
+    image = getattr(upload, "decoded_image", None)
+    if image is None:
+        image = Image.open(upload)
+    metadata_size = sum(
+        len(image.info.get(key) or b"") for key in ["exif", "icc_profile", "xmp"]
+    )
+    return convert_to_srgb(ImageOps.exif_transpose(image)), metadata_size
+
+
+def transcode_to_webp(upload, image, metadata_size):
+    """
+    Transcode the upright image into webp, dropping its metadata (EXIF, XMP, ICC profile). The encoder quality is either fixed or searched to meet a byte or perceptual budget, depending on the settings.
+    """
+    quality, webp_image = encode_webp_within_budget(image)
+    logger.info(
+        "Profile image transcoded to webp: %d bytes of metadata stripped, %d bytes uploaded, %d bytes stored",
+        metadata_size,
+        upload.size,
+        len(webp_image),
+        extra={
+            "metadata_bytes_stripped": metadata_size,
+            "upload_bytes": upload.size,
+            "webp_bytes": len(webp_image),
+            "webp_quality": quality,
+        },
+    )
+    return webp_image
+
+
+def create_placeholder(image):
+    """
+    Return a tiny blurry version of the image as a webp data URI (a couple hundred bytes), which templates inline while the real image loads.
+    """
+    placeholder = image.copy()
+    placeholder.thumbnail(PROFILE_IMAGE_PLACEHOLDER_SIZE)
+    if placeholder.mode not in ("RGB", "RGBA"):
+        placeholder = placeholder.convert(
+            "RGBA" if "transparency" in placeholder.info else "RGB"
+        )
+    placeholder_image = BytesIO()
+    placeholder.save(placeholder_image, format="WEBP", quality=30)
+    return "data:image/webp;base64," + base64.b64encode(
+        placeholder_image.getvalue()
+    ).decode("ascii")
+
+
+def convert_to_srgb(image):
+    icc_profile = image.info.get("icc_profile")
+    if not icc_profile:
+        return image
+    try:
+        return ImageCms.profileToProfile(
+            image,
+            ImageCms.ImageCmsProfile(BytesIO(icc_profile)),
+            ImageCms.createProfile("sRGB"),
+            outputMode="RGBA" if "A" in image.getbands() else "RGB",
+        )
+    except (
+        ImageCms.PyCMSError,
+        OSError,
+        ValueError,
+    ):  ## Broken or unsupported profile, the image is kept as is
+        return image
+
+
+def manage_uploaded_image(instance, stored_image_name, using=None):
+    profile_image = instance.profile_image
+    if (
+        profile_image and not profile_image._committed
+    ):  ## The image hasn't been stored yet, so it's been uploaded with this save
+        upload = profile_image.file
+        ## Images are content-addressed: identical uploads share the same name, they're transcoded and stored only once
+        digest = getattr(
+            upload, "sha256", None
+        )  ## Already computed if the upload went through ProfileImageField
+        if digest is None:
+            digest = hashlib.sha256()
+            for chunk in upload.chunks():
+                digest.update(chunk)
+            digest = digest.hexdigest()
+        name = sharded_image_name(digest)
+        ## Blobs live in the default database whatever the database of the profile (eg: its shard), as the files they count the references of are shared by every profile in the storage
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            blob, created = (
+                ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS)
+                .select_for_update()
+                .get_or_create(digest=digest)
             )
-            for image in list_of_images:
-                try:
-                    os.remove(os.path.join(settings.MEDIA_ROOT, image))
-                except:
-                    pass
+            if (
+                created or blob.ref_count == 0
+            ):  ## A blob left at ref_count=0 is waiting for its files to be deleted, they're stored again
+                blob.files, blob.placeholder = store_uploaded_image(
+                    profile_image.storage, upload, name
+                )
+                blob.encoding_version = PROFILE_IMAGE_ENCODING_VERSION
+                blob.save(update_fields=["files", "placeholder", "encoding_version"])
+            if (
+                name != stored_image_name
+            ):  ## Re-uploading the current image doesn't add a new reference
+                ProfileImageBlob.objects.using(DEFAULT_DB_ALIAS).filter(
+                    pk=blob.pk
+                ).update(ref_count=F("ref_count") + 1)
+        ## We save the name without extension in the database, together with the manifest of the stored files and the placeholder, so templates don't need any extra query. The field won't store the upload again since it's marked as committed
+        instance.profile_image = name
+        instance.profile_image_files = list(blob.files)
+        instance.profile_image_placeholder = blob.placeholder
 
 
 @receiver(pre_save, sender=Profile)
 def pre_save_profile_model(sender, **kwargs):
     instance = kwargs["instance"]
-    delete_previous_image_if_needed(instance)
+    stored_image_name, stored_image_files = get_stored_profile_image(instance)
+    ## The new image is referenced before releasing the previous one, so re-uploading the same image never deletes its files
+    manage_uploaded_image(instance, stored_image_name, using=kwargs["using"])
+    delete_previous_image_if_needed(
+        instance, stored_image_name, stored_image_files, using=kwargs["using"]
+    )
@@ -1,6 +1,8 @@
 from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 from unittest.mock import patch
@@ -40,13 +42,61 @@ class PostDeleteProfileModelTestCase(
 
     def test_post_delete_model_profile(self):
         previous_image_name = self.account.profile.profile_image.name
-        self.assertIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
-        self.account.delete()
-        self.assertNotIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertNotIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.delete()
+        self.assertFalse(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
+
+    def __store_legacy_image(self):
+        ## As stored before the manifest existed: a flat name, no blob and an empty manifest
+        name = "0123456789abcdef0123456789abcdef"
+        for extension in ["webp", "png"]:
+            with open(os.path.join(MEDIA_ROOT, f"{name}.{extension}"), "wb") as file:
+                file.write(b"image")
+        Profile.objects.filter(account=self.account).update(
+            profile_image=name, profile_image_files=[]
+        )
+        self.account = Account.objects.get(pk=self.account.pk)
+        return [
+            os.path.join(MEDIA_ROOT, f"{name}.{extension}")
+            for extension in ["webp", "png"]
+        ]
+
+    def test_legacy_image_files_deleted(self):
+        paths = self.__store_legacy_image()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.delete()
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
 
     @patch("os.remove")
     def test_non_blocking_execution_if_remove_nonexistent_image(self, mock_os_remove):
         mock_os_remove.side_effect = Exception("Simulated exception")
-        self.account.delete()
+        with self.assertLogs(
+            "extended_accounts.helpers.profile_image_storage", "WARNING"
+        ) as logs, self.captureOnCommitCallbacks(execute=True):
+            self.account.delete()
+        self.assertIn("Could not delete the profile image file", logs.output[0])
+
+    def test_post_delete_model_profile_does_not_scan_media_root(self):
+        image_files = self.account.profile.profile_image_files
+        with patch("os.listdir") as mock_os_listdir:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.account.delete()
+        mock_os_listdir.assert_not_called()
+        for image in image_files:
+            self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, image)))
@@ -1,6 +1,8 @@
 from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import InMemoryStorage
 from extended_accounts.models import AccountModel as Account
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, re, os
@@ -41,15 +43,75 @@ class PostSaveProfileModelTesCase(TestCase):
             phone_number=123456789,
             profile_image=create_test_image(),
         )
-        unique_name_without_extension = re.compile(r"^[0-9a-f]+$")
+        unique_name_without_extension = re.compile(
+            r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]+$"
+        )
         self.assertTrue(
             unique_name_without_extension.match(account.profile.profile_image.name)
         )  ## In the database, we only have the name without extensions
         ## But the image has been successfully uploaded to the server
         self.assertIn(MEDIA_ROOT, account.profile.profile_image.path)
-        self.assertIn(
-            account.profile.profile_image.name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, account.profile.profile_image.name + ".png")
+            )
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(account.profile.profile_image.name, ".webp"),
+                )
+            )
+        )
+        ## The manifest keeps track of every file stored for the image
+        self.assertEqual(
+            account.profile.profile_image_files,
+            [
+                account.profile.profile_image.name + ".png",
+                rendition_name(account.profile.profile_image.name, ".webp"),
+            ],
+        )
+
+    @override_settings(
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+    )
+    def test_post_save_model_profile_storage_without_local_paths(
+        self,
+    ):  ## Everything goes through the Storage API, so the images may live outside the local disk
+        account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
+        )
+        storage = account.profile.profile_image.storage
+        self.assertIsInstance(storage, InMemoryStorage)
+        for image in account.profile.profile_image_files:
+            self.assertTrue(storage.exists(image))
+        with self.captureOnCommitCallbacks(execute=True):
+            account.delete()
+        for image in account.profile.profile_image_files:
+            self.assertFalse(storage.exists(image))
+
+    def test_post_save_model_profile_tracks_stored_image(self):
+        account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            profile_image=create_test_image(),
         )
-        self.assertIn(
-            account.profile.profile_image.name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertEqual(
+            account.profile._stored_profile_image,
+            (
+                account.profile.profile_image.name,
+                account.profile.profile_image_files,
+            ),
         )
+        account.update(profile_image=None)
+        self.assertEqual(account.profile._stored_profile_image, (None, []))
@@ -1,17 +1,22 @@
 from django.test import TestCase, override_settings
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.models import AccountModel as Account
-from PIL import Image
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.helpers import ProfileImageField
+from extended_accounts.signals.pre_save_profile_model import rendition_name
+from PIL import Image, ImageCms
 from io import BytesIO
 from unittest.mock import patch
-import tempfile, shutil, os
+import tempfile, shutil, os, base64
 
 MEDIA_ROOT = tempfile.mkdtemp()
 
 
-def create_test_image():
+def create_test_image(color=(0, 0, 0)):
     image_buffer = BytesIO()
-    image_object = Image.new("RGB", (1, 1))
+    image_object = Image.new("RGB", (1, 1), color)
     image_object.save(image_buffer, "png")
     image_buffer.seek(0)
     image = SimpleUploadedFile(
@@ -21,6 +26,21 @@ def create_test_image():
     return image
 
 
+def create_test_photo():  ## A 2x1 JPEG taken with the camera rotated, as phones store them
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (2, 1))
+    exif = Image.Exif()
+    exif[0x0112] = 6  ## Orientation: rotate 90 degrees to display
+    image_object.save(
+        image_buffer,
+        "jpeg",
+        exif=exif.tobytes(),
+        icc_profile=ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes(),
+    )
+    image_buffer.seek(0)
+    return SimpleUploadedFile("test_photo.jpg", image_buffer.read())
+
+
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class PreSaveProfileModelTestCase(TestCase):
     def setUp(
@@ -41,21 +61,202 @@ class PreSaveProfileModelTestCase(TestCase):
     def test_pre_save_model_profile(self):
         ## Test previous image deletion if a new one is saved
         previous_image_name = self.account.profile.profile_image.name
-        self.assertIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
-        self.account.update(profile_image=create_test_image())
-        self.assertNotIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertNotIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=create_test_image(color=(255, 255, 255)))
+        self.assertFalse(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
 
         ## Test previous image deletion if the image is deleted
         previous_image_name = self.account.profile.profile_image.name
-        self.assertIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
-        self.account.update(profile_image=None)
-        self.assertNotIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertNotIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=None)
+        self.assertFalse(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
+
+    def __store_legacy_image(self):
+        ## As stored before the manifest existed: a flat name, no blob and an empty manifest
+        name = "0123456789abcdef0123456789abcdef"
+        for extension in ["webp", "png"]:
+            with open(os.path.join(MEDIA_ROOT, f"{name}.{extension}"), "wb") as file:
+                file.write(b"image")
+        Profile.objects.filter(account=self.account).update(
+            profile_image=name, profile_image_files=[]
+        )
+        self.account = Account.objects.get(pk=self.account.pk)
+        return [
+            os.path.join(MEDIA_ROOT, f"{name}.{extension}")
+            for extension in ["webp", "png"]
+        ]
+
+    def test_legacy_image_files_deleted(self):
+        paths = self.__store_legacy_image()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=None)
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
 
     @patch("os.remove")
     def test_non_blocking_execution_if_remove_nonexistent_image(self, mock_os_remove):
         mock_os_remove.side_effect = Exception("Simulated exception")
-        self.account.update(profile_image=create_test_image())
+        with self.assertLogs(
+            "extended_accounts.helpers.profile_image_storage", "WARNING"
+        ) as logs, self.captureOnCommitCallbacks(execute=True):
+            self.account.update(profile_image=create_test_image(color=(255, 255, 255)))
+        self.assertIn("Could not delete the profile image file", logs.output[0])
+
+    def test_previous_image_deletion_does_not_scan_media_root(self):
+        with patch("os.listdir") as mock_os_listdir:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.account.update(
+                    profile_image=create_test_image(color=(255, 255, 255))
+                )
+                self.account.update(profile_image=None)
+        mock_os_listdir.assert_not_called()
+        self.assertEqual(self.account.profile.profile_image_files, [])
+
+    def test_profile_save_is_a_single_query(self):
+        ## The stored image is known by the instance, so no extra SELECT is needed to compare it. The only other query writes the account directory
+        profile = Profile.objects.get(account=self.account)
+        profile.first_name = "Johnny"
+        with self.assertNumQueries(2):
+            profile.save()
+        ## Uploading an image doesn't require a second UPDATE to remove its extension. The other queries handle the content-addressed image
+        profile.profile_image = create_test_image(color=(255, 255, 255))
+        with CaptureQueriesContext(connection) as queries:
+            profile.save()
+        profile_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if Profile._meta.db_table in query["sql"]
+        ]
+        self.assertEqual(len(profile_queries), 1)
+        self.assertTrue(profile_queries[0].startswith("UPDATE"))
+        self.assertNotIn(".", profile.profile_image.name)
+        self.assertEqual(
+            Profile.objects.get(pk=profile.pk).profile_image.name,
+            profile.profile_image.name,
+        )
+
+    def test_previous_image_deletion_if_stored_image_unknown(self):
+        ## An instance built by hand doesn't know what's stored, so it's looked up in the database
+        previous_image_files = self.account.profile.profile_image_files
+        profile = Profile(
+            pk=self.account.profile.pk,
+            account=self.account,
+            phone_number=123456789,
+            profile_image=create_test_image(color=(255, 255, 255)),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        for image in previous_image_files:
+            self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, image)))
+        for image in profile.profile_image_files:
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, image)))
+
+    def test_previous_image_kept_if_transaction_rolled_back(self):
+        previous_image_files = self.account.profile.profile_image_files
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.account.update(
+                        profile_image=create_test_image(color=(255, 255, 255))
+                    )
+                    raise Exception("Simulated failure after the update")
+            except Exception:
+                pass
+        self.assertEqual(callbacks, [])
+        for image in previous_image_files:
+            self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, image)))
+
+    def test_webp_upright_without_metadata(self):
+        with self.assertLogs(
+            "extended_accounts.signals.pre_save_profile_model", level="INFO"
+        ) as logs:
+            self.account.update(profile_image=create_test_photo())
+        webp_image = Image.open(
+            os.path.join(
+                MEDIA_ROOT,
+                rendition_name(self.account.profile.profile_image.name, ".webp"),
+            )
+        )
+        self.assertEqual(webp_image.size, (1, 2))
+        self.assertNotIn("exif", webp_image.info)
+        self.assertNotIn("icc_profile", webp_image.info)
+        ## The size savings are reported
+        self.assertGreater(logs.records[0].metadata_bytes_stripped, 0)
+
+    def test_upload_validated_by_form_is_not_decoded_again(self):
+        upload = ProfileImageField().clean(create_test_image(color=(255, 255, 255)))
+        with patch(
+            "extended_accounts.signals.pre_save_profile_model.Image.open"
+        ) as mock_open, patch.object(
+            upload, "chunks", wraps=upload.chunks
+        ) as mock_chunks:
+            self.account.update(profile_image=upload)
+        mock_open.assert_not_called()  ## The image decoded by the form is transcoded
+        self.assertEqual(
+            mock_chunks.call_count, 1
+        )  ## The upload is only read to be stored, its digest comes from the form
+        self.assertEqual(
+            os.path.basename(self.account.profile.profile_image.name), upload.sha256
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(self.account.profile.profile_image.name, ".webp"),
+                )
+            )
+        )
+
+    @override_settings(PROFILE_IMAGE_KEEP_SOURCE=False)
+    def test_source_dropped_once_transcoded(self):
+        self.account.update(profile_image=create_test_image(color=(0, 0, 255)))
+        name = self.account.profile.profile_image.name
+        self.assertEqual(
+            self.account.profile.profile_image_files, [rendition_name(name, ".webp")]
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, rendition_name(name, ".webp")))
+        )
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, name + ".png")))
+
+    def test_placeholder(self):
+        placeholder = self.account.profile.profile_image_placeholder
+        self.assertTrue(placeholder.startswith("data:image/webp;base64,"))
+        self.assertLess(len(placeholder), 400)  ## Small enough to be inlined
+        placeholder_image = Image.open(
+            BytesIO(base64.b64decode(placeholder.split(",")[1]))
+        )
+        self.assertLessEqual(max(placeholder_image.size), 16)
+        ## The placeholder goes away with the image
+        self.account.update(profile_image=None)
+        self.assertEqual(self.account.profile.profile_image_placeholder, "")
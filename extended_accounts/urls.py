@@ -10,11 +10,23 @@ from extended_accounts.views import (
     RedirectAccountView,
     ListAccountView,
     DeleteProfileImageView,
+    ProfileImageView,
+    AccountAvailabilityView,
 )
+from extended_accounts.helpers import throttle
 
 app_name = "extended_accounts"
 urlpatterns = [
-    path("new_account/", NewAccountView.as_view(), name="new_account"),
+    path(
+        "new_account/",
+        throttle("new_account")(NewAccountView.as_view()),
+        name="new_account",
+    ),
+    path(
+        "availability/",
+        throttle("availability", methods=["GET"])(AccountAvailabilityView.as_view()),
+        name="availability",
+    ),
     path(
         "account_confirmation/<str:username>/<token>/",
         AccountConfirmationView.as_view(),
@@ -22,7 +34,9 @@ urlpatterns = [
     ),
     path(
         "login/",
-        auth_views.LoginView.as_view(template_name="extended_accounts/login.html"),
+        throttle("login", fields=["username"])(
+            auth_views.LoginView.as_view(template_name="extended_accounts/login.html")
+        ),
         name="login",
     ),
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
@@ -42,12 +56,16 @@ urlpatterns = [
     ),
     path(
         "reset_password_request/",
-        auth_views.PasswordResetView.as_view(
-            success_url=reverse_lazy("extended_accounts:reset_password_request_done"),
-            template_name="extended_accounts/password_reset_form.html",
-            email_template_name="extended_accounts/password_reset_email.html",
-            subject_template_name="extended_accounts/password_reset_subject.html",
-            from_email=settings.DEFAULT_FROM_EMAIL,
+        throttle("reset_password_request", fields=["email"])(
+            auth_views.PasswordResetView.as_view(
+                success_url=reverse_lazy(
+                    "extended_accounts:reset_password_request_done"
+                ),
+                template_name="extended_accounts/password_reset_form.html",
+                email_template_name="extended_accounts/password_reset_email.html",
+                subject_template_name="extended_accounts/password_reset_subject.html",
+                from_email=settings.DEFAULT_FROM_EMAIL,
+            )
         ),
         name="reset_password_request",
     ),
@@ -82,5 +100,10 @@ urlpatterns = [
         DeleteProfileImageView.as_view(),
         name="delete_profile_image",
     ),
+    path(
+        "profile_image/<path:name>/",
+        ProfileImageView.as_view(),
+        name="profile_image",
+    ),
     path("redirect_account/", RedirectAccountView.as_view(), name="redirect_account"),
 ]
@@ -0,0 +1,52 @@
+from django.views.generic import View
+from django.http import JsonResponse
+from django.core.validators import validate_email
+from django.core.exceptions import ValidationError
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import availability_filter
+import re
+
+PHONE_NUMBER = re.compile(r"^[0-9]{9}$")  ## Same format as the forms
+
+
+class AccountAvailabilityView(View):
+    """
+    Tell whether a username, email or phone number is free, eg: /availability/?username=johndoe answers {"field": "username", "value": "johndoe", "available": true}.
+    Meant to be called as the user types in the signup form: free values are answered from the availability filter without querying the database. Staff members get the filter stats in the answer as well.
+    """
+
+    def get(self, request):
+        fields = [
+            field for field in availability_filter.lookups if field in request.GET
+        ]
+        if len(fields) != 1:
+            return JsonResponse(
+                {"error": "Provide exactly one of username, email or phone_number."},
+                status=400,
+            )
+        field = fields[0]
+        try:
+            value = self.clean(field, request.GET[field].strip())
+        except ValidationError as e:
+            return JsonResponse({"error": e.messages[0]}, status=400)
+        data = {
+            "field": field,
+            "value": value,
+            "available": availability_filter.is_available(field, value),
+        }
+        if request.user.is_staff:
+            data["filter"] = availability_filter.stats()
+        return JsonResponse(data)
+
+    def clean(self, field, value):
+        ## Normalized the way they're stored, so they're looked up as they'd be saved
+        if not value:
+            raise ValidationError(f"The {field} cannot be empty.")
+        if field == "username":
+            return Account.normalize_username(value)
+        if field == "email":
+            validate_email(value)
+            return Account.objects.normalize_email(value)
+        if not PHONE_NUMBER.match(value):
+            raise ValidationError("Phone number must contain 9 digits")
+        return int(value)
@@ -12,7 +12,7 @@ class AccountConfirmationView(View):
         ## If the account does not exist or it is already validated, we return a 404.
         ## We don't want this URL to be visited more than once per user.
         ## If everything is OK, we activate the account and redirect.
-        account = get_object_or_404(Account, username=kwargs["username"])
+        account = get_object_or_404(Account.objects.for_username(kwargs["username"]))
         if account.is_active:
             raise Http404
         if default_token_generator.check_token(account, kwargs["token"]):
@@ -1,8 +1,9 @@
 from django.views.generic import DeleteView
 from django.shortcuts import get_object_or_404
+from django.contrib.auth import logout
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
-from django.http import Http404
+from django.http import Http404, HttpResponseRedirect
 from extended_accounts.models import AccountModel as Account
 
 
@@ -14,7 +15,13 @@ class DeleteAccountView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return reverse_lazy("extended_accounts:login")
 
     def get_object(self):
-        return get_object_or_404(Account, username=self.kwargs["username"])
+        return get_object_or_404(Account.objects.for_username(self.kwargs["username"]))
+
+    def form_valid(self, form):
+        ## The account is soft-deleted, the purge_deleted_accounts task does the actual deletion out of the request/response cycle
+        self.object.request_deletion()
+        logout(self.request)
+        return HttpResponseRedirect(self.get_success_url())
 
     def test_func(self):
         account = self.get_object()
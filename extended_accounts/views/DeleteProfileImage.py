@@ -9,7 +9,7 @@ from extended_accounts.models import AccountModel as Account
 class DeleteProfileImageView(LoginRequiredMixin, UserPassesTestMixin, View):
 
     def get_object(self):
-        return get_object_or_404(Account, username=self.kwargs["username"])
+        return get_object_or_404(Account.objects.for_username(self.kwargs["username"]))
 
     def post(self, *args, **kwargs):
         account = self.get_object()
@@ -9,5 +9,7 @@ class DetailAccountView(LoginRequiredMixin, DetailView):
     template_name = "extended_accounts/detail_account.html"
 
     def get_object(self):
-        account = get_object_or_404(Account, username=self.kwargs["username"])
+        account = get_object_or_404(
+            Account.objects.for_username(self.kwargs["username"])
+        )
         return account
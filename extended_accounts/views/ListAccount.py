@@ -1,8 +1,22 @@
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import AccountDirectoryModel as AccountDirectory
+from extended_accounts.helpers import get_account_shards
+from itertools import chain
 
 
 class ListAccountView(LoginRequiredMixin, ListView):
     template_name = "extended_accounts/list_account.html"
-    model = Account
+    model = AccountDirectory  ## Single narrow table, no join with the profiles
+
+    def get_queryset(self):
+        shards = get_account_shards()
+        if not shards:
+            return super().get_queryset()
+        ## Each shard keeps the directory of its own accounts
+        return sorted(
+            chain.from_iterable(
+                AccountDirectory.objects.using(shard) for shard in shards
+            ),
+            key=lambda entry: entry.username,
+        )
@@ -3,11 +3,11 @@ from django.core.mail import send_mail
 from django.views.generic.edit import CreateView
 from django.contrib.auth.tokens import default_token_generator
 from django.conf import settings
-from extended_accounts.helpers import NewAccountForm
+from extended_accounts.helpers import NewAccountForm, ProfileImageUploadErrorMixin
 from extended_accounts.models import AccountModel as Account
 
 
-class NewAccountView(CreateView):
+class NewAccountView(ProfileImageUploadErrorMixin, CreateView):
     template_name = "extended_accounts/new_account.html"
     form_class = NewAccountForm
 
@@ -0,0 +1,97 @@
+from django.views.generic import View
+from django.http import (
+    Http404,
+    HttpResponse,
+    FileResponse,
+    HttpResponseNotModified,
+)
+from django.conf import settings
+from django.utils.http import quote_etag
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.models import ProfileImageBlobModel as ProfileImageBlob
+from extended_accounts.helpers import get_account_shards, legacy_image_files
+from urllib.parse import quote
+import mimetypes, posixpath, re
+
+## Names of stored profile images, without extension. Anything else is rejected before touching the storage
+PROFILE_IMAGE_NAME = re.compile(r"^([0-9a-f]{2}/[0-9a-f]{2}/)?[0-9a-f]{32,}$")
+
+
+class ProfileImageView(View):
+    """
+    Serve a profile image in the best format accepted by the client: webp if the Accept header allows it, the original upload otherwise.
+    Image names are unique and content-addressed, and renditions re-encoded by a new transcoder version get new file names (see rendition_name) and URLs (see ProfileModel.profile_image_url), so the responses are cacheable forever. In production, the bytes should be sent by the front server: set PROFILE_IMAGE_SENDFILE_HEADER to X-Accel-Redirect (nginx, the file is then served from PROFILE_IMAGE_SENDFILE_PREFIX + its name, which should be an internal location) or to X-Sendfile (Apache, the file is served from its absolute path).
+    """
+
+    cache_control = "public, max-age=31536000, immutable"
+
+    def get(self, request, name):
+        if not PROFILE_IMAGE_NAME.match(name):
+            raise Http404
+        file = self.negotiate_file(request, self.get_files(name))
+        etag = quote_etag(posixpath.basename(file))
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = self.send_file(file)
+        response["ETag"] = etag
+        response["Cache-Control"] = self.cache_control
+        response["Vary"] = "Accept"
+        return response
+
+    def get_files(self, name):
+        files = (
+            ProfileImageBlob.objects.filter(digest=posixpath.basename(name))
+            .values_list("files", flat=True)
+            .first()
+        )
+        ## Images stored before deduplication existed don't have a blob, they're looked up in the profiles of every shard if the accounts are sharded
+        shards = list(get_account_shards()) or [None]
+        while files is None and shards:
+            files = (
+                Profile.objects.using(shards.pop(0))
+                .filter(profile_image=name)
+                .values_list("profile_image_files", flat=True)
+                .first()
+            )
+        if (
+            files == []
+        ):  ## Stored before the manifest existed, its files are found by extension
+            files = legacy_image_files(
+                name, Profile._meta.get_field("profile_image").storage
+            )
+        if not files:
+            raise Http404
+        return files
+
+    def negotiate_file(self, request, files):
+        webp_files = [file for file in files if file.endswith(".webp")]
+        other_files = [file for file in files if not file.endswith(".webp")]
+        if "image/webp" in request.headers.get("Accept", "") or not other_files:
+            return (webp_files or other_files)[0]
+        return other_files[0]
+
+    def send_file(self, file):
+        storage = Profile._meta.get_field("profile_image").storage
+        content_type = mimetypes.guess_type(file)[0] or "application/octet-stream"
+        sendfile_header = getattr(settings, "PROFILE_IMAGE_SENDFILE_HEADER", None)
+        if sendfile_header == "X-Sendfile":
+            try:
+                path = storage.path(file)
+            except (
+                NotImplementedError
+            ):  ## Storages outside the local filesystem (eg: object stores) have no path the front server could send, the bytes go through Python
+                sendfile_header = None
+        if sendfile_header == "X-Sendfile":
+            response = HttpResponse(content_type=content_type)
+            response[sendfile_header] = path
+        elif sendfile_header:
+            response = HttpResponse(content_type=content_type)
+            response[sendfile_header] = getattr(
+                settings, "PROFILE_IMAGE_SENDFILE_PREFIX", "/"
+            ) + quote(file)
+        else:  ## Development: the bytes go through Python
+            if not storage.exists(file):
+                raise Http404
+            response = FileResponse(storage.open(file), content_type=content_type)
+        return response
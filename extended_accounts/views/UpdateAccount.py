@@ -5,10 +5,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from extended_accounts.models import AccountModel as Account
-from extended_accounts.helpers import UpdateAccountForm
+from extended_accounts.helpers import UpdateAccountForm, ProfileImageUploadErrorMixin
 
 
-class UpdateAccountView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class UpdateAccountView(
+    LoginRequiredMixin, UserPassesTestMixin, ProfileImageUploadErrorMixin, UpdateView
+):
     template_name = "extended_accounts/update_account.html"
     model = Account
     form_class = UpdateAccountForm
@@ -17,7 +19,7 @@ class UpdateAccountView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return reverse_lazy("extended_accounts:redirect_account")
 
     def get_object(self):
-        return get_object_or_404(Account, username=self.kwargs["username"])
+        return get_object_or_404(Account.objects.for_username(self.kwargs["username"]))
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -6,3 +6,5 @@ from .UpdateAccount import UpdateAccountView
 from .ListAccount import ListAccountView
 from .DeleteAccount import DeleteAccountView
 from .DeleteProfileImage import DeleteProfileImageView
+from .ProfileImage import ProfileImageView
+from .AccountAvailability import AccountAvailabilityView
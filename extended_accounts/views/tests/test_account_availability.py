@@ -0,0 +1,72 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse_lazy
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.helpers import availability_filter
+
+
+class AccountAvailabilityViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            password="[Pass1234]",
+            is_active=True,
+        )
+        cls.url = reverse_lazy("extended_accounts:availability")
+
+    def setUp(self):
+        availability_filter.build()
+
+    def test_available(self):
+        with self.assertNumQueries(0):  ## Answered by the filter
+            response = self.client.get(self.url, {"username": "janedoe"})
+        self.assertEqual(
+            response.json(),
+            {"field": "username", "value": "janedoe", "available": True},
+        )
+
+    def test_taken(self):
+        for field, value in [
+            ("username", "johndoe"),
+            ("email", "johndoe@MAIL.COM"),
+            ("phone_number", "123456789"),
+        ]:
+            response = self.client.get(self.url, {field: value})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.json()["available"])
+
+    def test_invalid(self):
+        for query in [
+            {},
+            {"username": "janedoe", "email": "janedoe@mail.com"},
+            {"username": " "},
+            {"email": "janedoe"},
+            {"phone_number": "12345"},
+        ]:
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.json())
+
+    def test_stats_for_staff(self):
+        response = self.client.get(self.url, {"username": "janedoe"})
+        self.assertNotIn("filter", response.json())
+        self.account.is_staff = True
+        self.account.save()
+        self.client.login(username="johndoe", password="[Pass1234]")
+        stats = self.client.get(self.url, {"username": "janedoe"}).json()["filter"]
+        self.assertTrue(stats["built"])
+        self.assertGreater(stats["memory_bytes"], 0)
+        self.assertIn("expected_false_positive_rate", stats)
+
+    @override_settings(THROTTLE_RATES={"availability": (2, 60)})
+    def test_throttled(self):
+        cache.clear()
+        for _ in range(2):
+            self.client.get(self.url, {"email": "janedoe@mail.com"})
+        with self.assertLogs("extended_accounts.helpers.throttling", "WARNING") as logs:
+            response = self.client.get(self.url, {"email": "janedoe@mail.com"})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Throttled availability attempt", logs.output[0])
@@ -4,6 +4,8 @@ from django.http import Http404
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.models import AccountModel as Account
 from extended_accounts.views import DeleteAccountView
+from extended_accounts.helpers import purge_deleted_accounts
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -50,17 +52,46 @@ class DeleteAccountViewTestCase(TestCase):
 
     def test_account_deleted(self):
         previous_image_name = self.account.profile.profile_image.name
-        self.assertIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
         request = self.factory.post(self.delete_url)
         request.user = self.account
-        response = DeleteAccountView.as_view()(request, username=self.account.username)
+        request.session = self.client.session
+        ## The request only soft-deletes the account, whatever it owns: 2 lookups of the account (permission check and object), its UPDATE, its directory entry and the session flush
+        with self.assertNumQueries(6):
+            response = DeleteAccountView.as_view()(
+                request, username=self.account.username
+            )
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, reverse_lazy("extended_accounts:login"))
         with self.assertRaises(Account.DoesNotExist):
             Account.objects.get(username=self.account.username)
-        self.assertNotIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertNotIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        soft_deleted_account = Account.all_objects.get(username=self.account.username)
+        self.assertFalse(soft_deleted_account.is_active)
+        self.assertIsNotNone(soft_deleted_account.deletion_requested_at)
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        ## The purge deletes it for good
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(purge_deleted_accounts(), 1)
+        self.assertFalse(
+            Account.all_objects.filter(username=self.account.username).exists()
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
 
     def test_get_success_url(self):
         self.assertEqual(
@@ -4,6 +4,7 @@ from django.http import Http404
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.models import AccountModel as Account
 from extended_accounts.views import DeleteProfileImageView
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -50,19 +51,32 @@ class DeleteProfileImageViewTestCase(TestCase):
 
     def test_profile_image_deleted(self):
         previous_image_name = self.account.profile.profile_image.name
-        self.assertIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        self.assertTrue(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
         request = self.factory.post(self.delete_profile_image_url)
         request.user = self.account
-        response = DeleteProfileImageView.as_view()(
-            request, username=self.account.username
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = DeleteProfileImageView.as_view()(
+                request, username=self.account.username
+            )
         self.assertEqual(response.status_code, 302)
         self.assertEqual(
             response.url, reverse_lazy("extended_accounts:redirect_account")
         )
-        self.assertNotIn(previous_image_name + ".png", os.listdir(MEDIA_ROOT))
-        self.assertNotIn(previous_image_name + ".webp", os.listdir(MEDIA_ROOT))
+        self.assertFalse(
+            os.path.exists(os.path.join(MEDIA_ROOT, previous_image_name + ".png"))
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, rendition_name(previous_image_name, ".webp"))
+            )
+        )
 
     def test_get_object_correct(self):
         self.view.kwargs = {"username": self.account.username}
@@ -0,0 +1,40 @@
+from django.test import TestCase
+from django.urls import reverse_lazy
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import AccountDirectoryModel as AccountDirectory
+
+
+class ListAccountViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user(
+            username="johndoe",
+            email="johndoe@mail.com",
+            phone_number=123456789,
+            password="[Pass1234]",
+            is_active=True,
+        )
+        Account.objects.create_user(
+            username="janedoe", email="janedoe@mail.com", phone_number=987654321
+        )
+        cls.url = reverse_lazy("extended_accounts:list_account")
+
+    def test_login_required(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_list_from_directory(self):
+        self.client.login(username="johndoe", password="[Pass1234]")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [entry.username for entry in response.context["object_list"]],
+            ["janedoe", "johndoe"],
+        )
+        self.assertIsInstance(response.context["object_list"][0], AccountDirectory)
+        self.assertContains(
+            response,
+            reverse_lazy(
+                "extended_accounts:detail_account", kwargs={"username": "janedoe"}
+            ),
+        )
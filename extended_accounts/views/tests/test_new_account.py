@@ -6,6 +6,7 @@ from django.template.response import TemplateResponse
 from django.conf import settings
 from extended_accounts.models import AccountModel as Account
 from extended_accounts.views import NewAccountView
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -82,11 +83,18 @@ class NewAccountViewTestCase(TestCase):
             account.profile.phone_number, data["phone_number"]
         )  ## The phone has been registered correctly in the profile
         ## The image's been uploaded
-        self.assertIn(
-            account.profile.profile_image.name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, account.profile.profile_image.name + ".png")
+            )
         )
-        self.assertIn(
-            account.profile.profile_image.name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(account.profile.profile_image.name, ".webp"),
+                )
+            )
         )
         ## To check the password, the account must be active
         account.update(is_active=True)
@@ -101,3 +109,21 @@ class NewAccountViewTestCase(TestCase):
         )  ## Verify that the email body contains the user's name (the content in the URL). We cannot verify the complete message because the token generated in the function may not be necessarily the same as we could generate here. In any case, this test is sufficient to see that the mail was sent correctly
         self.assertEqual(sent_mail.from_email, settings.DEFAULT_FROM_EMAIL)
         self.assertAlmostEqual(sent_mail.to, ["johndoe@mail.com"])
+
+    def test_create_user_with_rejected_image(self):
+        data = {
+            "username": "johndoe",
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "johndoe@mail.com",
+            "phone_number": 123456789,
+            "password1": "testpassword",
+            "password2": "testpassword",
+            "profile_image": SimpleUploadedFile("test_image.png", b"%PDF-1.7" * 1024),
+        }
+        request = self.factory.post(self.create_url, data)
+        response = NewAccountView.as_view()(request)
+
+        self.assertEqual(200, response.status_code)  ## The form is rendered again
+        self.assertIn("profile_image", response.context_data["form"].errors)
+        self.assertFalse(Account.objects.filter(username="johndoe").exists())
@@ -0,0 +1,161 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse_lazy
+from django.http import Http404
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from extended_accounts.models import AccountModel as Account
+from extended_accounts.models import ProfileModel as Profile
+from extended_accounts.views import ProfileImageView
+from extended_accounts.signals.pre_save_profile_model import rendition_name
+from PIL import Image
+from io import BytesIO
+from unittest.mock import patch
+import tempfile, shutil, os
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_test_image():
+    image_buffer = BytesIO()
+    image_object = Image.new("RGB", (1, 1))
+    image_object.save(image_buffer, "png")
+    image_buffer.seek(0)
+    image = SimpleUploadedFile(
+        "test_image.png",
+        image_buffer.read(),
+    )
+    return image
+
+
+class ObjectStorage(
+    Storage
+):  ## Stand-in for a backend outside the local filesystem (eg: an object store), which has no path()
+    def __init__(self, files):
+        self.files = files
+
+    def exists(self, name):
+        return name in self.files
+
+    def _open(self, name, mode="rb"):
+        return ContentFile(self.files[name], name=name)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProfileImageViewTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls, *args, **kwargs):
+        super().setUpClass(*args, **kwargs)
+        cls.account = Account.objects.create_user(
+            username="johndoe",
+            phone_number=123456789,
+            email="johndoe@mail.com",
+            profile_image=create_test_image(),
+        )
+        cls.name = cls.account.profile.profile_image.name
+        cls.url = reverse_lazy(
+            "extended_accounts:profile_image", kwargs={"name": cls.name}
+        )
+        cls.factory = RequestFactory()
+
+    @classmethod
+    def tearDownClass(cls, *args, **kwargs):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass(*args, **kwargs)
+
+    def __get(self, accept, **headers):
+        request = self.factory.get(self.url, HTTP_ACCEPT=accept, **headers)
+        return ProfileImageView.as_view()(request, name=self.name)
+
+    def test_webp_if_accepted(self):
+        response = self.__get("image/avif,image/webp,*/*")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["Vary"], "Accept")
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=31536000, immutable"
+        )
+        self.assertEqual(
+            response["ETag"],
+            f'"{os.path.basename(rendition_name(self.name, ".webp"))}"',
+        )
+        with open(
+            os.path.join(MEDIA_ROOT, rendition_name(self.name, ".webp")), "rb"
+        ) as file:
+            self.assertEqual(b"".join(response.streaming_content), file.read())
+
+    def test_original_if_webp_not_accepted(self):
+        response = self.__get("image/png,image/*;q=0.8,*/*;q=0.5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["ETag"], f'"{os.path.basename(self.name)}.png"')
+
+    def test_not_modified(self):
+        etag = self.__get("image/webp")["ETag"]
+        response = self.__get("image/webp", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    @override_settings(
+        PROFILE_IMAGE_SENDFILE_HEADER="X-Accel-Redirect",
+        PROFILE_IMAGE_SENDFILE_PREFIX="/protected_media/",
+    )
+    def test_x_accel_redirect(self):
+        response = self.__get("image/webp")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected_media/" + rendition_name(self.name, ".webp"),
+        )
+        self.assertEqual(response.content, b"")
+
+    @override_settings(PROFILE_IMAGE_SENDFILE_HEADER="X-Sendfile")
+    def test_x_sendfile(self):
+        response = self.__get("image/webp")
+        self.assertEqual(
+            response["X-Sendfile"],
+            os.path.join(MEDIA_ROOT, rendition_name(self.name, ".webp")),
+        )
+
+    @override_settings(PROFILE_IMAGE_SENDFILE_HEADER="X-Sendfile")
+    def test_x_sendfile_without_path(self):
+        storage = ObjectStorage({rendition_name(self.name, ".webp"): b"image"})
+        with patch.object(Profile._meta.get_field("profile_image"), "storage", storage):
+            response = self.__get("image/webp")
+            self.assertNotIn("X-Sendfile", response)
+            self.assertEqual(b"".join(response.streaming_content), b"image")
+
+    def test_legacy_image(self):
+        ## Stored before the manifest existed: a flat name, no blob and an empty manifest
+        name = "0123456789abcdef0123456789abcdef"
+        with open(os.path.join(MEDIA_ROOT, f"{name}.webp"), "wb") as file:
+            file.write(b"image")
+        Profile.objects.filter(account=self.account).update(
+            profile_image=name, profile_image_files=[]
+        )
+        response = ProfileImageView.as_view()(
+            self.factory.get(self.url, HTTP_ACCEPT="image/webp"), name=name
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"image")
+
+    def test_unknown_image_404(self):
+        request = self.factory.get(self.url)
+        with self.assertRaises(Http404):
+            ProfileImageView.as_view()(request, name="ab/cd/" + "ab" * 32)
+
+    def test_invalid_name_404(self):
+        request = self.factory.get(self.url)
+        with self.assertRaises(Http404):
+            ProfileImageView.as_view()(request, name="../settings")
+
+    def test_url_changes_with_files(self):
+        profile = self.account.profile
+        url = profile.profile_image_url
+        self.assertTrue(url.startswith(f"{self.url}?v="))
+        ## eg: renditions re-encoded by a new transcoder version
+        profile.profile_image_files = [
+            self.name + ".png",
+            rendition_name(self.name, ".webp", version=0),
+        ]
+        self.assertNotEqual(profile.profile_image_url, url)
@@ -4,6 +4,7 @@ from django.http import Http404
 from django.core.files.uploadedfile import SimpleUploadedFile
 from extended_accounts.models import AccountModel as Account
 from extended_accounts.views import UpdateAccountView
+from extended_accounts.signals.pre_save_profile_model import rendition_name
 from PIL import Image
 from io import BytesIO
 import tempfile, shutil, os
@@ -11,9 +12,9 @@ import tempfile, shutil, os
 MEDIA_ROOT = tempfile.mkdtemp()
 
 
-def create_test_image():
+def create_test_image(color=(0, 0, 0)):
     image_buffer = BytesIO()
-    image_object = Image.new("RGB", (1, 1))
+    image_object = Image.new("RGB", (1, 1), color)
     image_object.save(image_buffer, "png")
     image_buffer.seek(0)
     image = SimpleUploadedFile(
@@ -111,11 +112,18 @@ class UpdateAccountViewTestCase(TestCase):
         self.assertEqual(
             initial_data["phone_number"], self.account.profile.phone_number
         )
-        self.assertIn(
-            initial_data["profile_image"].name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, initial_data["profile_image"].name + ".png")
+            )
         )
-        self.assertIn(
-            initial_data["profile_image"].name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(initial_data["profile_image"].name, ".webp"),
+                )
+            )
         )
 
         new_data = {
@@ -124,12 +132,15 @@ class UpdateAccountViewTestCase(TestCase):
             "last_name": "Doey",
             "email": "johhnydoey@mail.com",
             "phone_number": 987654321,
-            "profile_image": create_test_image(),
+            "profile_image": create_test_image(color=(255, 255, 255)),
         }
 
         request = self.factory.post(self.update_url, new_data)
         request.user = self.account
-        response = UpdateAccountView.as_view()(request, username=self.account.username)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = UpdateAccountView.as_view()(
+                request, username=self.account.username
+            )
         self.assertEqual(302, response.status_code)  ## Correct update -> Redirection
         self.assertEqual(
             response.url, reverse_lazy("extended_accounts:redirect_account")
@@ -141,15 +152,31 @@ class UpdateAccountViewTestCase(TestCase):
         self.assertEqual(self.account.profile.phone_number, new_data["phone_number"])
         ## The image has been properly uploaded to the server with its different extensions, similarly, the old image is no longer present
         self.assertIn(MEDIA_ROOT, self.account.profile.profile_image.path)
-        self.assertIn(
-            self.account.profile.profile_image.name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT, self.account.profile.profile_image.name + ".png"
+                )
+            )
         )
-        self.assertIn(
-            self.account.profile.profile_image.name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(self.account.profile.profile_image.name, ".webp"),
+                )
+            )
         )
-        self.assertNotIn(
-            initial_data["profile_image"].name + ".png", os.listdir(MEDIA_ROOT)
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(MEDIA_ROOT, initial_data["profile_image"].name + ".png")
+            )
         )
-        self.assertNotIn(
-            initial_data["profile_image"].name + ".webp", os.listdir(MEDIA_ROOT)
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(
+                    MEDIA_ROOT,
+                    rendition_name(initial_data["profile_image"].name, ".webp"),
+                )
+            )
         )